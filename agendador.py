@@ -0,0 +1,242 @@
+import asyncio
+import heapq
+import json
+import os
+import random
+import threading
+import time
+
+from comum import normalizar_nome
+from durabilidade import substituicao_atomica
+
+# ===================================================
+# WATCHLIST E AGENDADOR DE COLETA DE PREÇOS
+# ===================================================
+
+
+class Watchlist:
+    """Jogadores acompanhados em segundo plano e quem se interessa por cada um.
+
+    Um (jogador, plataforma) entra na lista quando algum usuário tem uma
+    posição aberta nele, o fixou com /fixar ou criou um alerta para ele, e
+    sai quando ninguém mais precisa dele. A lista é persistida em JSON para sobreviver a reinícios.
+    """
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self._itens = {}  # (nome normalizado, plataforma) -> {'nome', 'usuarios': {user_id: {'fixado', 'abertas', 'alertas'}}}
+        self._lock = threading.Lock()
+        self.versao = 0
+
+    @property
+    def existe(self):
+        return os.path.exists(self.arquivo)
+
+    def carregar(self):
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as file:
+                dados = json.load(file)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._itens = {}
+            for item in dados:
+                self._itens[(normalizar_nome(item['nome']), item['plataforma'])] = {
+                    'nome': item['nome'],
+                    'usuarios': {int(uid): {'alertas': 0, **motivo} for uid, motivo in item['usuarios'].items()},
+                }
+            self.versao += 1
+
+    def salvar(self):
+        with self._lock:
+            dados = [
+                {'nome': item['nome'], 'plataforma': plataforma, 'usuarios': item['usuarios']}
+                for (_, plataforma), item in self._itens.items()
+            ]
+        with substituicao_atomica(self.arquivo, encoding='utf-8') as file:
+            json.dump(dados, file, ensure_ascii=False)
+
+    def _alterar(self, user_id, nome, plataforma, campo, delta):
+        chave = (normalizar_nome(nome), plataforma)
+        with self._lock:
+            item = self._itens.setdefault(chave, {'nome': nome, 'usuarios': {}})
+            motivo = item['usuarios'].setdefault(user_id, {'fixado': False, 'abertas': 0, 'alertas': 0})
+            if campo == 'fixado':
+                motivo['fixado'] = delta > 0
+            else:
+                motivo[campo] = max(0, motivo[campo] + delta)
+            if not motivo['fixado'] and not motivo['abertas'] and not motivo['alertas']:
+                del item['usuarios'][user_id]
+            if not item['usuarios']:
+                del self._itens[chave]
+            self.versao += 1
+
+    def fixar(self, user_id, nome, plataforma):
+        self._alterar(user_id, nome, plataforma, 'fixado', 1)
+
+    def desafixar(self, user_id, nome, plataforma):
+        self._alterar(user_id, nome, plataforma, 'fixado', -1)
+
+    def posicao_aberta(self, user_id, nome, plataforma):
+        self._alterar(user_id, nome, plataforma, 'abertas', 1)
+
+    def posicao_fechada(self, user_id, nome, plataforma):
+        self._alterar(user_id, nome, plataforma, 'abertas', -1)
+
+    def alerta_criado(self, user_id, nome, plataforma):
+        self._alterar(user_id, nome, plataforma, 'alertas', 1)
+
+    def alerta_removido(self, user_id, nome, plataforma):
+        self._alterar(user_id, nome, plataforma, 'alertas', -1)
+
+    def itens(self):
+        """Cópia: [(chave, nome, plataforma, [user_ids])]."""
+        with self._lock:
+            return [
+                (chave, item['nome'], chave[1], list(item['usuarios']))
+                for chave, item in self._itens.items()
+            ]
+
+    def extrair(self, filtro):
+        """Tira da lista os usuários com `filtro(user_id)` verdadeiro: {user_id: [[nome, plataforma, motivo]]}."""
+        extraidos = {}
+        with self._lock:
+            for chave, item in list(self._itens.items()):
+                for user_id in [user_id for user_id in item['usuarios'] if filtro(user_id)]:
+                    extraidos.setdefault(user_id, []).append([item['nome'], chave[1], item['usuarios'].pop(user_id)])
+                if not item['usuarios']:
+                    del self._itens[chave]
+            if extraidos:
+                self.versao += 1
+        return extraidos
+
+    def incorporar(self, itens_por_usuario):
+        """Inverso de `extrair`. Idempotente: o motivo de cada usuário é substituído, não somado."""
+        with self._lock:
+            for user_id, itens in itens_por_usuario.items():
+                for nome, plataforma, motivo in itens:
+                    item = self._itens.setdefault((normalizar_nome(nome), plataforma), {'nome': nome, 'usuarios': {}})
+                    item['usuarios'][int(user_id)] = {'alertas': 0, **motivo}
+            self.versao += 1
+
+    def fixados(self, user_id):
+        with self._lock:
+            return [
+                (item['nome'], chave[1]) for chave, item in self._itens.items()
+                if item['usuarios'].get(user_id, {}).get('fixado')
+            ]
+
+
+class AgendadorPrecos:
+    """Tarefa asyncio que coleta os preços da watchlist periodicamente.
+
+    Cada item tem seu próprio horário de próxima coleta, com jitter para não
+    concentrar requisições. O intervalo encolhe para jogadores voláteis e
+    cresce para os estáveis. A cada rodada no máximo `lote` itens são
+    buscados juntos, com o motor de preços limitando a concorrência por site
+    (as páginas de busca dos sites são de um jogador por vez, então o lote é
+    de requisições simultâneas, não uma requisição com vários jogadores), e
+    as amostras são gravadas com um único append por usuário.
+    """
+
+    def __init__(self, watchlist, buscar_preco, gravar_amostras,
+                 intervalo=900, intervalo_min=120, intervalo_max=3600, lote=20, jitter=0.2):
+        self.watchlist = watchlist
+        self.buscar_preco = buscar_preco        # async (nome, plataforma) -> (nome, preço) | None
+        self.gravar_amostras = gravar_amostras  # async ({user_id: [(nome, preço, plataforma)]})
+        self.intervalo = intervalo
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.lote = lote
+        self.jitter = jitter
+        self._agenda = []          # heap de (próxima coleta, chave)
+        self._estado = {}          # chave -> {'ultimo': preço, 'volatilidade': ema de |variação|}
+        self._versao_vista = -1
+        self._tarefa = None
+
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._laco())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    def _com_jitter(self, segundos):
+        return segundos * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _proximo_intervalo(self, chave):
+        """Intervalo base dividido pela volatilidade recente (limitado a [min, max])."""
+        volatilidade = self._estado.get(chave, {}).get('volatilidade', 0.0)
+        intervalo = self.intervalo / (1 + 50 * volatilidade)
+        return min(self.intervalo_max, max(self.intervalo_min, intervalo))
+
+    def _sincronizar(self, agora):
+        """Agenda itens novos da watchlist (espalhados ao longo do primeiro intervalo) e esquece os que saíram."""
+        if self.watchlist.versao == self._versao_vista:
+            return
+        self._versao_vista = self.watchlist.versao
+        agendados = {chave for _, chave in self._agenda}
+        chaves = set()
+        for chave, _, _, _ in self.watchlist.itens():
+            chaves.add(chave)
+            if chave not in agendados:
+                heapq.heappush(self._agenda, (agora + random.uniform(0, self.intervalo_min), chave))
+        # (os que saíram também saem da agenda quando vencem, em `rodada`)
+        self._estado = {chave: estado for chave, estado in self._estado.items() if chave in chaves}
+
+    async def _laco(self):
+        while True:
+            try:
+                await self.rodada()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro na coleta de preços: {e}")
+            espera = self._agenda[0][0] - time.monotonic() if self._agenda else self.intervalo_min
+            await asyncio.sleep(min(max(espera, 1.0), self.intervalo_min))
+
+    async def rodada(self):
+        """Coleta os itens vencidos (até `lote`) e grava as amostras."""
+        agora = time.monotonic()
+        self._sincronizar(agora)
+        itens = {chave: (nome, plataforma, usuarios) for chave, nome, plataforma, usuarios in self.watchlist.itens()}
+
+        vencidos = []
+        while self._agenda and self._agenda[0][0] <= agora and len(vencidos) < self.lote:
+            _, chave = heapq.heappop(self._agenda)
+            if chave in itens:  # itens removidos da watchlist simplesmente saem da agenda
+                vencidos.append(chave)
+        if not vencidos:
+            return 0
+
+        respostas = await asyncio.gather(
+            *(self.buscar_preco(itens[chave][0], itens[chave][1]) for chave in vencidos),
+            return_exceptions=True,
+        )
+
+        amostras = {}
+        for chave, resposta in zip(vencidos, respostas):
+            nome, plataforma, usuarios = itens[chave]
+            if resposta and not isinstance(resposta, BaseException):
+                preco = resposta[1]
+                self._atualizar_volatilidade(chave, preco)
+                for user_id in usuarios:
+                    amostras.setdefault(user_id, []).append((nome, preco, plataforma))
+            heapq.heappush(self._agenda, (time.monotonic() + self._com_jitter(self._proximo_intervalo(chave)), chave))
+
+        if amostras:
+            await self.gravar_amostras(amostras)
+        return len(vencidos)
+
+    def _atualizar_volatilidade(self, chave, preco):
+        estado = self._estado.setdefault(chave, {'ultimo': None, 'volatilidade': 0.0})
+        if estado['ultimo']:
+            variacao = abs(preco - estado['ultimo']) / estado['ultimo']
+            estado['volatilidade'] = 0.7 * estado['volatilidade'] + 0.3 * variacao
+        estado['ultimo'] = preco
@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+from collections import deque
+
+from comum import normalizar_nome
+from durabilidade import substituicao_atomica
+from carteira import calcular_lucro_liquido
+
+# ===================================================
+# ALERTAS DE PREÇO (ÍNDICE POR JOGADOR)
+# ===================================================
+
+TIPOS_ALERTA = {
+    'ACIMA': 'Preço acima de',
+    'ABAIXO': 'Preço abaixo de',
+    'VARIACAO': 'Variação de',
+    'LUCRO': 'Lucro líquido de',
+}
+
+
+class IndiceAlertas:
+    """Alertas dos usuários indexados por jogador.
+
+    Cada amostra de preço só consulta os alertas daquele jogador. Alertas de
+    limite e de lucro disparam ao cruzar o valor e se rearmam quando o preço
+    volta; alertas de variação usam uma janela deslizante de amostras e
+    esperam a janela passar antes de disparar de novo.
+    """
+
+    def __init__(self, arquivo, formatar_preco=str):
+        self.arquivo = arquivo
+        self.formatar_preco = formatar_preco
+        self._por_jogador = {}  # nome normalizado -> {alerta_id: alerta}
+        self._janelas = {}      # (nome normalizado, plataforma, user_id) -> deque[(timestamp, preço)]
+        self._proximo_id = 1
+        self._alterado = False  # disparos/rearmes ainda não salvos
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as file:
+                alertas = json.load(file)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._por_jogador = {}
+            for alerta in alertas:
+                self._por_jogador.setdefault(normalizar_nome(alerta['jogador']), {})[alerta['id']] = alerta
+                self._proximo_id = max(self._proximo_id, alerta['id'] + 1)
+
+    @property
+    def alterado(self):
+        """Algum alerta disparou ou se rearmou desde o último `salvar`."""
+        return self._alterado
+
+    def salvar(self):
+        with self._lock:
+            alertas = [dict(a) for por_id in self._por_jogador.values() for a in por_id.values()]
+            self._alterado = False
+        with substituicao_atomica(self.arquivo, encoding='utf-8') as file:
+            json.dump(alertas, file, ensure_ascii=False)
+
+    def adicionar(self, user_id, jogador, plataforma, tipo, valor, janela_min=60):
+        with self._lock:
+            alerta = {
+                'id': self._proximo_id, 'user_id': user_id, 'jogador': jogador, 'plataforma': plataforma,
+                'tipo': tipo, 'valor': valor, 'janela_min': janela_min,
+                'disparado': False, 'disparado_em': 0,
+            }
+            self._proximo_id += 1
+            self._por_jogador.setdefault(normalizar_nome(jogador), {})[alerta['id']] = alerta
+            return dict(alerta)
+
+    def remover(self, user_id, alerta_id):
+        """Remove o alerta se ele pertencer ao usuário. Retorna o alerta removido ou None."""
+        with self._lock:
+            for chave, por_id in self._por_jogador.items():
+                alerta = por_id.get(alerta_id)
+                if alerta and alerta['user_id'] == user_id:
+                    del por_id[alerta_id]
+                    if not por_id:
+                        del self._por_jogador[chave]
+                    return alerta
+        return None
+
+    def extrair(self, filtro):
+        """Tira os alertas dos usuários com `filtro(user_id)` verdadeiro: {user_id: [alertas]}."""
+        extraidos = {}
+        with self._lock:
+            for chave, por_id in list(self._por_jogador.items()):
+                for alerta_id in [i for i, alerta in por_id.items() if filtro(alerta['user_id'])]:
+                    alerta = por_id.pop(alerta_id)
+                    extraidos.setdefault(alerta['user_id'], []).append(alerta)
+                if not por_id:
+                    del self._por_jogador[chave]
+            self._janelas = {chave: janela for chave, janela in self._janelas.items() if not filtro(chave[2])}
+        return extraidos
+
+    def incorporar(self, alertas_por_usuario):
+        """Inverso de `extrair`: os alertas atuais desses usuários são trocados pelos recebidos.
+
+        Um alerta recebido com um id que já está em uso aqui ganha um id novo.
+        """
+        usuarios = {int(user_id) for user_id in alertas_por_usuario}
+        with self._lock:
+            for chave, por_id in list(self._por_jogador.items()):
+                for alerta_id in [i for i, alerta in por_id.items() if alerta['user_id'] in usuarios]:
+                    del por_id[alerta_id]
+                if not por_id:
+                    del self._por_jogador[chave]
+            em_uso = {alerta_id for por_id in self._por_jogador.values() for alerta_id in por_id}
+            self._proximo_id = max([self._proximo_id, *(i + 1 for i in em_uso)])
+            for alertas in alertas_por_usuario.values():
+                for alerta in alertas:
+                    alerta = dict(alerta)
+                    if alerta['id'] in em_uso:
+                        alerta['id'] = self._proximo_id
+                    em_uso.add(alerta['id'])
+                    self._proximo_id = max(self._proximo_id, alerta['id'] + 1)
+                    self._por_jogador.setdefault(normalizar_nome(alerta['jogador']), {})[alerta['id']] = alerta
+
+    def do_usuario(self, user_id):
+        with self._lock:
+            return sorted(
+                (dict(a) for por_id in self._por_jogador.values() for a in por_id.values() if a['user_id'] == user_id),
+                key=lambda a: a['id'],
+            )
+
+    def tem_alertas(self, jogador, user_id=None, tipo=None):
+        """Há alerta para o jogador (do usuário e do tipo, se dados)?"""
+        por_id = self._por_jogador.get(normalizar_nome(jogador))
+        if not por_id or (user_id is None and tipo is None):
+            return bool(por_id)
+        with self._lock:
+            return any(
+                (user_id is None or a['user_id'] == user_id) and (tipo is None or a['tipo'] == tipo)
+                for a in por_id.values()
+            )
+
+    def avaliar(self, user_id, jogador, plataforma, preco, posicoes_abertas=None, agora=None):
+        """Confere os alertas do usuário para este jogador/plataforma contra a nova amostra.
+
+        `posicoes_abertas` (lista de posições do jogador) só é necessária para alertas LUCRO.
+        Retorna a lista de (alerta, mensagem) disparados.
+        """
+        agora = agora or time.time()
+        chave = normalizar_nome(jogador)
+        disparados = []
+        with self._lock:
+            alertas = [
+                a for a in self._por_jogador.get(chave, {}).values()
+                if a['user_id'] == user_id and a['plataforma'] == plataforma
+            ]
+            if not alertas:
+                return disparados
+
+            janela = None
+            maior_janela = max((a['janela_min'] for a in alertas if a['tipo'] == 'VARIACAO'), default=0)
+            if maior_janela:
+                janela = self._janelas.setdefault((chave, plataforma, user_id), deque())
+                janela.append((agora, preco))
+                while janela and janela[0][0] < agora - maior_janela * 60:
+                    janela.popleft()
+
+            for alerta in alertas:
+                mensagem = self._checar(alerta, preco, janela, posicoes_abertas or [], agora)
+                if mensagem:
+                    disparados.append((dict(alerta), mensagem))
+        return disparados
+
+    def _checar(self, alerta, preco, janela, posicoes_abertas, agora):
+        tipo, valor = alerta['tipo'], alerta['valor']
+        fmt = self.formatar_preco
+
+        if tipo in ('ACIMA', 'ABAIXO', 'LUCRO'):
+            if tipo == 'ACIMA':
+                atingido = preco >= valor
+            elif tipo == 'ABAIXO':
+                atingido = preco <= valor
+            else:
+                lucros = [calcular_lucro_liquido(p['preco_compra'], preco) for p in posicoes_abertas]
+                atingido = bool(lucros) and max(lucros) >= valor
+            if not atingido:
+                if alerta['disparado']:
+                    alerta['disparado'] = False  # rearma quando o preço volta
+                    self._alterado = True
+                return None
+            if alerta['disparado']:
+                return None
+            alerta['disparado'] = True
+            self._alterado = True
+            if tipo == 'LUCRO':
+                return f"💸 Vender agora daria **{fmt(max(lucros))}** de lucro líquido (meta: {fmt(valor)})"
+            return f"{'⬆️' if tipo == 'ACIMA' else '⬇️'} Preço em **{fmt(preco)}** (limite: {fmt(valor)})"
+
+        if tipo == 'VARIACAO' and janela:
+            if agora - alerta['disparado_em'] < alerta['janela_min'] * 60:
+                return None
+            inicio = agora - alerta['janela_min'] * 60
+            referencia = next((p for ts, p in janela if ts >= inicio), None)
+            if not referencia:
+                return None
+            variacao = (preco - referencia) / referencia * 100
+            if abs(variacao) >= valor:
+                alerta['disparado_em'] = agora
+                self._alterado = True
+                return f"{'📈' if variacao > 0 else '📉'} Variação de **{variacao:+.1f}%** em {alerta['janela_min']} min"
+        return None
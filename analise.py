@@ -0,0 +1,308 @@
+import argparse
+import bisect
+import csv
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from comum import HISTORICO_FILE, normalizar_nome
+
+# ===================================================
+# ESTATÍSTICAS EM JANELA, ATUALIZADAS A CADA AMOSTRA
+# ===================================================
+
+JANELA_PADRAO = 50
+EMA_CURTA = 5
+EMA_LONGA = 20
+PERCENTIS = (0.1, 0.9)
+
+
+def _percentil(ordenados, q):
+    """Percentil com interpolação linear (mesmo critério do np.percentile)."""
+    if not ordenados:
+        return None
+    posicao = (len(ordenados) - 1) * q
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+
+class EstatisticasSerie:
+    """Estatísticas de uma série (jogador + plataforma) sobre as últimas `janela` amostras.
+
+    - EMA curta e longa: O(1);
+    - mínimo/máximo: deques monotônicos, O(1) amortizado;
+    - volatilidade (desvio-padrão das variações %): somas acumuladas, O(1);
+    - faixas de percentil: lista ordenada da janela (busca binária).
+    """
+
+    def __init__(self, janela=JANELA_PADRAO):
+        self.janela = janela
+        self.alfa_curta = 2 / (EMA_CURTA + 1)
+        self.alfa_longa = 2 / (EMA_LONGA + 1)
+        self.total = 0
+        self.ultimo = None
+        self.anterior = None
+        self.ema_curta = None
+        self.ema_longa = None
+        self._precos = deque()      # últimas `janela` amostras
+        self._ordenados = []        # as mesmas, ordenadas
+        self._minimos = deque()     # (índice, preço) crescente
+        self._maximos = deque()     # (índice, preço) decrescente
+        self._retornos = deque()    # últimas `janela` variações %
+        self._soma = 0.0
+        self._soma_quadrados = 0.0
+
+    def adicionar(self, preco):
+        self._adicionar_janela(preco)
+        if self.ema_curta is None:
+            self.ema_curta = self.ema_longa = float(preco)
+        else:
+            self.ema_curta += self.alfa_curta * (preco - self.ema_curta)
+            self.ema_longa += self.alfa_longa * (preco - self.ema_longa)
+
+    def _adicionar_janela(self, preco):
+        """Tudo menos as EMAs (que dependem da série inteira)."""
+        indice = self.total
+        self.total += 1
+        if self.ultimo:
+            retorno = (preco - self.ultimo) / self.ultimo
+            self._retornos.append(retorno)
+            self._soma += retorno
+            self._soma_quadrados += retorno * retorno
+            if len(self._retornos) > self.janela:
+                antigo = self._retornos.popleft()
+                self._soma -= antigo
+                self._soma_quadrados -= antigo * antigo
+        self.anterior, self.ultimo = self.ultimo, preco
+
+        self._precos.append(preco)
+        bisect.insort(self._ordenados, preco)
+        if len(self._precos) > self.janela:
+            del self._ordenados[bisect.bisect_left(self._ordenados, self._precos.popleft())]
+
+        while self._minimos and self._minimos[-1][1] >= preco:
+            self._minimos.pop()
+        self._minimos.append((indice, preco))
+        while self._maximos and self._maximos[-1][1] <= preco:
+            self._maximos.pop()
+        self._maximos.append((indice, preco))
+        limite = indice - self.janela
+        if self._minimos[0][0] <= limite:
+            self._minimos.popleft()
+        if self._maximos[0][0] <= limite:
+            self._maximos.popleft()
+
+    @property
+    def minimo(self):
+        return self._minimos[0][1] if self._minimos else None
+
+    @property
+    def maximo(self):
+        return self._maximos[0][1] if self._maximos else None
+
+    @property
+    def volatilidade(self):
+        n = len(self._retornos)
+        if not n:
+            return 0.0
+        media = self._soma / n
+        return max(0.0, self._soma_quadrados / n - media * media) ** 0.5
+
+    def faixa(self):
+        return tuple(_percentil(self._ordenados, q) for q in PERCENTIS)
+
+    def resumo(self):
+        faixa_baixa, faixa_alta = self.faixa()
+        return {
+            'amostras': self.total,
+            'janela': len(self._precos),
+            'ultimo': self.ultimo,
+            'anterior': self.anterior,
+            'ema_curta': self.ema_curta,
+            'ema_longa': self.ema_longa,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+            'volatilidade': self.volatilidade,
+            'faixa_baixa': faixa_baixa,
+            'faixa_alta': faixa_alta,
+        }
+
+    @classmethod
+    def de_precos(cls, precos, janela=JANELA_PADRAO):
+        """Monta o estado a partir de uma série existente.
+
+        As EMAs (que olham a série inteira) são calculadas vetorizadas com
+        NumPy; as estruturas da janela só precisam da cauda.
+        """
+        estatisticas = cls(janela)
+        if not len(precos):
+            return estatisticas
+        estatisticas.ema_curta, estatisticas.ema_longa = (
+            float(v) for v in emas_vetorizadas(precos, (estatisticas.alfa_curta, estatisticas.alfa_longa))
+        )
+        cauda = precos[-(janela + 1):]
+        estatisticas.total = len(precos) - len(cauda)
+        for preco in cauda:
+            estatisticas._adicionar_janela(int(preco))
+        return estatisticas
+
+
+def emas_vetorizadas(precos, alfas):
+    """Valor final da EMA de cada alfa, sem laço Python.
+
+    EMA_n = (1-a)^(n-1) * x_0 + soma_k a * (1-a)^(n-1-k) * x_k, com a EMA
+    começando na primeira amostra (igual à versão incremental).
+    """
+    import numpy as np
+
+    x = np.asarray(precos, dtype=np.float64)
+    expoentes = np.arange(len(x) - 1, -1, -1, dtype=np.float64)
+    resultados = []
+    for alfa in alfas:
+        pesos = alfa * (1 - alfa) ** expoentes
+        pesos[0] = (1 - alfa) ** expoentes[0]
+        resultados.append(float(pesos @ x))
+    return resultados
+
+
+def estatisticas_vetorizadas(precos, janela=JANELA_PADRAO):
+    """Mesmo `resumo()` de EstatisticasSerie, calculado de uma vez com NumPy."""
+    import numpy as np
+
+    x = np.asarray(precos, dtype=np.float64)
+    if not len(x):
+        return None
+    ultimos = x[-janela:]
+    retornos = np.diff(x[-(janela + 1):]) / x[-(janela + 1):-1]
+    ema_curta, ema_longa = emas_vetorizadas(x, (2 / (EMA_CURTA + 1), 2 / (EMA_LONGA + 1)))
+    faixa_baixa, faixa_alta = np.percentile(ultimos, [q * 100 for q in PERCENTIS])
+    return {
+        'amostras': len(x),
+        'janela': len(ultimos),
+        'ultimo': int(x[-1]),
+        'anterior': int(x[-2]) if len(x) > 1 else None,
+        'ema_curta': ema_curta,
+        'ema_longa': ema_longa,
+        'minimo': int(ultimos.min()),
+        'maximo': int(ultimos.max()),
+        'volatilidade': float(retornos.std()) if len(retornos) else 0.0,
+        'faixa_baixa': float(faixa_baixa),
+        'faixa_alta': float(faixa_alta),
+    }
+
+
+def series_do_csv(caminho=HISTORICO_FILE):
+    """Uma passada no CSV de histórico: {(jogador normalizado, plataforma): [preços]}."""
+    series = {}
+    with open(caminho, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            try:
+                preco = int(row.get('preco_moedas') or 0)
+            except ValueError:
+                continue
+            if preco > 0:
+                series.setdefault((normalizar_nome(row.get('jogador', '')), row.get('plataforma') or ''), []).append(preco)
+    return series
+
+
+class AnaliseJogadores:
+    """Estatísticas de todas as séries de um usuário.
+
+    Na primeira consulta, as séries do histórico são processadas de uma vez
+    (`fonte()` -> {(jogador normalizado, plataforma): [preços]}); depois cada
+    amostra nova só atualiza a sua série. Com `fonte_jogador(jogador)` ->
+    {plataforma: [preços]} (históricos que leem a fatia de um jogador sem
+    percorrer o resto), cada jogador é carregado só na sua primeira consulta.
+    Antes disso `atualizar` não faz nada (a amostra entra quando a fonte for
+    lida), então a gravação no histórico e o `atualizar` vão juntos dentro de
+    `gravando()`: uma carga entre os dois somaria a amostra duas vezes.
+    """
+
+    def __init__(self, fonte, janela=JANELA_PADRAO, fonte_jogador=None):
+        self.fonte = fonte
+        self.fonte_jogador = fonte_jogador
+        self.janela = janela
+        self._series = {}
+        self._recentes = {}  # jogador normalizado -> plataforma atualizada por último
+        self._carregado = False
+        self._jogadores_carregados = set()
+        self._lock = threading.RLock()
+
+    def _tem(self, chave):
+        return self._carregado or chave in self._jogadores_carregados
+
+    def _carregar(self, chave):
+        if self._tem(chave):
+            return
+        if self.fonte_jogador is not None:
+            for plataforma, precos in self.fonte_jogador(chave).items():
+                self._series[(chave, plataforma)] = EstatisticasSerie.de_precos(precos, self.janela)
+                self._recentes[chave] = plataforma
+            self._jogadores_carregados.add(chave)
+            return
+        for (jogador, plataforma), precos in self.fonte().items():
+            self._series[(jogador, plataforma)] = EstatisticasSerie.de_precos(precos, self.janela)
+            self._recentes[jogador] = plataforma
+        self._carregado = True
+
+    @contextmanager
+    def gravando(self):
+        """Segura as cargas da fonte enquanto amostras são gravadas no histórico e passadas a `atualizar`."""
+        with self._lock:
+            yield
+
+    def atualizar(self, jogador, plataforma, preco):
+        if not preco or preco <= 0:
+            return
+        chave = normalizar_nome(jogador)
+        with self._lock:
+            if not self._tem(chave):
+                return  # a fonte, quando for lida, já inclui a amostra recém-gravada
+            self._series.setdefault((chave, plataforma), EstatisticasSerie(self.janela)).adicionar(preco)
+            self._recentes[chave] = plataforma
+
+    def ultimos(self, pares):
+        """Último preço de cada (jogador normalizado, plataforma) pedido, de uma vez: {par: preço}.
+
+        Pares sem amostra ficam de fora.
+        """
+        precos = {}
+        with self._lock:
+            for chave, plataforma in pares:
+                self._carregar(chave)
+                serie = self._series.get((chave, plataforma))
+                if serie is not None and serie.ultimo:
+                    precos[(chave, plataforma)] = serie.ultimo
+        return precos
+
+    def resumo(self, jogador, plataforma=None):
+        """Estatísticas do jogador na plataforma (ou na última plataforma com amostra). None se não houver."""
+        chave = normalizar_nome(jogador)
+        with self._lock:
+            self._carregar(chave)
+            plataforma = plataforma or self._recentes.get(chave)
+            serie = self._series.get((chave, plataforma))
+            if serie is None or not serie.total:
+                return None
+            return dict(serie.resumo(), plataforma=plataforma)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estatísticas por jogador/plataforma de um CSV de histórico.")
+    parser.add_argument('historico', nargs='?', default=HISTORICO_FILE)
+    parser.add_argument('--janela', type=int, default=JANELA_PADRAO)
+    args = parser.parse_args()
+
+    for (jogador, plataforma), precos in sorted(series_do_csv(args.historico).items()):
+        e = estatisticas_vetorizadas(precos, args.janela)
+        print(
+            f"{jogador} ({plataforma}): {e['amostras']} amostras | último {e['ultimo']} | "
+            f"EMA{EMA_CURTA} {e['ema_curta']:.0f} / EMA{EMA_LONGA} {e['ema_longa']:.0f} | "
+            f"min {e['minimo']} max {e['maximo']} | P10 {e['faixa_baixa']:.0f} P90 {e['faixa_alta']:.0f} | "
+            f"vol {e['volatilidade']:.2%}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from durabilidade import COMMIT, executar_coletando
+from metricas import METRICAS
+
+# ===================================================
+# CAMADA ASSÍNCRONA DE ARMAZENAMENTO
+# ===================================================
+
+
+def _nome(func):
+    return getattr(func, '__name__', None) or type(func).__name__
+
+
+class ArmazenamentoAssincrono:
+    """Tira o I/O de CSV do event loop do bot.
+
+    Leituras rodam num pool limitado de threads. Escritas entram numa fila
+    consumida por uma única tarefa escritora, que executa uma de cada vez numa
+    thread dedicada: a ordem dos registros é preservada e nenhum handler
+    bloqueia o loop enquanto o disco trabalha.
+
+    Uma escrita só é confirmada ao handler depois do fsync dos arquivos que
+    ela alterou (GrupoCommit). A tarefa escritora não espera esse fsync para
+    aplicar a próxima: numa rajada de registros, vários dividem o mesmo.
+    """
+
+    def __init__(self, max_leitores=4):
+        self.max_leitores = max_leitores
+        self._leitores = None
+        self._thread_escrita = None
+        self._fila = None
+        self._tarefa_escritora = None
+        self._confirmando = set()
+        self.leituras_em_andamento = 0
+
+    @property
+    def escritas_na_fila(self):
+        return self._fila.qsize() if self._fila is not None else 0
+
+    async def iniciar(self):
+        """Cria os pools e a tarefa escritora no loop atual (idempotente)."""
+        if self._tarefa_escritora is not None:
+            return
+        self._leitores = ThreadPoolExecutor(max_workers=self.max_leitores, thread_name_prefix='leitura')
+        self._thread_escrita = ThreadPoolExecutor(max_workers=1, thread_name_prefix='escrita')
+        self._fila = asyncio.Queue()
+        self._tarefa_escritora = asyncio.get_running_loop().create_task(self._escritor())
+
+    async def parar(self):
+        """Espera as escritas pendentes e encerra os pools."""
+        if self._tarefa_escritora is None:
+            return
+        await self._fila.join()
+        await asyncio.gather(*self._confirmando, return_exceptions=True)
+        self._tarefa_escritora.cancel()
+        try:
+            await self._tarefa_escritora
+        except asyncio.CancelledError:
+            pass
+        self._leitores.shutdown(wait=True)
+        self._thread_escrita.shutdown(wait=True)
+        self._tarefa_escritora = None
+
+    async def ler(self, func, *args, **kwargs):
+        """Executa uma leitura bloqueante no pool de leitores."""
+        await self.iniciar()
+        loop = asyncio.get_running_loop()
+        self.leituras_em_andamento += 1
+        try:
+            with METRICAS.cronometro('armazenamento_segundos', operacao='ler', funcao=_nome(func)):
+                return await loop.run_in_executor(self._leitores, functools.partial(func, *args, **kwargs))
+        finally:
+            self.leituras_em_andamento -= 1
+
+    async def escrever(self, func, *args, **kwargs):
+        """Enfileira uma escrita e espera a tarefa escritora aplicá-la."""
+        await self.iniciar()
+        futuro = asyncio.get_running_loop().create_future()
+        with METRICAS.cronometro('armazenamento_segundos', operacao='escrever', funcao=_nome(func)):
+            await self._fila.put((functools.partial(func, *args, **kwargs), futuro, time.perf_counter()))
+            return await futuro
+
+    async def _escritor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            operacao, futuro, enfileirada = await self._fila.get()
+            METRICAS.observar('armazenamento_espera_segundos', time.perf_counter() - enfileirada,
+                              funcao=_nome(operacao.func))
+            try:
+                resultado, logs = await loop.run_in_executor(self._thread_escrita, executar_coletando, operacao)
+            except Exception as e:
+                if not futuro.cancelled():
+                    futuro.set_exception(e)
+            else:
+                confirmado = asyncio.wrap_future(COMMIT.confirmar(logs))
+                self._confirmando.add(confirmado)
+                confirmado.add_done_callback(functools.partial(self._entregar, futuro, resultado))
+            finally:
+                self._fila.task_done()
+
+    def _entregar(self, futuro, resultado, confirmado):
+        """Conclui a escrita do handler quando o fsync do grupo dela termina."""
+        self._confirmando.discard(confirmado)
+        if futuro.cancelled():
+            return
+        if confirmado.exception() is not None:
+            futuro.set_exception(confirmado.exception())
+        else:
+            futuro.set_result(resultado)
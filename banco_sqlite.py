@@ -0,0 +1,468 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+from comum import (
+    HISTORICO_FILE, CARTEIRA_FILE, CARTEIRA_HEADERS_LEGADO,
+    agora_str, limpar_preco, normalizar_nome,
+)
+from historico import RegistroPreco, Pagina
+from carteira import AgregadosCarteira, calcular_lucro_liquido
+from durabilidade import COMMIT
+
+# ===================================================
+# BACKEND SQLITE (WAL) PARA HISTÓRICO E CARTEIRA
+# ===================================================
+
+SQLITE_DB_FILE = 'fcmonitor.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS historico (
+    id INTEGER PRIMARY KEY,
+    data_hora TEXT NOT NULL,
+    jogador TEXT NOT NULL,
+    jogador_norm TEXT NOT NULL,
+    preco_moedas INTEGER NOT NULL,
+    plataforma TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_historico_jogador_plataforma_data
+    ON historico (jogador_norm, plataforma, data_hora);
+CREATE INDEX IF NOT EXISTS idx_historico_jogador_id
+    ON historico (jogador_norm, id);
+
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    data_hora_compra TEXT NOT NULL,
+    jogador TEXT NOT NULL,
+    jogador_norm TEXT NOT NULL,
+    plataforma TEXT NOT NULL,
+    preco_compra INTEGER NOT NULL,
+    data_hora_venda TEXT,
+    preco_venda INTEGER,
+    lucro_liquido INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_trades_abertos
+    ON trades (jogador_norm, plataforma, id) WHERE preco_venda IS NULL;
+CREATE INDEX IF NOT EXISTS idx_trades_fechados
+    ON trades (data_hora_venda, id) WHERE preco_venda IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS agregados (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    dados TEXT NOT NULL
+);
+"""
+
+COLUNAS_TRADE = ('id', 'data_hora_compra', 'jogador', 'plataforma', 'preco_compra',
+                 'data_hora_venda', 'preco_venda', 'lucro_liquido')
+
+
+class BancoSQLite:
+    """Uma conexão por thread sobre o mesmo arquivo em modo WAL.
+
+    Em WAL os leitores do pool não bloqueiam a thread escritora (e vice-versa).
+    Com gravação durável (COMMIT.fsync, o DURABLE_WRITES) usa synchronous=FULL:
+    cada commit só retorna depois do fsync do WAL. Sem ela, NORMAL, que numa
+    queda de energia pode perder os últimos commits (o banco não corrompe).
+    """
+
+    def __init__(self, caminho=SQLITE_DB_FILE):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._conexoes = []
+        self._schema_ok = False
+        self._lock = threading.Lock()
+
+    def conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f"PRAGMA synchronous={'FULL' if COMMIT.fsync else 'NORMAL'}")
+            self._local.conn = conn
+            with self._lock:
+                self._conexoes.append(conn)
+        with self._lock:
+            if not self._schema_ok:
+                conn.executescript(SCHEMA)
+                self._schema_ok = True
+        return conn
+
+    def fechar(self):
+        """Fecha as conexões de todas as threads (o banco não deve ser usado depois)."""
+        with self._lock:
+            conexoes, self._conexoes = self._conexoes, []
+        for conn in conexoes:
+            conn.close()
+
+
+def _trade_para_dict(row):
+    posicao = dict(zip(COLUNAS_TRADE, row))
+    posicao['trade_id'] = posicao.pop('id')
+    return posicao
+
+
+class HistoricoSQLite:
+    """Mesma interface de `HistoricoStore`, com consultas indexadas."""
+
+    def __init__(self, banco):
+        self.banco = banco
+
+    def carregar(self):
+        self.banco.conexao()
+
+    def registrar(self, jogador, preco_moedas, plataforma):
+        try:
+            preco_limpo = limpar_preco(preco_moedas)
+        except ValueError:
+            preco_limpo = 0
+        registro = RegistroPreco(agora_str(), jogador, preco_limpo, plataforma)
+        conn = self.banco.conexao()
+        with conn:
+            conn.execute(
+                'INSERT INTO historico (data_hora, jogador, jogador_norm, preco_moedas, plataforma) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (registro.data_hora, jogador, normalizar_nome(jogador), preco_limpo, plataforma),
+            )
+        return registro
+
+    def registrar_lote(self, amostras):
+        data_hora = agora_str()
+        registros = [RegistroPreco(data_hora, jogador, int(preco), plataforma) for jogador, preco, plataforma in amostras]
+        conn = self.banco.conexao()
+        with conn:
+            conn.executemany(
+                'INSERT INTO historico (data_hora, jogador, jogador_norm, preco_moedas, plataforma) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(r.data_hora, r.jogador, normalizar_nome(r.jogador), r.preco_moedas, r.plataforma) for r in registros],
+            )
+        return registros
+
+    def ultimos(self, jogador, n):
+        if n <= 0:
+            return []
+        rows = self.banco.conexao().execute(
+            'SELECT data_hora, jogador, preco_moedas, plataforma FROM historico '
+            'WHERE jogador_norm = ? ORDER BY id DESC LIMIT ?',
+            (normalizar_nome(jogador), n),
+        ).fetchall()
+        return [RegistroPreco(*row) for row in reversed(rows)]
+
+    def iterar(self):
+        cursor = self.banco.conexao().execute(
+            'SELECT data_hora, jogador, preco_moedas, plataforma FROM historico ORDER BY id'
+        )
+        for row in cursor:
+            yield RegistroPreco(*row)._asdict()
+
+    def _pagina(self, condicao, parametros, n, antes, depois):
+        """Página por id (keyset): cada página é uma consulta indexada com LIMIT, sem OFFSET."""
+        conn = self.banco.conexao()
+        colunas = 'id, data_hora, jogador, preco_moedas, plataforma'
+        filtro = f'{condicao} AND ' if condicao else ''
+        if depois is not None:
+            rows = conn.execute(
+                f'SELECT {colunas} FROM historico WHERE {filtro}id > ? ORDER BY id LIMIT ?',
+                (*parametros, depois, n),
+            ).fetchall()[::-1]
+        else:
+            limite = 'id < ?' if antes is not None else '1'
+            rows = conn.execute(
+                f'SELECT {colunas} FROM historico WHERE {filtro}{limite} ORDER BY id DESC LIMIT ?',
+                (*parametros, *((antes,) if antes is not None else ()), n),
+            ).fetchall()
+        if not rows:
+            return Pagina([], None, None)
+        existe = f'SELECT 1 FROM historico WHERE {filtro}id {{}} ? LIMIT 1'
+        mais_antigos = conn.execute(existe.format('<'), (*parametros, rows[-1][0])).fetchone()
+        mais_novos = conn.execute(existe.format('>'), (*parametros, rows[0][0])).fetchone()
+        return Pagina(
+            [RegistroPreco(*row[1:]) for row in rows],
+            rows[-1][0] if mais_antigos else None,
+            rows[0][0] if mais_novos else None,
+        )
+
+    def pagina_recentes(self, n, antes=None, depois=None):
+        return self._pagina('', (), n, antes, depois)
+
+    def pagina_jogador(self, jogador, n, antes=None, depois=None):
+        return self._pagina('jogador_norm = ?', (normalizar_nome(jogador),), n, antes, depois)
+
+    def jogadores(self, n, inicio=0):
+        """Jogadores em ordem alfabética a partir da posição `inicio`, via skip scan no índice
+        (uma busca por jogador até o fim da página, sem varrer a tabela)."""
+        conn = self.banco.conexao()
+        chaves = conn.execute(
+            'WITH RECURSIVE nomes(chave) AS ('
+            '  SELECT MIN(jogador_norm) FROM historico'
+            '  UNION ALL'
+            '  SELECT (SELECT MIN(jogador_norm) FROM historico WHERE jogador_norm > nomes.chave)'
+            '  FROM nomes WHERE nomes.chave IS NOT NULL'
+            ') SELECT chave FROM nomes WHERE chave IS NOT NULL LIMIT ? OFFSET ?',
+            (n + 1, inicio),
+        ).fetchall()
+        pagina = []
+        for (chave,) in chaves[:n]:
+            row = conn.execute(
+                'SELECT data_hora, jogador, preco_moedas, plataforma FROM historico '
+                'WHERE jogador_norm = ? ORDER BY id DESC LIMIT 1',
+                (chave,),
+            ).fetchone()
+            pagina.append((chave, RegistroPreco(*row)))
+        return pagina, (inicio + n if len(chaves) > n else None)
+
+    def series(self):
+        series = {}
+        for jogador_norm, plataforma, preco in self.banco.conexao().execute(
+            'SELECT jogador_norm, plataforma, preco_moedas FROM historico WHERE preco_moedas > 0 ORDER BY id'
+        ):
+            series.setdefault((jogador_norm, plataforma), []).append(preco)
+        return series
+
+
+class CarteiraSQLite:
+    """Mesma interface de `CarteiraLedger`; posições abertas via índice parcial.
+
+    Os agregados ficam na tabela `agregados` e são gravados na mesma transação
+    de cada COMPRA/VENDA, então nunca divergem dos trades.
+    """
+
+    def __init__(self, banco):
+        self.banco = banco
+        self._agregados = None
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        with self._lock:
+            if self._agregados is None:
+                self._agregados = self._ler_agregados()
+
+    def _ler_agregados(self):
+        conn = self.banco.conexao()
+        row = conn.execute('SELECT dados FROM agregados WHERE id = 1').fetchone()
+        if row:
+            return AgregadosCarteira.de_dict(json.loads(row[0]))
+
+        # Primeira execução (ou banco importado): calcula uma vez e persiste
+        agregados = AgregadosCarteira()
+        cols = ", ".join(COLUNAS_TRADE)
+        for row in conn.execute(f'SELECT {cols} FROM trades ORDER BY id'):
+            agregados.aplicar_compra(_trade_para_dict(row))
+        for row in conn.execute(f'SELECT {cols} FROM trades WHERE preco_venda IS NOT NULL '
+                                'ORDER BY data_hora_venda, id'):
+            agregados.aplicar_venda(_trade_para_dict(row))
+        with conn:
+            self._gravar_agregados(conn, agregados)
+        return agregados
+
+    @staticmethod
+    def _gravar_agregados(conn, agregados):
+        conn.execute('INSERT OR REPLACE INTO agregados (id, dados) VALUES (1, ?)',
+                     (json.dumps(agregados.para_dict(), ensure_ascii=False),))
+
+    def registrar_compra(self, jogador, preco_compra, plataforma):
+        self.carregar()
+        preco_limpo = limpar_preco(preco_compra)
+        data_hora = agora_str()
+        conn = self.banco.conexao()
+        with self._lock:
+            try:
+                with conn:
+                    cursor = conn.execute(
+                        'INSERT INTO trades (data_hora_compra, jogador, jogador_norm, plataforma, preco_compra) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (data_hora, jogador, normalizar_nome(jogador), plataforma, preco_limpo),
+                    )
+                    posicao = {
+                        'trade_id': cursor.lastrowid, 'data_hora_compra': data_hora, 'jogador': jogador,
+                        'plataforma': plataforma, 'preco_compra': preco_limpo,
+                        'data_hora_venda': None, 'preco_venda': None, 'lucro_liquido': None,
+                    }
+                    self._agregados.aplicar_compra(posicao)
+                    self._gravar_agregados(conn, self._agregados)
+            except sqlite3.Error:
+                self._agregados = self._ler_agregados()
+                raise
+        return posicao
+
+    def registrar_venda(self, jogador, preco_venda, plataforma):
+        self.carregar()
+        preco_limpo = limpar_preco(preco_venda)
+        conn = self.banco.conexao()
+        with self._lock:
+            try:
+                with conn:
+                    row = conn.execute(
+                        f'SELECT {", ".join(COLUNAS_TRADE)} FROM trades '
+                        'WHERE jogador_norm = ? AND plataforma = ? AND preco_venda IS NULL ORDER BY id LIMIT 1',
+                        (normalizar_nome(jogador), plataforma),
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    posicao = _trade_para_dict(row)
+                    posicao['data_hora_venda'] = agora_str()
+                    posicao['preco_venda'] = preco_limpo
+                    posicao['lucro_liquido'] = calcular_lucro_liquido(posicao['preco_compra'], preco_limpo)
+                    conn.execute(
+                        'UPDATE trades SET data_hora_venda = ?, preco_venda = ?, lucro_liquido = ? WHERE id = ?',
+                        (posicao['data_hora_venda'], preco_limpo, posicao['lucro_liquido'], posicao['trade_id']),
+                    )
+                    self._agregados.aplicar_venda(posicao)
+                    self._gravar_agregados(conn, self._agregados)
+            except sqlite3.Error:
+                self._agregados = self._ler_agregados()
+                raise
+        return posicao
+
+    def abertas(self):
+        rows = self.banco.conexao().execute(
+            f'SELECT {", ".join(COLUNAS_TRADE)} FROM trades WHERE preco_venda IS NULL ORDER BY id DESC'
+        ).fetchall()
+        return [_trade_para_dict(row) for row in rows]
+
+    def iterar_trades(self):
+        cursor = self.banco.conexao().execute(f'SELECT {", ".join(COLUNAS_TRADE)} FROM trades ORDER BY id')
+        for row in cursor:
+            yield _trade_para_dict(row)
+
+    def abertas_do_jogador(self, jogador, plataforma):
+        rows = self.banco.conexao().execute(
+            f'SELECT {", ".join(COLUNAS_TRADE)} FROM trades '
+            'WHERE jogador_norm = ? AND plataforma = ? AND preco_venda IS NULL ORDER BY id',
+            (normalizar_nome(jogador), plataforma),
+        ).fetchall()
+        return [_trade_para_dict(row) for row in rows]
+
+    def resumo_fechadas(self, n=5):
+        resumo = self.agregados()
+        return resumo['pnl_total'], resumo['ultimas_fechadas'][:n]
+
+    def agregados(self):
+        self.carregar()
+        with self._lock:
+            return self._agregados.resumo()
+
+    def salvar_snapshot(self):
+        """Os agregados já são persistidos a cada trade."""
+
+
+# ===================================================
+# IMPORTADOR CSV -> SQLITE (STREAMING, EM LOTES)
+# ===================================================
+
+def _em_lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def importar_historico(banco, caminho_csv, lote=5000):
+    """Copia o CSV de preços para a tabela `historico`, um lote por transação.
+
+    Só importa numa tabela vazia (importar de novo duplicaria todos os
+    registros): se já houver dados, levanta ValueError.
+    """
+    def linhas():
+        with open(caminho_csv, 'r', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                try:
+                    preco = int(row.get('preco_moedas') or 0)
+                except ValueError:
+                    continue
+                jogador = row.get('jogador', '')
+                yield (row.get('data_hora', ''), jogador, normalizar_nome(jogador), preco, row.get('plataforma') or '')
+
+    conn = banco.conexao()
+    if conn.execute('SELECT 1 FROM historico LIMIT 1').fetchone():
+        raise ValueError(f"{banco.caminho}: a tabela de histórico já tem dados; importe num banco novo.")
+    total = 0
+    for bloco in _em_lotes(linhas(), lote):
+        with conn:
+            conn.executemany(
+                'INSERT INTO historico (data_hora, jogador, jogador_norm, preco_moedas, plataforma) '
+                'VALUES (?, ?, ?, ?, ?)',
+                bloco,
+            )
+        total += len(bloco)
+    return total
+
+
+def importar_carteira(banco, caminho_csv, lote=5000):
+    """Copia a carteira (ledger de eventos ou formato legado) para a tabela `trades`, que deve estar vazia.
+
+    Os ids do ledger viram os ids dos trades, então importar por cima de
+    trades existentes os sobrescreveria: nesse caso levanta ValueError.
+    """
+    conn = banco.conexao()
+    if conn.execute('SELECT 1 FROM trades LIMIT 1').fetchone():
+        raise ValueError(f"{banco.caminho}: a tabela de trades já tem dados; importe num banco novo.")
+    total = 0
+    with open(caminho_csv, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        legado = reader.fieldnames == CARTEIRA_HEADERS_LEGADO
+        for bloco in _em_lotes(reader, lote):
+            with conn:
+                for row in bloco:
+                    try:
+                        if legado:
+                            vendido = bool(row.get('preco_venda', '').strip())
+                            conn.execute(
+                                'INSERT INTO trades (data_hora_compra, jogador, jogador_norm, plataforma, preco_compra, '
+                                'data_hora_venda, preco_venda, lucro_liquido) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (row['data_hora_compra'], row['jogador'], normalizar_nome(row['jogador']),
+                                 row['plataforma'], int(row['preco_compra']),
+                                 row['data_hora_compra'] if vendido else None,
+                                 int(row['preco_venda']) if vendido else None,
+                                 int(row['lucro_liquido']) if vendido else None),
+                            )
+                        elif row['evento'] == 'COMPRA':
+                            conn.execute(
+                                'INSERT INTO trades (id, data_hora_compra, jogador, jogador_norm, plataforma, '
+                                'preco_compra) VALUES (?, ?, ?, ?, ?, ?)',
+                                (int(row['trade_id']), row['data_hora'], row['jogador'],
+                                 normalizar_nome(row['jogador']), row['plataforma'], int(row['preco'])),
+                            )
+                        elif row['evento'] == 'VENDA':
+                            conn.execute(
+                                'UPDATE trades SET data_hora_venda = ?, preco_venda = ?, lucro_liquido = ? WHERE id = ?',
+                                (row['data_hora'], int(row['preco']), int(row['lucro_liquido']), int(row['trade_id'])),
+                            )
+                    except (KeyError, ValueError, sqlite3.IntegrityError):
+                        continue  # linha inválida ou trade_id repetido no arquivo
+                    total += 1
+    # Força o recálculo dos agregados na próxima abertura
+    with conn:
+        conn.execute('DELETE FROM agregados')
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra os CSVs do bot para o banco SQLite.")
+    parser.add_argument('--db', default=os.environ.get('SQLITE_DB_FILE', SQLITE_DB_FILE))
+    parser.add_argument('--historico', default=HISTORICO_FILE)
+    parser.add_argument('--carteira', default=CARTEIRA_FILE)
+    parser.add_argument('--lote', type=int, default=5000, help='linhas por transação')
+    args = parser.parse_args()
+
+    banco = BancoSQLite(args.db)
+    if os.path.exists(args.historico):
+        try:
+            print(f"Histórico: {importar_historico(banco, args.historico, args.lote)} registros importados.")
+        except ValueError as e:
+            print(f"Histórico não importado: {e}")
+    if os.path.exists(args.carteira):
+        try:
+            print(f"Carteira: {importar_carteira(banco, args.carteira, args.lote)} linhas importadas.")
+        except ValueError as e:
+            print(f"Carteira não importada: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark de partida a frio (cold start).
+
+Para cada tamanho de histórico (um usuário com N linhas no CSV), sobe um
+processo novo do bot contra uma Bot API falsa local e mede:
+
+- import: tempo do `import monitor`, que não deve importar o python-telegram-bot
+  (se importar, o benchmark termina com erro);
+- PTB: quanto o import do python-telegram-bot, adiado para o build_application, custa depois;
+- pronto: até a Application estar inicializada (dados de inicialização carregados);
+- resposta: até a primeira resposta chegar à API (a partir do início do processo);
+- memória: pico de RSS do processo.
+
+A primeira interação pode ser `start` (/start, sem dados), `recentes` (última
+página do histórico), `historico` (/historico, lista de jogadores) ou `preco`
+(o usuário estava no meio de um registro de preço antes do reinício e manda
+o valor: sessão restaurada, gravação e Dica de Trade). Os CSVs gerados
+ficam em cache em --dir para as próximas execuções.
+
+Uso:
+    python benchmarks/bench_cold_start.py --linhas 10000,1000000,10000000
+    python benchmarks/bench_cold_start.py --linhas 10000 --interacoes start,recentes
+    python benchmarks/bench_cold_start.py --backend binario
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+USER_ID = 4242
+JOGADOR = 'Jogador 0007'
+PLATAFORMAS = ['PlayStation 🎮', 'Xbox 💚', 'PC 💻']
+
+
+def gerar_dados(pasta, linhas, backend='csv', jogadores=500, semente=1):
+    """DATA_DIR com o histórico de um usuário (N linhas) e os arquivos de uma execução anterior."""
+    from comum import HISTORICO_FILE, HISTORICO_HEADERS
+    from usuarios import pasta_usuario
+
+    pasta_dados = pasta_usuario(USER_ID, pasta)
+    caminho = os.path.join(pasta_dados, HISTORICO_FILE)
+    if backend == 'binario':
+        from historico_binario import HISTORICO_BIN_FILE, csv_para_binario
+        caminho_bin = os.path.join(pasta_dados, HISTORICO_BIN_FILE)
+        if not os.path.exists(caminho_bin):
+            gerar_dados(pasta, linhas, 'csv', jogadores, semente)
+            csv_para_binario(caminho, caminho_bin)
+        return
+    if os.path.exists(caminho):
+        return
+    os.makedirs(pasta_dados, exist_ok=True)
+    rnd = random.Random(semente)
+    nomes = [f"Jogador {i:04d}" for i in range(jogadores)]
+    inicio = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, 0))
+    with open(caminho + '.tmp', 'w', encoding='utf-8', newline='') as file:
+        file.write(','.join(HISTORICO_HEADERS) + '\n')
+        bloco = []
+        for i in range(linhas):
+            data = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(inicio + i * 30))
+            bloco.append(f"{data},{rnd.choice(nomes)},{rnd.randint(1000, 2000000)},{rnd.choice(PLATAFORMAS)}\n")
+            if len(bloco) >= 100000:
+                file.writelines(bloco)
+                bloco = []
+        file.writelines(bloco)
+    os.replace(caminho + '.tmp', caminho)
+    # Índices globais já montados, como num reinício
+    with open(os.path.join(pasta, 'jogadores.txt'), 'w', encoding='utf-8') as file:
+        file.writelines(nome + '\n' for nome in nomes)
+    with open(os.path.join(pasta, 'watchlist.json'), 'w', encoding='utf-8') as file:
+        file.write('[]')
+
+
+def update_interacao(interacao):
+    from bench_webhook import BOT_USER
+
+    usuario = {'id': USER_ID, 'is_bot': False, 'first_name': 'Bench'}
+    chat = {'id': USER_ID, 'type': 'private'}
+    agora = int(time.time())
+    if interacao == 'preco':
+        return {'update_id': 1, 'message': {
+            'message_id': 1, 'date': agora, 'chat': chat, 'from': usuario, 'text': '150000',
+        }}
+    if interacao == 'recentes':
+        return {'update_id': 1, 'callback_query': {
+            'id': '1', 'from': usuario, 'chat_instance': '1', 'data': 'MENU:RECENTES',
+            'message': {'message_id': 1, 'date': agora, 'chat': chat, 'from': BOT_USER, 'text': 'menu'},
+        }}
+    comando = f"/{interacao}"
+    return {'update_id': 1, 'message': {
+        'message_id': 1, 'date': agora, 'chat': chat, 'from': usuario, 'text': comando,
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(comando)}],
+    }}
+
+
+async def filho(pasta, backend, interacao, inicio):
+    """Roda dentro do processo medido; imprime os tempos em JSON."""
+    os.environ['DATA_DIR'] = pasta
+    os.environ['STORAGE_BACKEND'] = backend
+    os.environ['PRICE_POLLING'] = '0'
+    if interacao == 'preco':
+        # Registro de preço em andamento (WAITING_FOR_PRICE, PlayStation, PREÇO) salvo antes do reinício
+        with open(os.path.join(pasta, 'sessoes.json'), 'w', encoding='utf-8') as file:
+            json.dump({str(USER_ID): [3, JOGADOR, 0, 0, int(time.time())]}, file)
+    t = time.perf_counter()
+    import monitor
+    tempo_import = time.perf_counter() - t
+    telegram_no_import = 'telegram' in sys.modules
+    t = time.perf_counter()
+    from telegram import Update
+    from telegram.ext import Application  # noqa: F401
+    tempo_telegram = time.perf_counter() - t
+
+    from bench_webhook import BotAPIFalsa
+
+    api = BotAPIFalsa()
+    api.esperadas = 1
+    api.iniciar()
+    application = monitor.build_application('123456:TESTE', base_url=f"http://127.0.0.1:{api.porta}/bot")
+    await application.initialize()
+    await monitor.iniciar_armazenamento(application)
+    pronto = time.time() - inicio
+
+    await application.process_update(Update.de_json(update_interacao(interacao), application.bot))
+    api.concluido.wait(600)
+    resposta = time.time() - inicio
+
+    await monitor.parar_armazenamento(application)
+    await application.shutdown()
+    api.parar()
+    print(json.dumps({
+        'import_s': tempo_import, 'telegram_s': tempo_telegram, 'telegram_no_import': telegram_no_import,
+        'pronto_s': pronto, 'resposta_s': resposta,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def medir(pasta, backend, interacao):
+    inicio = time.time()
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--filho', pasta, backend, interacao, str(inicio)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', default='10000,1000000,10000000', help="tamanhos do histórico")
+    parser.add_argument('--interacoes', default='start,recentes,historico,preco')
+    parser.add_argument('--backend', default='csv', choices=['csv', 'binario', 'sqlite'],
+                        help="STORAGE_BACKEND do bot (sqlite: histórico vazio)")
+    parser.add_argument('--dir', default=os.path.join(tempfile.gettempdir(), 'bench_cold_start'),
+                        help="onde os históricos gerados ficam guardados")
+    parser.add_argument('--filho', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        pasta, backend, interacao, inicio = args.filho
+        asyncio.run(filho(pasta, backend, interacao, float(inicio)))
+        return
+
+    print(f"{'linhas':>10} {'interação':>10} {'import':>8} {'PTB':>7} {'pronto':>8} {'resposta':>9} {'RSS':>8}")
+    regressao = False
+    for linhas in (int(n) for n in args.linhas.split(',')):
+        pasta = os.path.join(args.dir, str(linhas))
+        gerar_dados(pasta, linhas, args.backend)
+        for interacao in args.interacoes.split(','):
+            r = medir(pasta, args.backend, interacao)
+            regressao |= r['telegram_no_import']
+            print(f"{linhas:>10} {interacao:>10} {r['import_s']:>7.2f}s {r['telegram_s']:>6.2f}s "
+                  f"{r['pronto_s']:>7.2f}s {r['resposta_s']:>8.2f}s {r['rss_mb']:>6.0f}MB")
+    if regressao:
+        print("ERRO: `import monitor` voltou a importar o python-telegram-bot (o import deixou de ser preguiçoso).")
+        sys.exit(1)
+    print("O import do python-telegram-bot (coluna PTB) fica fora do `import monitor`: é pago no build_application.")
+
+
+if __name__ == '__main__':
+    main()
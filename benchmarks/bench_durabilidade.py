@@ -0,0 +1,132 @@
+"""Vazão de gravação (escritas/s) com e sem fsync, e o efeito do group commit.
+
+Cada configuração roda num processo novo, com um DATA_DIR vazio, gravando
+registros de preço de `--usuarios` usuários (registrar_historico):
+
+- direto: chamadas diretas, uma de cada vez (com fsync, cada uma faz o seu);
+- fila xN: pela fila do ArmazenamentoAssincrono, com N escritas concorrentes
+  (como N handlers); com fsync, cada grupo de escritas divide um fsync por
+  arquivo (group commit).
+
+Cada uma com fsync desligado (DURABLE_WRITES=0) e ligado. Mostra escritas/s,
+latência até a confirmação (p50/p99) e fsyncs por escrita. Rode numa pasta
+do disco de verdade (`--dir`): em tmpfs o fsync não custa nada. Para ver o
+comportamento num disco mais lento que o da máquina (HD, volume de rede),
+`--fsync-extra-ms` soma um atraso a cada fsync.
+
+Uso:
+    python benchmarks/bench_durabilidade.py --escritas 2000 --dir ./tmp_bench
+    python benchmarks/bench_durabilidade.py --fsync-extra-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PLATAFORMA = 'PlayStation 🎮'
+# Escritas concorrentes na fila (0 = chamadas diretas, sem a fila)
+CONCORRENCIAS = [0, 1, 8, 64]
+
+
+def filho(pasta, fsync, concorrencia, escritas, usuarios, extra_ms):
+    os.environ['DATA_DIR'] = pasta
+    os.environ['PRICE_POLLING'] = '0'
+    os.environ['DURABLE_WRITES'] = '1' if fsync else '0'
+    import monitor
+    from durabilidade import COMMIT
+
+    if extra_ms:
+        fsync_original = os.fsync
+
+        def fsync_lento(fd):
+            fsync_original(fd)
+            time.sleep(extra_ms / 1000)
+        os.fsync = fsync_lento
+
+    tempos = []
+
+    def argumentos(i):
+        return (1000 + i % usuarios, f"Jogador {i % 50}", 1000 + i, PLATAFORMA)
+
+    # Aquecimento: cria os arquivos e carrega os usuários fora da medição
+    for i in range(usuarios):
+        monitor.registrar_historico(*argumentos(i))
+
+    async def medir():
+        await monitor.ARMAZENAMENTO.iniciar()
+        fila = iter(range(escritas))
+
+        async def trabalhador():
+            for i in fila:
+                inicio = time.perf_counter()
+                await monitor.ARMAZENAMENTO.escrever(monitor.registrar_historico, *argumentos(i))
+                tempos.append(time.perf_counter() - inicio)
+
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        await monitor.ARMAZENAMENTO.parar()
+
+    grupos = COMMIT.grupos
+    inicio = time.perf_counter()
+    if concorrencia:
+        asyncio.run(medir())
+    else:
+        for i in range(escritas):
+            t = time.perf_counter()
+            monitor.registrar_historico(*argumentos(i))
+            tempos.append(time.perf_counter() - t)
+    total = time.perf_counter() - inicio
+    tempos.sort()
+    print(json.dumps({
+        'escritas_s': escritas / total,
+        'p50_ms': statistics.median(tempos) * 1000,
+        'p99_ms': tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))] * 1000,
+        # Sem a fila, cada escrita sincroniza na hora (não passa pelos grupos)
+        'fsync_por_escrita': (COMMIT.grupos - grupos) / escritas if concorrencia else float(fsync),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escritas', type=int, default=2000)
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--dir', help="pasta onde os dados temporários são criados (padrão: a do sistema)")
+    parser.add_argument('--fsync-extra-ms', type=float, default=0, help="atraso somado a cada fsync")
+    parser.add_argument('--filho', nargs=6, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        pasta, fsync, concorrencia, escritas, usuarios, extra_ms = args.filho
+        filho(pasta, fsync == '1', int(concorrencia), int(escritas), int(usuarios), float(extra_ms))
+        return
+
+    print(f"{args.escritas} escritas em {args.usuarios} usuários"
+          + (f" (fsync + {args.fsync_extra_ms:g} ms)" if args.fsync_extra_ms else ""))
+    print(f"  {'configuração':<20} {'escritas/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'fsyncs/escrita':>15}")
+    for fsync in (False, True):
+        for concorrencia in CONCORRENCIAS:
+            nome = f"{'com' if fsync else 'sem'} fsync, " + (f"fila x{concorrencia}" if concorrencia else "direto")
+            pasta = tempfile.mkdtemp(prefix='bench_durabilidade_', dir=args.dir)
+            try:
+                saida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--filho', pasta, '1' if fsync else '0',
+                     str(concorrencia), str(args.escritas), str(args.usuarios), str(args.fsync_extra_ms)],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+            finally:
+                shutil.rmtree(pasta, ignore_errors=True)
+            r = json.loads(saida.strip().splitlines()[-1])
+            print(f"  {nome:<20} {r['escritas_s']:>11.0f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                  f"{r['fsync_por_escrita']:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Benchmark da fila de envio: broadcast de alertas + respostas interativas.
+
+Sobe uma Bot API falsa que aplica limites de flood como os do Telegram
+(por chat: rajada de 3 e depois 1 mensagem/s; global: 30 mensagens/s;
+acima disso responde 429 com retry_after) e, enquanto um lote de alertas
+para vários chats é entregue, manda respostas interativas para chats
+aleatórios. Compara:
+
+- direto: cada texto vira um send_message na hora, sem limitador; num 429 o
+  chamador espera o retry_after e tenta de novo (até 3 vezes);
+- fila: Notificador + LimitadorEnvio (os alertas do mesmo chat são juntados
+  e as respostas passam na frente).
+
+Mede quantas mensagens chegaram à API, quantos 429 houve, quantos alertas
+foram entregues, o tempo até o lote todo chegar e a latência das respostas.
+
+Uso:
+    python benchmarks/bench_envio.py --alertas 2000 --chats 200 --respostas 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_webhook import TOKEN, BotAPIFalsa, LimiteExcedido  # noqa: E402
+from limitador import BaldeTokens, LimitadorEnvio  # noqa: E402
+from notificacoes import Notificador  # noqa: E402
+
+
+class APIComLimites(BotAPIFalsa):
+    """Bot API falsa que responde 429 quando um chat ou o bot todo passa do limite."""
+
+    def __init__(self, retry_after=1, latencia=0.0):
+        super().__init__(latencia)
+        self.retry_after = retry_after
+        self.mensagens = 0
+        self.erros_429 = 0
+        self.alertas = 0
+        self.todos_alertas = threading.Event()
+        self.alertas_esperados = None
+        self._global = BaldeTokens(30, 30)
+        self._chats = {}
+
+    def tratar(self, metodo, params):
+        if metodo != 'sendMessage':
+            return super().tratar(metodo, params)
+        chat_id = int(params.get('chat_id') or 0)
+        agora = time.monotonic()
+        with self._lock:
+            balde = self._chats.setdefault(chat_id, BaldeTokens(1, 3, agora))
+            if self._global.espera(agora) > 0 or balde.espera(agora) > 0:
+                self.erros_429 += 1
+                raise LimiteExcedido(self.retry_after)
+            self._global.consumir(agora)
+            balde.consumir(agora)
+            self.mensagens += 1
+            self.alertas += params.get('text', '').count('alerta #')
+            if self.alertas_esperados and self.alertas >= self.alertas_esperados:
+                self.todos_alertas.set()
+        return super().tratar(metodo, params)
+
+
+async def enviar_direto(bot, chat_id, texto, tentativas=3):
+    from telegram.error import RetryAfter
+
+    for tentativa in range(tentativas):
+        try:
+            return await bot.send_message(chat_id=chat_id, text=texto)
+        except RetryAfter as e:
+            if tentativa == tentativas - 1:
+                return None
+            espera = e.retry_after
+            await asyncio.sleep(espera.total_seconds() if hasattr(espera, 'total_seconds') else espera)
+
+
+async def rodar(modo, args):
+    from telegram import Bot
+    from telegram.ext import ExtBot
+    from telegram.request import HTTPXRequest
+
+    rnd = random.Random(1)
+    api = APIComLimites(args.retry_after)
+    api.alertas_esperados = args.alertas
+    api.iniciar()
+    base_url = f"http://127.0.0.1:{api.porta}/bot"
+    request = HTTPXRequest(connection_pool_size=256)
+    if modo == 'fila':
+        bot = ExtBot(TOKEN, base_url=base_url, request=request, rate_limiter=LimitadorEnvio())
+    else:
+        bot = Bot(TOKEN, base_url=base_url, request=request)
+    await bot.initialize()
+
+    notificador = Notificador()
+    pendentes = []
+    inicio = time.perf_counter()
+    if modo == 'fila':
+        notificador.iniciar(bot)
+        for i in range(args.alertas):
+            notificador.notificar(rnd.randint(1, args.chats), f"🔔 alerta #{i}")
+    else:
+        pendentes = [
+            asyncio.create_task(enviar_direto(bot, rnd.randint(1, args.chats), f"🔔 alerta #{i}"))
+            for i in range(args.alertas)
+        ]
+
+    async def responder(chat_id):
+        t = time.perf_counter()
+        if modo == 'fila':
+            await bot.send_message(chat_id=chat_id, text='resposta')
+        else:
+            await enviar_direto(bot, chat_id, 'resposta')
+        return time.perf_counter() - t
+
+    respostas = []
+    for _ in range(args.respostas):
+        respostas.append(asyncio.create_task(responder(rnd.randint(1, args.chats))))
+        await asyncio.sleep(args.intervalo)
+    latencias = await asyncio.gather(*respostas)
+    await asyncio.gather(*pendentes)
+    loop = asyncio.get_running_loop()
+    entregue = await loop.run_in_executor(None, api.todos_alertas.wait, args.timeout)
+    lote = time.perf_counter() - inicio
+    await notificador.parar(espera=0)
+    await bot.shutdown()
+    api.parar()
+
+    latencias.sort()
+    print(f"\n{modo}")
+    print(f"  mensagens enviadas        {api.mensagens:8d}")
+    print(f"  respostas 429             {api.erros_429:8d}")
+    print(f"  alertas entregues         {api.alertas:8d} de {args.alertas}")
+    print(f"  lote completo             {'%7.1fs' % lote if entregue else '   não'}")
+    print(f"  resposta p50 / p95 / máx  {statistics.median(latencias) * 1000:6.0f} / "
+          f"{latencias[int(len(latencias) * 0.95) - 1] * 1000:.0f} / {latencias[-1] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--alertas', type=int, default=2000)
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--respostas', type=int, default=50)
+    parser.add_argument('--intervalo', type=float, default=0.05, help="entre uma resposta e outra (s)")
+    parser.add_argument('--retry-after', type=int, default=1, help="retry_after dos 429 da API falsa")
+    parser.add_argument('--timeout', type=float, default=30, help="espera máxima pelo lote (s)")
+    parser.add_argument('--modos', default='direto,fila')
+    args = parser.parse_args()
+    for modo in args.modos.split(','):
+        asyncio.run(rodar(modo, args))
+
+
+if __name__ == '__main__':
+    main()
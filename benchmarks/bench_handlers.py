@@ -0,0 +1,125 @@
+"""Benchmark de latência dos handlers sob updates concorrentes.
+
+Dispara centenas de updates simulados (registro de preço, COMPRA, VENDA e
+/carteira) ao mesmo tempo contra os handlers de `monitor.py`, com os dados
+num diretório temporário, e reporta p50/p99 por tipo de update.
+
+Uso:
+    python benchmarks/bench_handlers.py --updates 500 --usuarios 50 --historico 200000
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JOGADORES = [f"Jogador {i}" for i in range(500)]
+
+
+class MensagemFalsa:
+    """Imita o `Message` do telegram o suficiente para os handlers."""
+
+    def __init__(self, text=''):
+        self.text = text
+        self.respostas = 0
+
+    async def reply_text(self, *args, **kwargs):
+        self.respostas += 1
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.respostas += 1
+
+
+def update_falso(user_id, texto='', callback=False):
+    mensagem = MensagemFalsa(texto)
+    return SimpleNamespace(
+        message=None if callback else mensagem,
+        callback_query=mensagem if callback else None,
+        effective_user=SimpleNamespace(id=user_id),
+    )
+
+
+def gerar_historico(caminho, linhas, headers):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        for i in range(linhas):
+            writer.writerow([f"2025-01-01 00:{i % 60:02d}:00", random.choice(JOGADORES),
+                             random.randint(1000, 2_000_000), 'PS'])
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def simular(monitor, usuarios, updates):
+    """Cria updates concorrentes e mede o tempo de cada handler."""
+    contextos = [SimpleNamespace(user_data={}) for _ in range(usuarios)]
+    latencias = {}
+
+    async def um_update(i):
+        user_id = i % usuarios
+        context = contextos[user_id]
+        tipo = random.choice(['PREÇO', 'PREÇO', 'COMPRA', 'VENDA', 'CARTEIRA'])
+        if tipo == 'CARTEIRA':
+            update = update_falso(user_id, callback=True)
+            handler = monitor.carteira_command
+        else:
+            context.user_data.update({
+                'flow_state': 'WAITING_FOR_PRICE',
+                'temp_player_name': random.choice(JOGADORES[:50]),
+                'temp_platform': 'PS',
+                'temp_action': tipo,
+            })
+            update = update_falso(user_id, str(random.randint(1000, 2_000_000)))
+            handler = monitor.handle_message_flow
+        inicio = time.perf_counter()
+        await handler(update, context)
+        latencias.setdefault(tipo, []).append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(um_update(i) for i in range(updates)))
+    total = time.perf_counter() - inicio
+    await monitor.ARMAZENAMENTO.escrever(monitor.USUARIOS.fechar_todos)
+    await monitor.ARMAZENAMENTO.parar()
+    return latencias, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=500)
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--historico', type=int, default=100_000, help='linhas pré-existentes no histórico de cada usuário')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        from comum import HISTORICO_FILE, HISTORICO_HEADERS
+        import monitor
+        from usuarios import pasta_usuario
+        for user_id in range(args.usuarios):
+            pasta = pasta_usuario(user_id, monitor.DATA_DIR)
+            gerar_historico(os.path.join(pasta, HISTORICO_FILE), args.historico, HISTORICO_HEADERS)
+
+        latencias, total = asyncio.run(simular(monitor, args.usuarios, args.updates))
+
+    print(f"{args.updates} updates concorrentes, {args.usuarios} usuários, histórico de {args.historico} linhas por usuário")
+    print(f"{'tipo':<10}{'n':>6}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    todas = []
+    for tipo, valores in sorted(latencias.items()):
+        todas.extend(valores)
+        print(f"{tipo:<10}{len(valores):>6}{percentil(valores, 0.5) * 1000:>12.2f}{percentil(valores, 0.99) * 1000:>12.2f}")
+    print(f"{'TOTAL':<10}{len(todas):>6}{percentil(todas, 0.5) * 1000:>12.2f}{percentil(todas, 0.99) * 1000:>12.2f}")
+    print(f"Vazão: {args.updates / total:.0f} updates/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark: histórico em CSV x formato binário (memmap).
+
+Gera um CSV sintético com N linhas, converte para o formato binário e mede,
+nos dois formatos: tamanho em disco, primeira consulta de um jogador (o CSV
+monta o índice inteiro; o binário mapeia o arquivo e monta a tabela de
+offsets), consultas seguintes (últimos registros, página de histórico,
+estatísticas da Dica de Trade) e quanto a memória residente do processo
+cresceu com a primeira consulta (Linux).
+
+Uso:
+    python benchmarks/bench_historico_binario.py --linhas 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analise import AnaliseJogadores  # noqa: E402
+from comum import HISTORICO_HEADERS  # noqa: E402
+from historico import HistoricoStore  # noqa: E402
+from historico_binario import HistoricoBinario, csv_para_binario, binario_para_csv  # noqa: E402
+
+PLATAFORMAS = ['PlayStation 🎮', 'Xbox 💚', 'PC 💻']
+
+
+def gerar_csv(caminho, linhas, jogadores, semente=1):
+    rnd = random.Random(semente)
+    nomes = [f"Jogador {i:05d}" for i in range(jogadores)]
+    inicio = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, 0))
+    with open(caminho, 'w', encoding='utf-8', newline='') as file:
+        file.write(','.join(HISTORICO_HEADERS) + '\n')
+        bloco = []
+        for i in range(linhas):
+            data = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(inicio + i * 30))
+            bloco.append(f"{data},{rnd.choice(nomes)},{rnd.randint(1000, 2000000)},{rnd.choice(PLATAFORMAS)}\n")
+            if len(bloco) >= 100000:
+                file.writelines(bloco)
+                bloco = []
+        file.writelines(bloco)
+    return nomes
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def memoria_residente_mb():
+    """RSS atual (lido de /proc; None fora do Linux)."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def latencia_ms(funcao, argumentos):
+    tempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def medir(nome, historico, fonte_jogador, jogadores, consultas):
+    rnd = random.Random(7)
+    amostra = [rnd.choice(jogadores) for _ in range(consultas)]
+    antes = memoria_residente_mb()
+    primeira, _ = cronometrar(historico.ultimos, amostra[0], 5)
+    depois = memoria_residente_mb()
+    memoria = depois - antes if antes is not None else float('nan')
+
+    analise = AnaliseJogadores(historico.series, fonte_jogador=fonte_jogador)
+    primeira_dica, _ = cronometrar(analise.resumo, amostra[0])
+    resultados = {
+        'primeira consulta (s)': primeira,
+        'memória residente +(MB)': memoria,
+        'últimos 5 (ms)': latencia_ms(historico.ultimos, [(j, 5) for j in amostra]),
+        'página do jogador (ms)': latencia_ms(historico.pagina_jogador, [(j, 10) for j in amostra]),
+        'página recentes (ms)': latencia_ms(historico.pagina_recentes, [(10,)] * consultas),
+        'primeira dica (s)': primeira_dica,
+        'dica, outros jogadores (ms)': latencia_ms(analise.resumo, [(j,) for j in amostra]),
+    }
+    print(f"\n{nome}")
+    for chave, valor in resultados.items():
+        print(f"  {chave:<28} {valor:10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--jogadores', type=int, default=2000)
+    parser.add_argument('--consultas', type=int, default=200)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='bench_binario_')
+    try:
+        caminho_csv = os.path.join(pasta, 'historico.csv')
+        caminho_bin = os.path.join(pasta, 'historico.bin')
+        jogadores = gerar_csv(caminho_csv, args.linhas, args.jogadores)
+        tempo, total = cronometrar(csv_para_binario, caminho_csv, caminho_bin)
+        print(f"{total} linhas | CSV -> binário em {tempo:.2f}s")
+        tempo, _ = cronometrar(binario_para_csv, caminho_bin, os.path.join(pasta, 'volta.csv'))
+        print(f"binário -> CSV em {tempo:.2f}s")
+        print(f"Tamanho: CSV {os.path.getsize(caminho_csv) / 1e6:.1f} MB | "
+              f"binário {os.path.getsize(caminho_bin) / 1e6:.1f} MB")
+
+        medir("CSV (HistoricoStore)", HistoricoStore(caminho_csv), None, jogadores, args.consultas)
+        binario = HistoricoBinario(caminho_bin)
+        medir("Binário (HistoricoBinario)", binario, binario.series_jogador, jogadores, args.consultas)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
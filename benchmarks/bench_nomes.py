@@ -0,0 +1,93 @@
+"""Benchmark do índice de nomes (busca aproximada).
+
+Gera N nomes sintéticos de cartas (com acentos e variações), indexa e mede
+a latência das buscas com a consulta exata, sem acentos, com erro de
+digitação e só com o prefixo.
+
+Uso:
+    python benchmarks/bench_nomes.py --nomes 50000 --buscas 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indice_nomes import IndiceNomes, dobrar_nome  # noqa: E402
+
+SILABAS = ['ba', 'be', 'bi', 'ca', 'co', 'da', 'de', 'di', 'fa', 'fe', 'ga', 'go', 'ja', 'jo', 'ka', 'ki', 'la',
+           'le', 'li', 'lo', 'ma', 'me', 'mi', 'mo', 'na', 'ne', 'ni', 'no', 'pa', 'pe', 'ra', 're', 'ri', 'ro',
+           'sa', 'se', 'si', 'so', 'ta', 'te', 'ti', 'to', 'va', 'vi', 'za', 'zé', 'lú', 'ní', 'ão', 'ño', 'ül']
+SUFIXOS = ['', '', '', ' Jr.', ' Neto', ' Filho']
+
+
+def gerar_nomes(n, semente=42):
+    """Nomes no formato 'Nome Sobrenome', com acentos e sufixos, todos distintos."""
+    rnd = random.Random(semente)
+
+    def palavra(minimo, maximo):
+        return ''.join(rnd.choice(SILABAS) for _ in range(rnd.randint(minimo, maximo))).capitalize()
+
+    nomes = set()
+    while len(nomes) < n:
+        nomes.add(f"{palavra(2, 3)} {palavra(2, 4)}{rnd.choice(SUFIXOS)}")
+    return sorted(nomes)
+
+
+def com_erro(texto, rnd):
+    if len(texto) < 4:
+        return texto
+    i = rnd.randrange(1, len(texto) - 1)
+    return texto[:i] + texto[i + 1:]  # apaga uma letra
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nomes', type=int, default=50000)
+    parser.add_argument('--buscas', type=int, default=2000)
+    args = parser.parse_args()
+
+    nomes = gerar_nomes(args.nomes)
+    indice = IndiceNomes()
+    inicio = time.perf_counter()
+    for nome in nomes:
+        indice.adicionar(nome)
+    print(f"Indexação: {len(indice)} nomes em {time.perf_counter() - inicio:.2f}s")
+
+    rnd = random.Random(7)
+    variantes = {
+        'exata': lambda n: n,
+        'sem acento': dobrar_nome,
+        'com erro': lambda n: com_erro(dobrar_nome(n), rnd),
+        'prefixo': lambda n: n.split()[0][:4] + ' ' + n.split()[1][:3],
+    }
+    for rotulo, variante in variantes.items():
+        latencias, acertos = [], 0
+        # No prefixo vários nomes servem; conta como acerto se a primeira sugestão começa igual
+        prefixo = rotulo == 'prefixo'
+        for _ in range(args.buscas):
+            alvo = rnd.choice(nomes)
+            consulta = variante(alvo)
+            t0 = time.perf_counter()
+            resultado = indice.buscar(consulta)
+            latencias.append((time.perf_counter() - t0) * 1000)
+            if prefixo:
+                acertos += bool(resultado) and all(
+                    any(p.startswith(q) for p in dobrar_nome(resultado[0][0]).split())
+                    for q in dobrar_nome(consulta).split()
+                )
+            else:
+                acertos += any(nome == alvo for nome, _ in resultado)
+        print(f"{rotulo:>10}: p50 {percentil(latencias, 0.5):.3f} ms | p99 {percentil(latencias, 0.99):.3f} ms | "
+              f"{'1ª sugestão compatível' if prefixo else 'alvo no top-5'}: {acertos / args.buscas:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark do motor de preços contra o servidor de fixtures local.
+
+Dispara buscas concorrentes (com muitos nomes repetidos) e mede a latência
+com cache frio e quente, além de quantas requisições chegaram ao "site":
+pedidos simultâneos do mesmo jogador devem virar uma única requisição.
+
+Uso:
+    python benchmarks/bench_precos.py --buscas 2000 --jogadores 100 --latencia 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from precos import FontePrecos, MotorPrecos  # noqa: E402
+from servidor_fixture import ServidorFixture  # noqa: E402
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def rodada(motor, nomes, buscas):
+    latencias = []
+
+    async def uma_busca():
+        nome = random.choice(nomes)
+        plataforma = random.choice(['PS', 'XB', 'PC'])
+        inicio = time.perf_counter()
+        await motor.preco(nome, plataforma)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma_busca() for _ in range(buscas)))
+    return latencias, time.perf_counter() - inicio
+
+
+async def executar(args, url):
+    motor = MotorPrecos([FontePrecos('futbin', url)], ttl=300)
+    nomes = [f"Jogador {i}" for i in range(args.jogadores)]
+    try:
+        resultados = []
+        for etapa in ('frio', 'quente'):
+            latencias, total = await rodada(motor, nomes, args.buscas)
+            resultados.append((etapa, latencias, total))
+    finally:
+        await motor.fechar()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--buscas', type=int, default=2000)
+    parser.add_argument('--jogadores', type=int, default=100)
+    parser.add_argument('--latencia', type=float, default=0.1, help='latência simulada do site (s)')
+    args = parser.parse_args()
+
+    with ServidorFixture(latencia=args.latencia) as fixture:
+        resultados = asyncio.run(executar(args, fixture.url))
+        requisicoes = fixture.requisicoes
+
+    print(f"{args.buscas} buscas por rodada, {args.jogadores} jogadores, latência do site {args.latencia * 1000:.0f} ms")
+    print(f"{'cache':<8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'buscas/s':>12}")
+    for etapa, latencias, total in resultados:
+        print(f"{etapa:<8}{percentil(latencias, 0.5) * 1000:>12.2f}{percentil(latencias, 0.99) * 1000:>12.2f}"
+              f"{len(latencias) / total:>12.0f}")
+    print(f"Requisições ao site: {requisicoes} (máximo sem coalescência: {args.buscas * 2})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Suíte de benchmarks dos caminhos principais, em tamanhos crescentes de dados.
+
+Para cada tamanho (registros no histórico; a carteira tem 1 trade a cada 10
+registros) gera dados sintéticos reprodutíveis (benchmarks/dados_sinteticos.py)
+e, num processo novo, mede as funções de `monitor.py`:
+
+- registrar_historico, get_trade_tip, get_detailed_player_history;
+- registrar_trade_venda, get_open_trades, get_closed_trades_summary;
+- get_portfolio_valuation (a 1ª chamada avalia as posições; as seguintes usam a avaliação guardada).
+
+A primeira chamada de cada função (que carrega índices e estatísticas) é
+reportada à parte; as seguintes dão a vazão (ops/s) e a latência (p50, p95,
+p99). Os resultados vão para uma tabela e para um JSON, que pode ser
+comparado com o de outra execução (--comparar).
+
+Uso:
+    python benchmarks/bench_suite.py --tamanhos 1000,10000,100000,1000000
+    python benchmarks/bench_suite.py --saida depois.json --comparar antes.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+USER_ID = 4242
+SEMENTE = 1
+OPERACOES = (
+    'registrar_historico', 'get_trade_tip', 'get_detailed_player_history',
+    'registrar_trade_venda', 'get_open_trades', 'get_closed_trades_summary', 'get_portfolio_valuation',
+)
+
+
+def preparar(pasta, linhas, backend):
+    """DATA_DIR com os dados sintéticos do tamanho pedido (reaproveitado entre execuções)."""
+    from dados_sinteticos import gerar_usuario
+
+    pronto = os.path.join(pasta, 'pronto')
+    if not os.path.exists(pronto):
+        gerar_usuario(pasta, USER_ID, linhas, max(linhas // 10, 10), semente=SEMENTE, backend=backend)
+        with open(pronto, 'w') as file:
+            file.write(str(linhas))
+    # Cada medição parte da mesma cópia: o que uma execução grava não afeta a próxima
+    copia = tempfile.mkdtemp(prefix='bench_suite_')
+    shutil.copytree(pasta, copia, dirs_exist_ok=True)
+    return copia
+
+
+def estatisticas(tempos):
+    tempos = sorted(tempos)
+    percentil = lambda p: tempos[min(len(tempos) - 1, int(len(tempos) * p))] * 1000  # noqa: E731
+    return {
+        'ops_s': len(tempos) / sum(tempos) if sum(tempos) else float('inf'),
+        'p50_ms': statistics.median(tempos) * 1000,
+        'p95_ms': percentil(0.95),
+        'p99_ms': percentil(0.99),
+        'max_ms': tempos[-1] * 1000,
+    }
+
+
+def medir(chamadas):
+    """Executa as chamadas; retorna (primeira em ms, estatísticas das demais)."""
+    tempos = []
+    for funcao, args in chamadas:
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos[0] * 1000, estatisticas(tempos[1:] or tempos)
+
+
+def filho(pasta, backend, operacoes):
+    """Roda no processo medido: imprime o JSON com os resultados de cada operação."""
+    os.environ['DATA_DIR'] = pasta
+    os.environ['STORAGE_BACKEND'] = backend
+    os.environ['PRICE_POLLING'] = '0'
+    import monitor
+    from dados_sinteticos import MercadoSintetico
+
+    mercado = MercadoSintetico(semente=SEMENTE + 1)
+    rnd = random.Random(SEMENTE)
+    resultados = {}
+
+    def registrar(nome, chamadas):
+        primeira, stats = medir(chamadas)
+        resultados[nome] = {'primeira_ms': primeira, **stats}
+
+    consultas = [(mercado.jogador(), mercado.plataforma()) for _ in range(operacoes)]
+    registrar('get_detailed_player_history', [
+        (monitor.get_detailed_player_history, (USER_ID, nome, 3)) for nome, _ in consultas
+    ])
+    registrar('get_trade_tip', [
+        (monitor.get_trade_tip, (USER_ID, nome, mercado.preco(nome, plataforma), plataforma))
+        for nome, plataforma in consultas
+    ])
+    registrar('registrar_historico', [
+        (monitor.registrar_historico, (USER_ID, nome, mercado.preco(nome, plataforma), plataforma))
+        for nome, plataforma in consultas
+    ])
+    registrar('get_open_trades', [(monitor.get_open_trades, (USER_ID,))] * operacoes)
+    registrar('get_portfolio_valuation', [(monitor.get_portfolio_valuation, (USER_ID,))] * operacoes)
+
+    # Vendas das posições abertas (uma COMPRA nova, fora da medição, quando elas acabam)
+    abertas = [(p['jogador'], p['plataforma']) for p in monitor.get_open_trades(USER_ID)]
+    rnd.shuffle(abertas)
+    vendas = []
+    for i in range(operacoes):
+        if i < len(abertas):
+            nome, plataforma = abertas[i]
+        else:
+            nome, plataforma = consultas[i]
+            monitor.registrar_trade_compra(USER_ID, nome, mercado.preco(nome, plataforma), plataforma)
+        vendas.append((monitor.registrar_trade_venda, (USER_ID, nome, mercado.preco(nome, plataforma), plataforma)))
+    registrar('registrar_trade_venda', vendas)
+    registrar('get_closed_trades_summary', [(monitor.get_closed_trades_summary, (USER_ID,))] * operacoes)
+
+    monitor.USUARIOS.fechar_todos()
+    print(json.dumps(resultados))
+
+
+def rodar_tamanho(pasta_cache, linhas, backend, operacoes):
+    copia = preparar(os.path.join(pasta_cache, f"{backend}-{linhas}"), linhas, backend)
+    try:
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho', copia, backend, str(operacoes)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+    finally:
+        shutil.rmtree(copia, ignore_errors=True)
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def metadados(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'), 'commit': commit, 'python': platform.python_version(),
+        'plataforma': platform.platform(), 'cpus': os.cpu_count(), 'backend': args.backend,
+        'operacoes': args.operacoes, 'semente': SEMENTE,
+    }
+
+
+def imprimir(linhas, resultados, anterior=None):
+    print(f"\n{linhas} registros / {max(linhas // 10, 10)} trades")
+    print(f"  {'operação':<28} {'1ª (ms)':>9} {'ops/s':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}"
+          + ("  p50 x anterior" if anterior else ""))
+    for operacao in OPERACOES:
+        r = resultados[operacao]
+        linha = (f"  {operacao:<28} {r['primeira_ms']:>9.1f} {r['ops_s']:>10.0f} {r['p50_ms']:>9.3f} "
+                 f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+        antes = (anterior or {}).get(operacao)
+        if antes and antes['p50_ms']:
+            linha += f"  {r['p50_ms'] / antes['p50_ms']:>10.2f}x"
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', default='1000,10000,100000,1000000', help="registros no histórico")
+    parser.add_argument('--operacoes', type=int, default=300, help="chamadas medidas por operação")
+    parser.add_argument('--backend', default='csv', choices=['csv', 'binario'])
+    parser.add_argument('--dir', default=os.path.join(tempfile.gettempdir(), 'bench_suite'),
+                        help="onde os dados gerados ficam guardados")
+    parser.add_argument('--saida', default=f"bench_suite_{time.strftime('%Y%m%d-%H%M%S')}.json",
+                        help="arquivo JSON com os resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    parser.add_argument('--filho', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        pasta, backend, operacoes = args.filho
+        filho(pasta, backend, int(operacoes))
+        return
+
+    anterior = {}
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as file:
+            anterior = json.load(file)['resultados']
+    relatorio = {'meta': metadados(args), 'resultados': {}}
+    for linhas in (int(n) for n in args.tamanhos.split(',')):
+        resultados = rodar_tamanho(args.dir, linhas, args.backend, args.operacoes)
+        relatorio['resultados'][str(linhas)] = resultados
+        imprimir(linhas, resultados, anterior.get(str(linhas)))
+        with open(args.saida, 'w', encoding='utf-8') as file:
+            json.dump(relatorio, file, indent=2, ensure_ascii=False)
+    print(f"\nResultados em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
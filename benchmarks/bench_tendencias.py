@@ -0,0 +1,84 @@
+"""Mais buscados: Space-Saving em janela deslizante x contagem exata.
+
+Gera um fluxo de buscas com popularidade desigual (Zipf, como nos dados
+sintéticos) espalhado por uma hora e compara, para a mesma janela:
+
+- exato: um Counter com todos os nomes e um `most_common(5)` a cada consulta;
+- Tendencias: os baldes com Space-Saving de capacidade fixa.
+
+Mostra o custo por busca, o custo por consulta do top-5 (como o menu do
+/start, uma a cada `--consultas-a-cada` buscas), quantos contadores ficam em
+memória e se o top-5 aproximado bate com o exato.
+
+Uso:
+    python benchmarks/bench_tendencias.py --buscas 1000000 --jogadores 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tendencias import CAPACIDADE_PADRAO, Tendencias  # noqa: E402
+
+JANELA = 3600
+
+
+def fluxo(buscas, jogadores, semente):
+    rnd = random.Random(semente)
+    pesos = [1 / (i + 1) ** 1.1 for i in range(jogadores)]
+    nomes = rnd.choices(range(jogadores), weights=pesos, k=buscas)
+    return [(f"Jogador {n}", i * JANELA / buscas) for i, n in enumerate(nomes)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--buscas', type=int, default=1_000_000)
+    parser.add_argument('--jogadores', type=int, default=50_000)
+    parser.add_argument('--capacidade', type=int, default=CAPACIDADE_PADRAO)
+    parser.add_argument('--consultas-a-cada', type=int, default=100)
+    parser.add_argument('--semente', type=int, default=1)
+    args = parser.parse_args()
+
+    eventos = fluxo(args.buscas, args.jogadores, args.semente)
+    consultas = args.buscas // args.consultas_a_cada
+
+    exato = Counter()
+    inicio = time.perf_counter()
+    for nome, _ in eventos:
+        exato[nome] += 1
+    busca_exato = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for _ in range(min(consultas, 200)):
+        top_exato = exato.most_common(5)
+    consulta_exato = (time.perf_counter() - inicio) / min(consultas, 200)
+
+    tendencias = Tendencias(['PS'], janela=JANELA, capacidade=args.capacidade)
+    fim = eventos[-1][1]
+    inicio = time.perf_counter()
+    for nome, agora in eventos:
+        tendencias.buscar(nome, agora=agora)
+    busca_sketch = time.perf_counter() - inicio
+    # Consulta depois de uma busca nova (resultado guardado invalidado), como no uso real
+    inicio = time.perf_counter()
+    for _ in range(consultas):
+        tendencias.buscar(eventos[-1][0], agora=fim)
+        top_sketch = tendencias.mais_buscados(agora=fim)
+    consulta_sketch = (time.perf_counter() - inicio) / consultas
+    contadores = sum(len(b.buscas.contagens) for b in tendencias._janelas[None]._baldes)
+
+    print(f"{args.buscas} buscas de {args.jogadores} jogadores numa janela de {JANELA // 60} min")
+    print(f"  {'':<14} {'µs/busca':>9} {'µs/top-5':>9} {'contadores':>11}")
+    print(f"  {'exato':<14} {busca_exato / args.buscas * 1e6:>9.2f} {consulta_exato * 1e6:>9.1f} {len(exato):>11}")
+    print(f"  {'Space-Saving':<14} {busca_sketch / args.buscas * 1e6:>9.2f} {consulta_sketch * 1e6:>9.1f} "
+          f"{contadores:>11}")
+    print(f"\n  top-5 exato:        {[nome for nome, _ in top_exato]}")
+    print(f"  top-5 Space-Saving: {[nome for nome, _ in top_sketch]}")
+    print(f"  mesma ordem: {'sim' if [n for n, _ in top_exato] == [n for n, _ in top_sketch] else 'não'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Vazão do modo multiprocesso (WORKERS) e custo de mudar o número de trabalhadores.
+
+Sobe a Bot API falsa do bench_webhook e, para cada N em `--trabalhadores`,
+uma Frente com N processos do monitor.py apontando para ela. Os updates
+sintéticos (/start, texto e botões) entram direto na frente, sem polling;
+mede updates/s até todas as respostas chegarem à API falsa. Use bem mais
+usuários que updates por usuário: o limite de envio por chat (1/s) domina
+se cada usuário manda muitos.
+
+Depois, o teste de troca: com `--de` trabalhadores, cada usuário fixa um
+jogador (/fixar), o bot passa para `--para` trabalhadores com updates
+chegando durante a troca, e confere que cada usuário ficou na watchlist de
+exatamente um trabalhador, o dono dele no anel novo. Mostra a fração de
+usuários que mudou de processo e quanto tempo os updates ficaram segurados.
+
+A vazão só cresce com N até o número de núcleos livres da máquina (a API
+falsa e a frente também usam CPU).
+
+Uso:
+    python benchmarks/bench_trabalhadores.py --updates 4000 --usuarios 2000 --trabalhadores 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_webhook import TOKEN, BotAPIFalsa, update_sintetico  # noqa: E402
+from trabalhadores import AnelConsistente, Frente, pasta_trabalhador  # noqa: E402
+
+MONITOR = os.path.join(RAIZ, 'monitor.py')
+
+
+def ambiente(pasta, api):
+    env = dict(os.environ)
+    env.update({
+        'TELEGRAM_BOT_TOKEN': TOKEN,
+        'TELEGRAM_API_URL': f"http://127.0.0.1:{api.porta}/bot",
+        'DATA_DIR': pasta,
+        'PRICE_POLLING': '0',
+        'SEND_PER_SECOND': '100000',
+        'PYTHONUNBUFFERED': '1',
+    })
+    return env
+
+
+def fixar(update_id, user_id):
+    usuario = {'id': user_id, 'is_bot': False, 'first_name': f'U{user_id}'}
+    texto = f'/fixar PS Jogador {user_id}'
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': int(time.time()), 'chat': {'id': user_id, 'type': 'private'},
+        'from': usuario, 'text': texto, 'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+    }}
+
+
+async def esperar_respostas(api, esperadas, espera=300):
+    api.esperadas = esperadas
+    if api.respostas >= esperadas:
+        return True
+    return await asyncio.get_running_loop().run_in_executor(None, api.concluido.wait, espera)
+
+
+def zerar(api):
+    api.respostas = 0
+    api.concluido.clear()
+
+
+async def vazao(pasta, api, trabalhadores, updates, usuarios):
+    frente = Frente(trabalhadores, [sys.executable, MONITOR], pasta, ambiente=ambiente(pasta, api))
+    await frente.iniciar()
+    try:
+        carga = [(user_id, update_sintetico(i, user_id))
+                 for i, user_id in enumerate((random.randint(1, usuarios) for _ in range(updates)), 1)]
+        zerar(api)
+        inicio = time.perf_counter()
+        for user_id, update in carga:
+            frente.encaminhar(user_id, update)
+        concluiu = await esperar_respostas(api, updates)
+        return updates / (time.perf_counter() - inicio), concluiu
+    finally:
+        await frente.parar()
+
+
+async def troca(pasta, api, de, para, usuarios):
+    frente = Frente(de, [sys.executable, MONITOR], pasta, ambiente=ambiente(pasta, api))
+    await frente.iniciar()
+    try:
+        zerar(api)
+        for user_id in range(1, usuarios + 1):
+            frente.encaminhar(user_id, fixar(user_id, user_id))
+        await esperar_respostas(api, usuarios)
+
+        # Updates chegando durante a troca ficam segurados e são entregues depois
+        zerar(api)
+        inicio = time.perf_counter()
+        redimensionando = asyncio.ensure_future(frente.redimensionar(para))
+        for i in range(usuarios):
+            frente.encaminhar(i + 1, update_sintetico(usuarios + i + 1, i + 1))
+            await asyncio.sleep(0)
+        await redimensionando
+        pausa = time.perf_counter() - inicio
+        concluiu = await esperar_respostas(api, usuarios)
+    finally:
+        await frente.parar()
+
+    from agendador import Watchlist
+
+    anel_antigo, anel_novo = AnelConsistente(de), AnelConsistente(para)
+    movidos = sum(anel_antigo.dono(u) != anel_novo.dono(u) for u in range(1, usuarios + 1))
+    erros = 0
+    listas = []
+    for numero in range(para):
+        watchlist = Watchlist(os.path.join(pasta_trabalhador(pasta, numero), 'watchlist.json'))
+        watchlist.carregar()
+        listas.append(watchlist)
+    for user_id in range(1, usuarios + 1):
+        com_pino = [numero for numero, w in enumerate(listas) if w.fixados(user_id)]
+        erros += com_pino != [anel_novo.dono(user_id)]
+    return movidos / usuarios, pausa, concluiu, erros
+
+
+async def rodar(args):
+    random.seed(args.semente)
+    api = BotAPIFalsa()
+    api.iniciar()
+    try:
+        print(f"{args.updates} updates de {args.usuarios} usuários ({os.cpu_count()} CPUs)")
+        print(f"  {'trabalhadores':>13} {'updates/s':>10}")
+        for trabalhadores in args.trabalhadores:
+            pasta = tempfile.mkdtemp(prefix='bench_trabalhadores_', dir=args.dir)
+            try:
+                por_segundo, concluiu = await vazao(pasta, api, trabalhadores, args.updates, args.usuarios)
+            finally:
+                shutil.rmtree(pasta, ignore_errors=True)
+            print(f"  {trabalhadores:>13} {por_segundo:>10.0f}" + ("" if concluiu else "  (respostas faltando!)"))
+
+        pasta = tempfile.mkdtemp(prefix='bench_trabalhadores_', dir=args.dir)
+        try:
+            movidos, pausa, concluiu, erros = await troca(pasta, api, args.de, args.para, args.usuarios)
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+        print(f"\nTroca de {args.de} para {args.para} trabalhadores com {args.usuarios} usuários:")
+        print(f"  usuários movidos: {movidos:.1%} (ideal: {abs(args.para - args.de) / max(args.de, args.para):.1%})")
+        print(f"  updates segurados por {pausa * 1000:.0f} ms")
+        print(f"  respostas: {'todas' if concluiu else 'FALTANDO'}; "
+              f"watchlist no trabalhador errado: {erros}")
+        return 0 if concluiu and not erros else 1
+    finally:
+        api.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=4000)
+    parser.add_argument('--usuarios', type=int, default=2000)
+    parser.add_argument('--trabalhadores', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--de', type=int, default=2)
+    parser.add_argument('--para', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--dir', help="pasta onde os dados temporários são criados (padrão: a do sistema)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(rodar(args)))
+
+
+if __name__ == '__main__':
+    main()
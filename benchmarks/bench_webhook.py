@@ -0,0 +1,228 @@
+"""Gerador de carga para o modo webhook.
+
+Sobe uma Bot API falsa local (responde sendMessage, editMessageText etc.
+com um atraso configurável), inicia o bot em modo webhook apontando para
+ela e faz POST de updates sintéticos (/start, texto e botões) no endpoint
+local. Mede updates/s aceitos pelo servidor e updates/s processados de
+ponta a ponta (até a resposta chegar à API falsa), e confere se os
+updates de cada usuário foram tratados na ordem em que chegaram.
+
+Requer python-telegram-bot[webhooks]. Uso (compare sequencial x concorrente):
+    python benchmarks/bench_webhook.py --updates 2000 --usuarios 200 --concorrentes 1
+    python benchmarks/bench_webhook.py --updates 2000 --usuarios 200 --concorrentes 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOKEN = '123456:TESTE'
+SEGREDO = 'segredo-benchmark'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'SuperBot', 'username': 'superbot'}
+
+
+class LimiteExcedido(Exception):
+    """Levantada por `BotAPIFalsa.tratar` para responder 429 (flood control)."""
+
+    def __init__(self, espera):
+        super().__init__(espera)
+        self.espera = espera
+
+
+class BotAPIFalsa:
+    """Bot API mínima numa thread; conta as respostas do bot."""
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.respostas = 0
+        self._lock = threading.Lock()
+        self.concluido = threading.Event()
+        self.esperadas = None
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # conexões persistentes, como a API real
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    params = json.loads(corpo or '{}')
+                else:
+                    params = {k: v[0] for k, v in parse_qs(corpo).items()}
+                metodo = self.path.rsplit('/', 1)[-1]
+                if api.latencia and metodo in ('sendMessage', 'editMessageText'):
+                    time.sleep(api.latencia)
+                try:
+                    resultado = api.tratar(metodo, params)
+                except LimiteExcedido as e:
+                    self._responder({
+                        'ok': False, 'error_code': 429, 'parameters': {'retry_after': e.espera},
+                        'description': f"Too Many Requests: retry after {e.espera}",
+                    }, 429)
+                    return
+                self._responder({'ok': True, 'result': resultado})
+
+            def _responder(self, corpo, status=200):
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+
+        class Servidor(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 256  # o bot abre várias conexões de uma vez
+
+        self.servidor = Servidor(('127.0.0.1', 0), Handler)
+        self.porta = self.servidor.server_address[1]
+
+    def tratar(self, metodo, params):
+        if metodo == 'getMe':
+            return BOT_USER
+        if metodo in ('sendMessage', 'editMessageText'):
+            chat_id = int(params.get('chat_id') or 0)
+            with self._lock:
+                self.respostas += 1
+                if self.esperadas and self.respostas >= self.esperadas:
+                    self.concluido.set()
+            return {'message_id': 1, 'date': int(time.time()), 'chat': {'id': chat_id, 'type': 'private'},
+                    'from': BOT_USER, 'text': 'ok'}
+        return True
+
+    def iniciar(self):
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def parar(self):
+        self.servidor.shutdown()
+
+
+def update_sintetico(update_id, user_id):
+    usuario = {'id': user_id, 'is_bot': False, 'first_name': f'U{user_id}'}
+    chat = {'id': user_id, 'type': 'private'}
+    agora = int(time.time())
+    tipo = random.random()
+    if tipo < 0.4:
+        return {'update_id': update_id, 'message': {
+            'message_id': update_id, 'date': agora, 'chat': chat, 'from': usuario, 'text': '/start',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+        }}
+    if tipo < 0.7:
+        return {'update_id': update_id, 'message': {
+            'message_id': update_id, 'date': agora, 'chat': chat, 'from': usuario, 'text': 'menu',
+        }}
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'from': usuario, 'chat_instance': str(user_id), 'data': 'MENU:RECENTES',
+        'message': {'message_id': 1, 'date': agora, 'chat': chat, 'from': BOT_USER, 'text': 'menu'},
+    }}
+
+
+async def gerar_carga(url, updates, usuarios, conexoes):
+    """POST concorrente dos updates; cada usuário manda os seus em sequência (como o Telegram faz)."""
+    import httpx
+
+    por_usuario = {}
+    for update_id in range(1, updates + 1):
+        user_id = random.randint(1, usuarios)
+        por_usuario.setdefault(user_id, []).append(update_sintetico(update_id, user_id))
+
+    limite = asyncio.Semaphore(conexoes)
+    cabecalhos = {'X-Telegram-Bot-Api-Secret-Token': SEGREDO}
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=conexoes)) as cliente:
+        async def enviar_usuario(lista):
+            for update in lista:
+                async with limite:
+                    resposta = await cliente.post(url, json=update, headers=cabecalhos)
+                    resposta.raise_for_status()
+
+        await asyncio.gather(*(enviar_usuario(lista) for lista in por_usuario.values()))
+    return por_usuario
+
+
+async def rodar(args):
+    os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench_webhook_')
+    os.environ['PRICE_POLLING'] = '0'
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    import monitor
+
+    api = BotAPIFalsa(args.latencia_api)
+    api.iniciar()
+    monitor.MAX_CONCURRENT_UPDATES = args.concorrentes
+    monitor.SEND_PER_SECOND = args.envios_por_segundo
+    application = monitor.build_application(TOKEN, base_url=f"http://127.0.0.1:{api.porta}/bot")
+
+    # Registra a ordem em que os updates de cada usuário começam a ser tratados
+    ordem = {}
+
+    async def registrar_ordem(update, context):
+        ordem.setdefault(update.effective_user.id, []).append(update.update_id)
+
+    application.add_handler(TypeHandler(Update, registrar_ordem), group=-1)
+
+    porta = args.porta
+    await application.initialize()
+    await monitor.iniciar_armazenamento(application)
+    await application.updater.start_webhook(
+        listen='127.0.0.1', port=porta, url_path='telegram', secret_token=SEGREDO,
+        webhook_url=f"http://127.0.0.1:{porta}/telegram", allowed_updates=monitor.ALLOWED_UPDATES,
+    )
+    await application.start()
+
+    api.esperadas = args.updates
+    inicio = time.perf_counter()
+    # O gerador roda num loop próprio, numa thread, para não competir com o bot
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, asyncio.run, gerar_carga(
+        f"http://127.0.0.1:{porta}/telegram", args.updates, args.usuarios, args.conexoes,
+    ))
+    aceitos = time.perf_counter() - inicio
+    concluiu = await loop.run_in_executor(None, api.concluido.wait, 120)
+    total = time.perf_counter() - inicio
+
+    await application.updater.stop()
+    await application.stop()
+    await monitor.parar_armazenamento(application)
+    await application.shutdown()
+    api.parar()
+
+    print(f"Updates: {args.updates} de {args.usuarios} usuários | concorrentes: {args.concorrentes} | "
+          f"latência da API falsa: {args.latencia_api * 1000:.0f} ms")
+    print(f"Aceitos pelo webhook:   {args.updates / aceitos:8.0f} updates/s ({aceitos:.2f}s)")
+    if concluiu:
+        print(f"Processados (ponta a ponta): {args.updates / total:8.0f} updates/s ({total:.2f}s)")
+    else:
+        print(f"Processados: só {api.respostas}/{args.updates} respostas em 120s")
+    fora_de_ordem = sum(lista != sorted(lista) for lista in ordem.values())
+    print(f"Usuários com updates fora de ordem: {fora_de_ordem}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--concorrentes', type=int, default=64, help="MAX_CONCURRENT_UPDATES do bot")
+    parser.add_argument('--conexoes', type=int, default=50, help="conexões HTTP simultâneas do gerador")
+    parser.add_argument('--latencia-api', type=float, default=0.02, help="atraso de cada sendMessage (s)")
+    parser.add_argument('--envios-por-segundo', type=int, default=1000,
+                        help="SEND_PER_SECOND do bot (o padrão do bot, 25, vira o gargalo)")
+    parser.add_argument('--porta', type=int, default=8790)
+    args = parser.parse_args()
+    random.seed(1)
+    asyncio.run(rodar(args))
+
+
+if __name__ == '__main__':
+    main()
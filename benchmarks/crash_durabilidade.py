@@ -0,0 +1,256 @@
+"""Injeção de falhas na gravação: o que foi confirmado sobrevive e os arquivos continuam legíveis.
+
+A cada rodada um processo filho grava sem parar (histórico, compras e vendas
+de alguns usuários, pela fila do ArmazenamentoAssincrono, como os handlers)
+e imprime cada escrita assim que ela é confirmada. O filho morre de um destes
+jeitos, sorteado:
+
+- kill: SIGKILL num instante aleatório;
+- append: a escrita número N grava só um pedaço dos bytes e o processo sai
+  (simula a linha rasgada que uma queda de energia deixa no fim do arquivo);
+- replace: a substituição atômica número N sai antes do rename (sobra o .tmp).
+
+Depois, um processo novo abre os mesmos dados (recuperação normal de início)
+e confere: toda escrita confirmada está lá, nenhum arquivo tem linha pela
+metade, a carteira restaurada pelo snapshot é igual ao replay completo do
+ledger e os JSON (watchlist, alertas) abrem. As rodadas se acumulam nos
+mesmos arquivos.
+
+Um SIGKILL não descarta o cache de páginas do SO, então perda de dados numa
+queda de energia real só é reproduzida pela injeção "append"; para testar o
+fsync em si é preciso um dispositivo que descarte escritas (ex: dm-flakey).
+
+Uso:
+    python benchmarks/crash_durabilidade.py --rodadas 30
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+USUARIOS_TESTE = [101, 102, 103]
+JOGADOR = 'Marcador'
+PLATAFORMA = 'PlayStation 🎮'
+MODOS = ('kill', 'append', 'replace')
+
+
+def _ambiente(pasta, backend):
+    os.environ['DATA_DIR'] = pasta
+    os.environ['STORAGE_BACKEND'] = backend
+    os.environ['PRICE_POLLING'] = '0'
+
+
+def _injetar(modo, depois):
+    """Faz o processo sair no meio da gravação número `depois` (append) ou da substituição (replace)."""
+    import durabilidade
+
+    contador = itertools.count(1)
+    if modo == 'append':
+        original = durabilidade.LogAppend.acrescentar
+
+        def acrescentar(self, dados):
+            if next(contador) == depois:
+                corte = random.randrange(1, len(dados)) if len(dados) > 1 else 0
+                with open(self.caminho, 'ab') as file:
+                    file.write(dados[:corte])
+                os._exit(9)
+            return original(self, dados)
+        durabilidade.LogAppend.acrescentar = acrescentar
+    elif modo == 'replace':
+        original = durabilidade.os.replace
+
+        def substituir(origem, destino):
+            if next(contador) == depois:
+                os._exit(9)
+            return original(origem, destino)
+        durabilidade.os.replace = substituir
+
+
+def filho(pasta, backend, semente, modo, depois):
+    """Grava sem parar; cada escrita confirmada vira uma linha JSON no stdout."""
+    _ambiente(pasta, backend)
+    import monitor
+
+    _injetar(modo, depois)
+    rnd = random.Random(semente)
+    sequencia = itertools.count(semente * 1_000_000)
+
+    def confirmar(*campos):
+        sys.stdout.write(json.dumps(campos) + '\n')
+        sys.stdout.flush()
+
+    async def uma():
+        user_id = rnd.choice(USUARIOS_TESTE)
+        sorteio = rnd.random()
+        escrever = monitor.ARMAZENAMENTO.escrever
+        if sorteio < 0.6:
+            preco = next(sequencia)
+            await escrever(monitor.registrar_historico, user_id, JOGADOR, preco, PLATAFORMA)
+            confirmar('historico', user_id, preco)
+        elif sorteio < 0.85:
+            posicao = await escrever(monitor.registrar_trade_compra, user_id, JOGADOR, 1000, PLATAFORMA)
+            confirmar('compra', user_id, posicao['trade_id'])
+        else:
+            resultado = await escrever(monitor.registrar_trade_venda, user_id, JOGADOR, 1500, PLATAFORMA)
+            if isinstance(resultado, dict):
+                confirmar('venda', user_id)
+
+    async def carga():
+        await monitor.ARMAZENAMENTO.iniciar()
+        while True:
+            # Rajadas concorrentes, como vários handlers ao mesmo tempo
+            await asyncio.gather(*(uma() for _ in range(rnd.randint(1, 32))))
+
+    asyncio.run(carga())
+
+
+def verificar(pasta, backend):
+    """Roda num processo novo: abre os dados como o bot e imprime o estado em JSON."""
+    _ambiente(pasta, backend)
+    import monitor
+    from carteira import CarteiraLedger
+    from usuarios import pasta_usuario
+    from comum import CARTEIRA_FILE
+
+    estado = {'usuarios': {}, 'erros': []}
+    for user_id in USUARIOS_TESTE:
+        with monitor.USUARIOS.usar(user_id) as dados:
+            precos = {int(r['preco_moedas']) for r in dados.historico.iterar() if r['jogador'] == JOGADOR}
+            abertas = {p['trade_id'] for p in dados.carteira.abertas()}
+            resumo = dados.carteira.agregados()
+        # Replay completo (sem snapshot) tem que dar o mesmo estado
+        ledger = os.path.join(pasta_usuario(user_id, pasta), CARTEIRA_FILE)
+        if os.path.exists(ledger):
+            completo = CarteiraLedger(ledger)
+            completo.snapshot_file = ledger + '.ignorar'
+            completo.carregar()
+            abertas_completo = {p['trade_id'] for p in completo.abertas()}
+            if abertas_completo != abertas or completo.agregados()['pnl_total'] != resumo['pnl_total']:
+                estado['erros'].append(f"usuário {user_id}: snapshot diverge do replay completo")
+        estado['usuarios'][str(user_id)] = {
+            'precos': sorted(precos), 'abertas': sorted(abertas),
+            'fechadas': resumo['total_fechadas'],
+        }
+    # Depois da recuperação, nenhum arquivo de append termina no meio de uma linha ou registro
+    for pasta_atual, _, arquivos in os.walk(pasta):
+        for nome in arquivos:
+            caminho = os.path.join(pasta_atual, nome)
+            if nome.endswith('.bin'):
+                from historico_binario import REGISTRO
+                if os.path.getsize(caminho) % REGISTRO.itemsize:
+                    estado['erros'].append(f"{nome}: registro incompleto no fim")
+            elif nome.endswith(('.csv', '.txt', '.jogadores', '.plataformas')):
+                with open(caminho, 'rb') as file:
+                    file.seek(max(os.path.getsize(caminho) - 1, 0))
+                    if file.read(1) not in (b'', b'\n'):
+                        estado['erros'].append(f"{caminho}: linha incompleta no fim")
+    for nome in ('watchlist.json', 'alertas.json'):
+        caminho = os.path.join(pasta, nome)
+        if os.path.exists(caminho):
+            try:
+                with open(caminho, encoding='utf-8') as file:
+                    json.load(file)
+            except ValueError as e:
+                estado['erros'].append(f"{nome} ilegível: {e}")
+    monitor.USUARIOS.fechar_todos()
+    print(json.dumps(estado))
+
+
+def rodada(pasta, backend, semente, modo, confirmados):
+    rnd = random.Random(semente)
+    depois = rnd.randint(20, 400)
+    processo = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--filho', pasta, backend, str(semente), modo, str(depois)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    # No modo kill (ou se a falha injetada não acontecer) o processo morre por SIGKILL
+    espera = rnd.uniform(0.5, 2.0) if modo == 'kill' else 60
+    try:
+        saida, _ = processo.communicate(timeout=espera)
+    except subprocess.TimeoutExpired:
+        processo.send_signal(signal.SIGKILL)
+        saida, _ = processo.communicate()
+    novos = 0
+    for linha in saida.splitlines():
+        try:
+            tipo, user_id, *valor = json.loads(linha)
+        except ValueError:
+            continue  # última linha cortada pela morte do processo: não conta como confirmada
+        novos += 1
+        registro = confirmados.setdefault(str(user_id), {'precos': set(), 'compras': set(), 'vendas': 0})
+        if tipo == 'historico':
+            registro['precos'].add(valor[0])
+        elif tipo == 'compra':
+            registro['compras'].add(valor[0])
+        else:
+            registro['vendas'] += 1
+
+    estado = json.loads(subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--verificar', pasta, backend],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1])
+    erros = list(estado['erros'])
+    for user_id, esperado in confirmados.items():
+        atual = estado['usuarios'][user_id]
+        faltando = esperado['precos'] - set(atual['precos'])
+        if faltando:
+            erros.append(f"usuário {user_id}: {len(faltando)} preços confirmados sumiram")
+        if atual['fechadas'] < esperado['vendas']:
+            erros.append(f"usuário {user_id}: {esperado['vendas']} vendas confirmadas, {atual['fechadas']} no ledger")
+        # Toda compra confirmada está aberta ou foi fechada por uma venda (FIFO: ids mais antigos primeiro)
+        sumidas = [tid for tid in esperado['compras'] if tid not in atual['abertas']]
+        if len(sumidas) > atual['fechadas']:
+            erros.append(f"usuário {user_id}: compras confirmadas sumiram")
+    return novos, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=30)
+    parser.add_argument('--backend', default='csv', choices=['csv', 'binario'])
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--dir', help="pasta dos dados (padrão: temporária, apagada no fim)")
+    parser.add_argument('--filho', nargs=5, help=argparse.SUPPRESS)
+    parser.add_argument('--verificar', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        pasta, backend, semente, modo, depois = args.filho
+        filho(pasta, backend, int(semente), modo, int(depois))
+        return
+    if args.verificar:
+        verificar(*args.verificar)
+        return
+
+    pasta = args.dir or tempfile.mkdtemp(prefix='crash_durabilidade_')
+    rnd = random.Random(args.semente)
+    confirmados = {}
+    falhas = 0
+    try:
+        for numero in range(1, args.rodadas + 1):
+            modo = rnd.choice(MODOS)
+            novos, erros = rodada(pasta, args.backend, rnd.randrange(1, 1_000_000), modo, confirmados)
+            situacao = 'ok' if not erros else 'FALHOU'
+            print(f"rodada {numero:>3} {modo:<8} {novos:>5} escritas confirmadas  {situacao}")
+            for erro in erros:
+                print(f"    {erro}")
+            falhas += bool(erros)
+    finally:
+        if not args.dir:
+            shutil.rmtree(pasta, ignore_errors=True)
+    print(f"\n{args.rodadas - falhas}/{args.rodadas} rodadas sem perda nem corrupção")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Gerador de dados de mercado sintéticos (reprodutíveis) para os benchmarks.
+
+- Jogadores com nomes realistas e popularidade desigual (lei de Zipf): poucos
+  jogadores concentram a maior parte dos registros, como no uso real.
+- Preço de cada (jogador, plataforma) num passeio aleatório geométrico com
+  leve reversão à média, arredondado aos degraus de preço do EA FC.
+- Registros de preço em rajadas (sessões de mercado seguidas de pausas).
+- Carteira em rajadas de COMPRA do mesmo jogador, vendidas algumas rajadas
+  depois, com parte das posições ficando aberta.
+
+Uso (gera o DATA_DIR de um usuário):
+    python benchmarks/dados_sinteticos.py dados_bench --linhas 1000000 --trades 100000
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carteira import calcular_lucro_liquido  # noqa: E402
+from comum import CARTEIRA_FILE, CARTEIRA_HEADERS, HISTORICO_FILE, HISTORICO_HEADERS  # noqa: E402
+
+PLATAFORMAS = ['PlayStation 🎮', 'Xbox 💚', 'PC 💻']
+PRIMEIROS = [
+    'Vinícius', 'Lionel', 'Kylian', 'Erling', 'Kevin', 'Jude', 'Rodrygo', 'Mohamed', 'Virgil', 'Thibaut',
+    'Gavi', 'Pedri', 'Bruno', 'Rúben', 'Bukayo', 'Martin', 'Federico', 'Lautaro', 'Khvicha', 'Joshua',
+    'Antoine', 'Alisson', 'Éder', 'Gabriel', 'Marquinhos', 'Raphinha', 'João', 'Bernardo', 'Son', 'Ousmane',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Messi', 'Mbappé', 'Haaland', 'De Bruyne', 'Bellingham', 'Goes', 'Salah', 'van Dijk',
+    'Courtois', 'Müller', 'Fernandes', 'Dias', 'Saka', 'Ødegaard', 'Valverde', 'Martínez', 'Kvaratskhelia',
+    'Kimmich', 'Griezmann', 'Becker', 'Militão', 'Jesus', 'Félix', 'Cancelo', 'Heung-min', 'Dembélé', 'Rice',
+    'Wirtz',
+]
+INICIO = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, 0))
+
+
+def nomes_jogadores(n):
+    """N nomes únicos (combinações de nome e sobrenome; sufixo numérico se faltar combinação)."""
+    nomes = []
+    total = len(PRIMEIROS) * len(SOBRENOMES)
+    for i in range(n):
+        nome = f"{PRIMEIROS[i % len(PRIMEIROS)]} {SOBRENOMES[(i // len(PRIMEIROS)) % len(SOBRENOMES)]}"
+        nomes.append(nome if i < total else f"{nome} {i // total + 1}")
+    return nomes
+
+
+def arredondar_fc(preco):
+    """Arredonda para o degrau de preço do mercado do EA FC."""
+    if preco < 1000:
+        degrau = 50
+    elif preco < 10000:
+        degrau = 100
+    elif preco < 50000:
+        degrau = 250
+    elif preco < 100000:
+        degrau = 500
+    else:
+        degrau = 1000
+    return max(200, int(round(preco / degrau)) * degrau)
+
+
+class MercadoSintetico:
+    """Preços de `jogadores` jogadores nas três plataformas, reproduzíveis pela `semente`."""
+
+    def __init__(self, jogadores=500, semente=1, volatilidade=0.02, zipf=1.1):
+        self.rnd = random.Random(semente)
+        self.nomes = nomes_jogadores(jogadores)
+        self.volatilidade = volatilidade
+        self.pesos = [1 / (i + 1) ** zipf for i in range(jogadores)]
+        self.rnd.shuffle(self.pesos)
+        # Preço base log-uniforme entre 1 mil e 2 milhões; PC um pouco mais barato
+        self._base = {}
+        self._log_preco = {}
+        for nome in self.nomes:
+            base = math.log(1000) + self.rnd.random() * (math.log(2_000_000) - math.log(1000))
+            for plataforma in PLATAFORMAS:
+                ajuste = math.log(0.85) if plataforma == PLATAFORMAS[2] else 0.0
+                self._base[nome, plataforma] = base + ajuste
+                self._log_preco[nome, plataforma] = base + ajuste
+
+    def jogador(self):
+        return self.rnd.choices(self.nomes, self.pesos)[0]
+
+    def plataforma(self):
+        return self.rnd.choices(PLATAFORMAS, (0.6, 0.25, 0.15))[0]
+
+    def preco(self, nome, plataforma):
+        """Próximo preço do passeio aleatório (com reversão de 1% à média por passo)."""
+        chave = (nome, plataforma)
+        atual = self._log_preco[chave]
+        atual += 0.01 * (self._base[chave] - atual) + self.rnd.gauss(0, self.volatilidade)
+        self._log_preco[chave] = atual
+        return arredondar_fc(math.exp(atual))
+
+    def instantes(self, n, inicio=INICIO, media=60.0):
+        """N instantes crescentes em rajadas: sessões de registros próximos separadas por pausas longas."""
+        t = inicio
+        restante_sessao = 0
+        for _ in range(n):
+            if restante_sessao <= 0:
+                t += self.rnd.expovariate(1 / (media * 30))
+                restante_sessao = self.rnd.randint(5, 60)
+            t += self.rnd.expovariate(1 / (media / 10))
+            restante_sessao -= 1
+            yield t
+
+
+def _data(t):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(t))
+
+
+def gerar_historico(caminho, linhas, mercado):
+    """CSV de histórico com `linhas` registros (data_hora, jogador, preco_moedas, plataforma)."""
+    with open(caminho + '.tmp', 'w', encoding='utf-8', newline='') as file:
+        escritor = csv.writer(file)
+        escritor.writerow(HISTORICO_HEADERS)
+        bloco = []
+        for t in mercado.instantes(linhas):
+            nome, plataforma = mercado.jogador(), mercado.plataforma()
+            bloco.append((_data(t), nome, mercado.preco(nome, plataforma), plataforma))
+            if len(bloco) >= 100000:
+                escritor.writerows(bloco)
+                bloco = []
+        escritor.writerows(bloco)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def gerar_ledger(caminho, trades, mercado, abertas=0.25):
+    """Ledger da carteira com `trades` COMPRAs; cerca de `abertas` delas ficam sem VENDA.
+
+    As compras vêm em rajadas (várias unidades do mesmo jogador de uma vez) e
+    as rajadas que não ficam em carteira são vendidas algumas rajadas depois.
+    """
+    rnd = mercado.rnd
+    eventos = []
+    pendentes = []  # rajadas ainda não vendidas: [(trade_id, jogador, plataforma, preço de compra)]
+    instantes = mercado.instantes(trades * 2)
+    trade_id = 1
+    while trade_id <= trades:
+        nome, plataforma = mercado.jogador(), mercado.plataforma()
+        preco = mercado.preco(nome, plataforma)
+        rajada = []
+        for _ in range(min(rnd.randint(1, 8), trades - trade_id + 1)):
+            eventos.append([_data(next(instantes)), 'COMPRA', trade_id, nome, plataforma, preco, ''])
+            rajada.append((trade_id, nome, plataforma, preco))
+            trade_id += 1
+        if rnd.random() < abertas:
+            continue  # rajada que fica em carteira
+        pendentes.append(rajada)
+        # Com algumas rajadas na espera, vende uma das mais antigas
+        if len(pendentes) > 5:
+            for tid, nome_v, plataforma_v, compra in pendentes.pop(rnd.randrange(len(pendentes) - 3)):
+                venda = mercado.preco(nome_v, plataforma_v)
+                eventos.append([_data(next(instantes)), 'VENDA', tid, nome_v, plataforma_v, venda,
+                                calcular_lucro_liquido(compra, venda)])
+    with open(caminho + '.tmp', 'w', encoding='utf-8', newline='') as file:
+        escritor = csv.writer(file)
+        escritor.writerow(CARTEIRA_HEADERS)
+        escritor.writerows(eventos)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def gerar_usuario(pasta_raiz, user_id, linhas, trades, jogadores=500, semente=1, backend='csv'):
+    """Cria o histórico e a carteira do usuário em `pasta_raiz` (DATA_DIR); retorna o MercadoSintetico."""
+    from usuarios import pasta_usuario
+
+    pasta = pasta_usuario(user_id, pasta_raiz)
+    os.makedirs(pasta, exist_ok=True)
+    mercado = MercadoSintetico(jogadores, semente)
+    caminho = os.path.join(pasta, HISTORICO_FILE)
+    gerar_historico(caminho, linhas, mercado)
+    gerar_ledger(os.path.join(pasta, CARTEIRA_FILE), trades, mercado)
+    if backend == 'binario':
+        from historico_binario import HISTORICO_BIN_FILE, csv_para_binario
+        csv_para_binario(caminho, os.path.join(pasta, HISTORICO_BIN_FILE))
+    return mercado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pasta', help="DATA_DIR de destino")
+    parser.add_argument('--user-id', type=int, default=4242)
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--trades', type=int, default=10000)
+    parser.add_argument('--jogadores', type=int, default=500)
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--backend', default='csv', choices=['csv', 'binario'])
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    gerar_usuario(args.pasta, args.user_id, args.linhas, args.trades, args.jogadores, args.semente, args.backend)
+    print(f"{args.linhas} registros e {args.trades} trades em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Servidor HTTP local que imita as páginas do Futbin para testes e benchmarks.
+
+Responde `/players?search=<nome>&platform=<ps|pc>` com a mesma marcação
+que `precos.ParserFutbin` lê. Os preços são determinísticos por
+nome/plataforma e a latência de cada resposta é configurável.
+
+Uso isolado:
+    python benchmarks/servidor_fixture.py --porta 8765 --latencia 0.2
+    FUTBIN_URL=http://127.0.0.1:8765 PRICE_SOURCES=futbin python monitor.py
+"""
+import argparse
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+def preco_ficticio(nome, plataforma):
+    return 1000 + zlib.crc32(f"{nome.upper()}|{plataforma}".encode()) % 2_000_000
+
+
+def pagina(linhas):
+    corpo = "".join(
+        f'<tr class="player-row"><td><a class="table-player-name">{escape(nome)}</a></td>'
+        f'<td><div class="price">{preco:,}</div></td></tr>'
+        for nome, preco in linhas
+    )
+    return f"<html><body><table>{corpo}</table></body></html>".encode()
+
+
+class ServidorFixture:
+    """Sobe o servidor numa thread; `requisicoes` conta quantas chegaram."""
+
+    def __init__(self, porta=0, latencia=0.0):
+        self.latencia = latencia
+        self.requisicoes = 0
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture.requisicoes += 1
+                if fixture.latencia:
+                    time.sleep(fixture.latencia)
+                url = urlsplit(self.path)
+                params = parse_qs(url.query)
+                if url.path == '/players':
+                    nome = params.get('search', [''])[0]
+                    plataforma = params.get('platform', ['ps'])[0]
+                    corpo = pagina([(nome, preco_ficticio(nome, plataforma))])
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', porta), Handler)
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos por resposta')
+    args = parser.parse_args()
+    with ServidorFixture(args.porta, args.latencia) as fixture:
+        print(f"Servindo em {fixture.url} (Ctrl+C para sair)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
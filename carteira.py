@@ -0,0 +1,425 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from comum import (
+    CARTEIRA_FILE, CARTEIRA_HEADERS, CARTEIRA_HEADERS_LEGADO, TAXA_EA_FC,
+    init_csv, agora_str, limpar_preco, normalizar_nome,
+)
+from durabilidade import COMMIT, LogAppend, linhas_csv, substituicao_atomica
+from metricas import METRICAS
+
+# ===================================================
+# LEDGER DE TRADES (APPEND-ONLY) COM ÍNDICE DE POSIÇÕES ABERTAS
+# ===================================================
+
+
+def calcular_lucro_liquido(preco_compra, preco_venda):
+    """Lucro após a taxa de 5% do mercado: (Venda - Compra) - Venda * taxa."""
+    lucro_bruto = preco_venda - preco_compra
+    taxa = preco_venda * TAXA_EA_FC
+    return int(lucro_bruto - taxa)
+
+
+def marcar_a_mercado(posicoes, precos):
+    """Posições abertas avaliadas pelo preço atual, já descontada a taxa de 5% de uma venda agora.
+
+    `precos`: {(jogador normalizado, plataforma): preço atual}. As contas são
+    feitas de uma vez para todas as posições (NumPy); as sem preço conhecido
+    ficam fora dos totais e saem com 'preco_atual' None.
+    """
+    import numpy as np
+
+    compra = np.fromiter((p['preco_compra'] for p in posicoes), dtype=np.float64, count=len(posicoes))
+    atual = np.fromiter(
+        (precos.get((normalizar_nome(p['jogador']), p['plataforma']), np.nan) for p in posicoes),
+        dtype=np.float64, count=len(posicoes),
+    )
+    liquido = np.trunc(atual * (1 - TAXA_EA_FC))
+    lucro = np.trunc(atual - compra - atual * TAXA_EA_FC)  # mesmo arredondamento de calcular_lucro_liquido
+    com_preco = ~np.isnan(atual)
+    avaliadas = [
+        dict(p, preco_atual=int(atual[i]), valor_liquido=int(liquido[i]), lucro_nao_realizado=int(lucro[i]))
+        if com_preco[i] else dict(p, preco_atual=None, valor_liquido=None, lucro_nao_realizado=None)
+        for i, p in enumerate(posicoes)
+    ]
+    return {
+        'posicoes': avaliadas,
+        'custo': int(compra[com_preco].sum()),
+        'valor_liquido': int(liquido[com_preco].sum()),
+        'lucro_nao_realizado': int(lucro[com_preco].sum()),
+        'sem_preco': int((~com_preco).sum()),
+    }
+
+
+class MarcacaoMercado:
+    """Guarda a avaliação das posições abertas de um usuário até ela poder ter mudado.
+
+    `invalidar(jogador)` vem a cada preço novo gravado (só descarta se o
+    jogador está entre os avaliados) e `invalidar()` a cada trade. Uma
+    avaliação calculada enquanto chegava um preço não é guardada, e uma que
+    usou preços com validade (o cache dos sites) é refeita quando o primeiro
+    deles vence.
+    """
+
+    def __init__(self):
+        self._valor = None
+        self._jogadores = frozenset()
+        self._expira_em = None  # monotonic; None = sem validade
+        self._versao = 0
+        self._lock = threading.Lock()
+
+    def invalidar(self, jogador=None):
+        with self._lock:
+            if self._valor is None or jogador is None or normalizar_nome(jogador) in self._jogadores:
+                self._valor = None
+                self._versao += 1
+
+    def obter(self, calcular):
+        """Avaliação guardada ou `calcular()` -> (avaliação, jogadores normalizados envolvidos, expira_em)."""
+        with self._lock:
+            if self._valor is not None and (self._expira_em is None or time.monotonic() < self._expira_em):
+                return self._valor
+            self._valor = None
+            versao = self._versao
+        valor, jogadores, expira_em = calcular()
+        with self._lock:
+            if versao == self._versao:
+                self._valor, self._jogadores, self._expira_em = valor, frozenset(jogadores), expira_em
+        return valor
+
+
+class AgregadosCarteira:
+    """Totais da carteira atualizados a cada COMPRA e VENDA.
+
+    Mantém P&L total, por jogador e por plataforma, taxa de acerto, custo das
+    posições abertas e um buffer circular com as últimas N vendas, para que o
+    /carteira não precise percorrer o histórico de trades.
+    """
+
+    def __init__(self, max_recentes=5):
+        self.pnl_total = 0
+        self.pnl_por_jogador = {}
+        self.pnl_por_plataforma = {}
+        self.total_fechadas = 0
+        self.vitorias = 0
+        self.custo_aberto = 0
+        self.total_abertas = 0
+        self.ultimas_fechadas = deque(maxlen=max_recentes)
+
+    def aplicar_compra(self, posicao):
+        self.custo_aberto += posicao['preco_compra']
+        self.total_abertas += 1
+
+    def aplicar_venda(self, posicao):
+        lucro = posicao['lucro_liquido']
+        self.custo_aberto -= posicao['preco_compra']
+        self.total_abertas -= 1
+        self.pnl_total += lucro
+        chave_jogador = normalizar_nome(posicao['jogador'])
+        self.pnl_por_jogador[chave_jogador] = self.pnl_por_jogador.get(chave_jogador, 0) + lucro
+        self.pnl_por_plataforma[posicao['plataforma']] = self.pnl_por_plataforma.get(posicao['plataforma'], 0) + lucro
+        self.total_fechadas += 1
+        if lucro > 0:
+            self.vitorias += 1
+        self.ultimas_fechadas.append(dict(posicao))
+
+    @property
+    def taxa_acerto(self):
+        return self.vitorias / self.total_fechadas if self.total_fechadas else 0.0
+
+    def resumo(self):
+        """Cópia dos totais para exibição (últimas vendas da mais nova para a mais antiga)."""
+        return {
+            'pnl_total': self.pnl_total,
+            'pnl_por_plataforma': dict(self.pnl_por_plataforma),
+            'total_fechadas': self.total_fechadas,
+            'vitorias': self.vitorias,
+            'taxa_acerto': self.taxa_acerto,
+            'custo_aberto': self.custo_aberto,
+            'total_abertas': self.total_abertas,
+            'ultimas_fechadas': list(self.ultimas_fechadas)[::-1],
+        }
+
+    def para_dict(self):
+        return {
+            'pnl_total': self.pnl_total,
+            'pnl_por_jogador': self.pnl_por_jogador,
+            'pnl_por_plataforma': self.pnl_por_plataforma,
+            'total_fechadas': self.total_fechadas,
+            'vitorias': self.vitorias,
+            'custo_aberto': self.custo_aberto,
+            'total_abertas': self.total_abertas,
+            'max_recentes': self.ultimas_fechadas.maxlen,
+            'ultimas_fechadas': list(self.ultimas_fechadas),
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        agregados = cls(dados.get('max_recentes', 5))
+        for campo in ('pnl_total', 'pnl_por_jogador', 'pnl_por_plataforma', 'total_fechadas',
+                      'vitorias', 'custo_aberto', 'total_abertas'):
+            setattr(agregados, campo, dados[campo])
+        agregados.ultimas_fechadas.extend(dados['ultimas_fechadas'])
+        return agregados
+
+
+class CarteiraLedger:
+    """Carteira gravada como uma sequência de eventos COMPRA/VENDA.
+
+    O arquivo nunca é reescrito: cada operação é um único append. Em memória,
+    cada (jogador, plataforma) aponta para uma fila FIFO das posições abertas,
+    então fechar um trade é O(1). As consultas de trades abertos e fechados
+    leem apenas deste índice.
+
+    Os agregados e as posições abertas são salvos num snapshot junto com o
+    tamanho do ledger naquele momento; ao iniciar, só os eventos gravados
+    depois do snapshot são reaplicados.
+    """
+
+    # Eventos entre dois snapshots automáticos
+    SNAPSHOT_A_CADA = 100
+
+    def __init__(self, filename=CARTEIRA_FILE):
+        self.filename = filename
+        self.snapshot_file = filename + '.snapshot.json'
+        self._log = LogAppend(filename, cabecalho=linhas_csv([CARTEIRA_HEADERS]))
+        self._abertas = {}   # trade_id -> posição (em ordem de compra)
+        self._filas = {}     # (jogador normalizado, plataforma) -> deque de trade_ids
+        self._agregados = AgregadosCarteira()
+        self._proximo_id = 1
+        self._eventos_sem_snapshot = 0
+        self._carregado = False
+        self._lock = threading.RLock()
+
+    # ---------------------------------------------------
+    # Carga e replay do ledger
+    # ---------------------------------------------------
+
+    def carregar(self):
+        """Reconstrói o índice a partir do ledger (apenas na primeira chamada)."""
+        with self._lock:
+            if self._carregado:
+                return
+            self._migrar_legado()
+            # Cauda rasgada antes do snapshot: o offset dele é comparado com o ledger já recuperado
+            self._log.recuperar()
+            init_csv(self.filename, CARTEIRA_HEADERS)
+            offset = self._restaurar_snapshot()
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                if offset:
+                    file.seek(offset)
+                    reader = csv.DictReader(file, fieldnames=CARTEIRA_HEADERS)
+                else:
+                    reader = csv.DictReader(file)
+                for row in reader:
+                    try:
+                        self._aplicar(row)
+                    except (KeyError, ValueError):
+                        continue
+                METRICAS.contar('linhas_csv_lidas_total', max(reader.line_num - (0 if offset else 1), 0),
+                                arquivo='carteira', operacao='carregar')
+            self._carregado = True
+
+    def _restaurar_snapshot(self):
+        """Carrega o snapshot se ele ainda corresponde ao ledger. Retorna o offset a reaplicar."""
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as file:
+                dados = json.load(file)
+            offset = dados['offset']
+            if offset > os.path.getsize(self.filename):
+                return 0
+            abertas = {int(tid): posicao for tid, posicao in dados['abertas'].items()}
+            agregados = AgregadosCarteira.de_dict(dados['agregados'])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return 0
+
+        self._abertas = abertas
+        self._filas = {}
+        for trade_id, posicao in abertas.items():
+            self._filas.setdefault(self._chave(posicao['jogador'], posicao['plataforma']), deque()).append(trade_id)
+        self._agregados = agregados
+        self._proximo_id = dados['proximo_id']
+        return offset
+
+    def salvar_snapshot(self):
+        """Grava agregados, posições abertas e o tamanho atual do ledger."""
+        with self._lock:
+            if not self._carregado:
+                return
+            # O snapshot não pode apontar para eventos que ainda não estão no disco
+            if COMMIT.fsync:
+                self._log.sincronizar()
+            dados = {
+                'offset': os.path.getsize(self.filename),
+                'proximo_id': self._proximo_id,
+                'abertas': self._abertas,
+                'agregados': self._agregados.para_dict(),
+            }
+            with substituicao_atomica(self.snapshot_file, encoding='utf-8') as file:
+                json.dump(dados, file, ensure_ascii=False)
+            self._eventos_sem_snapshot = 0
+
+    def _migrar_legado(self):
+        """Converte uma carteira no formato antigo (uma linha por trade) em eventos."""
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            if next(reader, None) != CARTEIRA_HEADERS_LEGADO:
+                return
+            legado = list(csv.DictReader(file, fieldnames=CARTEIRA_HEADERS_LEGADO))
+        with substituicao_atomica(self.filename, newline='', encoding='utf-8') as saida:
+            writer = csv.writer(saida)
+            writer.writerow(CARTEIRA_HEADERS)
+            for trade_id, row in enumerate(legado, 1):
+                writer.writerow([row['data_hora_compra'], 'COMPRA', trade_id, row['jogador'],
+                                 row['plataforma'], row['preco_compra'], ''])
+                if row.get('preco_venda') and row['preco_venda'].strip():
+                    writer.writerow([row['data_hora_compra'], 'VENDA', trade_id, row['jogador'],
+                                     row['plataforma'], row['preco_venda'], row['lucro_liquido']])
+        print(f"Carteira {self.filename} migrada para o formato de eventos.")
+
+    def _aplicar(self, row):
+        """Aplica um evento do ledger ao índice em memória."""
+        trade_id = int(row['trade_id'])
+        if row['evento'] == 'COMPRA':
+            posicao = {
+                'trade_id': trade_id,
+                'data_hora_compra': row['data_hora'],
+                'jogador': row['jogador'],
+                'plataforma': row['plataforma'],
+                'preco_compra': int(row['preco']),
+                'data_hora_venda': None,
+                'preco_venda': None,
+                'lucro_liquido': None,
+            }
+            self._abertas[trade_id] = posicao
+            self._filas.setdefault(self._chave(row['jogador'], row['plataforma']), deque()).append(trade_id)
+            self._proximo_id = max(self._proximo_id, trade_id + 1)
+            self._agregados.aplicar_compra(posicao)
+            return posicao
+
+        if row['evento'] == 'VENDA':
+            posicao = self._abertas.pop(trade_id, None)
+            if posicao is None:
+                return None
+            fila = self._filas.get(self._chave(posicao['jogador'], posicao['plataforma']))
+            if fila:
+                if fila[0] == trade_id:
+                    fila.popleft()
+                else:
+                    fila.remove(trade_id)
+            posicao['data_hora_venda'] = row['data_hora']
+            posicao['preco_venda'] = int(row['preco'])
+            posicao['lucro_liquido'] = int(row['lucro_liquido'])
+            self._agregados.aplicar_venda(posicao)
+            return posicao
+        return None
+
+    @staticmethod
+    def _chave(jogador, plataforma):
+        return (normalizar_nome(jogador), plataforma)
+
+    def _append(self, linha):
+        self._log.acrescentar(linhas_csv([linha]))
+        self._eventos_sem_snapshot += 1
+
+    # ---------------------------------------------------
+    # Operações
+    # ---------------------------------------------------
+
+    def registrar_compra(self, jogador, preco_compra, plataforma):
+        """Abre uma posição: um append no ledger e um push na fila do jogador."""
+        self.carregar()
+        preco_limpo = limpar_preco(preco_compra)
+        with self._lock:
+            row = {
+                'data_hora': agora_str(), 'evento': 'COMPRA', 'trade_id': self._proximo_id,
+                'jogador': jogador, 'plataforma': plataforma, 'preco': preco_limpo, 'lucro_liquido': '',
+            }
+            self._append([row[campo] for campo in CARTEIRA_HEADERS])
+            posicao = dict(self._aplicar(row))
+            self._snapshot_se_preciso()
+            return posicao
+
+    def registrar_venda(self, jogador, preco_venda, plataforma):
+        """Fecha a posição aberta mais antiga do jogador nesta plataforma (FIFO).
+
+        Retorna a posição fechada ou None se não houver compra aberta.
+        """
+        self.carregar()
+        preco_limpo = limpar_preco(preco_venda)
+        with self._lock:
+            fila = self._filas.get(self._chave(jogador, plataforma))
+            if not fila:
+                return None
+            posicao = self._abertas[fila[0]]
+            row = {
+                'data_hora': agora_str(), 'evento': 'VENDA', 'trade_id': posicao['trade_id'],
+                'jogador': posicao['jogador'], 'plataforma': plataforma, 'preco': preco_limpo,
+                'lucro_liquido': calcular_lucro_liquido(posicao['preco_compra'], preco_limpo),
+            }
+            self._append([row[campo] for campo in CARTEIRA_HEADERS])
+            posicao = dict(self._aplicar(row))
+            self._snapshot_se_preciso()
+            return posicao
+
+    def _snapshot_se_preciso(self):
+        if self._eventos_sem_snapshot >= self.SNAPSHOT_A_CADA:
+            self.salvar_snapshot()
+
+    def abertas(self):
+        """Posições abertas, da mais nova para a mais antiga."""
+        self.carregar()
+        with self._lock:
+            return [dict(p) for p in reversed(self._abertas.values())]
+
+    def iterar_trades(self):
+        """Trades (uma linha por posição) lidos do ledger em streaming.
+
+        Cada trade sai quando a VENDA aparece; os que seguem abertos saem no fim.
+        Só as compras ainda sem venda ficam em memória.
+        """
+        self.carregar()
+        pendentes = {}
+        with open(self.filename, 'r', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                try:
+                    trade_id = int(row['trade_id'])
+                    if row['evento'] == 'COMPRA':
+                        pendentes[trade_id] = {
+                            'trade_id': trade_id, 'data_hora_compra': row['data_hora'], 'jogador': row['jogador'],
+                            'plataforma': row['plataforma'], 'preco_compra': int(row['preco']),
+                            'data_hora_venda': None, 'preco_venda': None, 'lucro_liquido': None,
+                        }
+                    elif row['evento'] == 'VENDA' and trade_id in pendentes:
+                        posicao = pendentes.pop(trade_id)
+                        posicao['data_hora_venda'] = row['data_hora']
+                        posicao['preco_venda'] = int(row['preco'])
+                        posicao['lucro_liquido'] = int(row['lucro_liquido'])
+                        yield posicao
+                except (KeyError, ValueError):
+                    continue
+        yield from pendentes.values()
+
+    def abertas_do_jogador(self, jogador, plataforma):
+        """Posições abertas de um jogador/plataforma (fila FIFO, sem varrer a carteira)."""
+        self.carregar()
+        with self._lock:
+            fila = self._filas.get(self._chave(jogador, plataforma), ())
+            return [dict(self._abertas[trade_id]) for trade_id in fila]
+
+    def resumo_fechadas(self, n=5):
+        """P&L total e as últimas N posições fechadas (da mais nova para a mais antiga)."""
+        resumo = self.agregados()
+        return resumo['pnl_total'], resumo['ultimas_fechadas'][:n]
+
+    def agregados(self):
+        """Totais da carteira em O(1), sem percorrer o ledger."""
+        self.carregar()
+        with self._lock:
+            return self._agregados.resumo()
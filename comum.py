@@ -0,0 +1,49 @@
+import csv
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# ===================================================
+# CONSTANTES E FUNÇÕES COMPARTILHADAS
+# ===================================================
+
+TIMEZONE = ZoneInfo('UTC')
+DATA_FORMATO = '%Y-%m-%d %H:%M:%S'
+
+HISTORICO_FILE = 'preços_historico.csv'
+HISTORICO_HEADERS = ['data_hora', 'jogador', 'preco_moedas', 'plataforma']
+
+# Carteira: ledger de eventos (uma linha por COMPRA ou VENDA, nunca reescrita)
+CARTEIRA_FILE = 'carteira_trades.csv'
+CARTEIRA_HEADERS = ['data_hora', 'evento', 'trade_id', 'jogador', 'plataforma', 'preco', 'lucro_liquido']
+# Formato antigo: uma linha por trade, atualizada no lugar na VENDA
+CARTEIRA_HEADERS_LEGADO = ['data_hora_compra', 'jogador', 'preco_compra', 'plataforma', 'preco_venda', 'lucro_liquido']
+
+# O P&L no EA FC é (Venda * 0.95) - Compra
+TAXA_EA_FC = 0.05
+
+
+def init_csv(filename, headers):
+    """Garante que o arquivo CSV exista com os cabeçalhos corretos."""
+    if not os.path.exists(filename):
+        try:
+            with open(filename, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(headers)
+        except Exception as e:
+            print(f"Erro ao criar {filename}: {e}")
+
+
+def agora_str():
+    """Data/hora atual no formato gravado nos CSVs."""
+    return datetime.now(TIMEZONE).strftime(DATA_FORMATO)
+
+
+def limpar_preco(valor):
+    """Converte '1.500.000' ou '1,500,000' em int. Lança ValueError se inválido."""
+    return int(str(valor).replace('.', '').replace(',', ''))
+
+
+def normalizar_nome(nome):
+    """Chave usada nos índices: espaços colapsados e caixa alta."""
+    return ' '.join(str(nome).split()).upper()
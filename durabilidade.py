@@ -0,0 +1,306 @@
+import concurrent.futures
+import contextlib
+import csv
+import io
+import os
+import threading
+from collections import OrderedDict
+
+# ===================================================
+# GRAVAÇÃO DURÁVEL: SUBSTITUIÇÃO ATÔMICA, APPEND COM GROUP COMMIT
+# ===================================================
+
+# Arquivos de append mantidos abertos ao mesmo tempo (os mais antigos são fechados)
+MAX_ABERTOS = 64
+# fsyncs de um mesmo grupo feitos em paralelo (arquivos de usuários diferentes)
+FSYNC_PARALELOS = 8
+
+
+def _fsync_pasta(pasta):
+    """fsync do diretório, para o rename/criação sobreviver a uma queda de energia (POSIX)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(pasta or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def substituicao_atomica(caminho, modo='w', **kwargs):
+    """Escreve num temporário ao lado de `caminho` e só o troca pelo original no fim do bloco.
+
+    Com fsync ligado, os dados vão para o disco antes do rename e o diretório
+    depois dele: quem lê depois de uma queda vê o arquivo antigo ou o novo,
+    nunca um pela metade. Se o bloco falhar, o original fica intacto.
+    """
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta or '.', exist_ok=True)
+    tmp = caminho + '.tmp'
+    try:
+        with open(tmp, modo, **kwargs) as file:
+            yield file
+            file.flush()
+            if COMMIT.fsync:
+                os.fsync(file.fileno())
+        ARQUIVOS.fechar(caminho)
+        os.replace(tmp, caminho)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    if COMMIT.fsync:
+        _fsync_pasta(pasta)
+
+
+def gravar_atomico(caminho, conteudo):
+    """Substitui `caminho` por `conteudo` (str ou bytes) de forma atômica."""
+    if isinstance(conteudo, str):
+        with substituicao_atomica(caminho, 'w', encoding='utf-8') as file:
+            file.write(conteudo)
+    else:
+        with substituicao_atomica(caminho, 'wb') as file:
+            file.write(conteudo)
+
+
+def linhas_csv(linhas):
+    """Linhas CSV em bytes, no mesmo formato do csv.writer usado nos arquivos."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(linhas)
+    return buffer.getvalue().encode('utf-8')
+
+
+class _ArquivosAbertos:
+    """Pool LRU de arquivos abertos para append, compartilhado por todos os logs."""
+
+    def __init__(self, limite=MAX_ABERTOS):
+        self.limite = limite
+        self._arquivos = OrderedDict()  # caminho -> arquivo ('ab')
+        self._lock = threading.Lock()
+
+    def obter(self, caminho):
+        with self._lock:
+            file = self._arquivos.get(caminho)
+            if file is not None:
+                self._arquivos.move_to_end(caminho)
+                return file
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+            file = self._arquivos[caminho] = open(caminho, 'ab')
+            while len(self._arquivos) > self.limite:
+                _, antigo = self._arquivos.popitem(last=False)
+                self._fechar(antigo)
+            return file
+
+    def duplicar(self, caminho):
+        """Descritor próprio (dup) do arquivo aberto, ou None: o fsync não segura o pool."""
+        with self._lock:
+            file = self._arquivos.get(caminho)
+            if file is None:
+                return None
+            file.flush()
+            return os.dup(file.fileno())
+
+    def fechar(self, caminho):
+        with self._lock:
+            file = self._arquivos.pop(caminho, None)
+            if file is not None:
+                self._fechar(file)
+
+    def fechar_todos(self):
+        with self._lock:
+            arquivos = list(self._arquivos.values())
+            self._arquivos.clear()
+            for file in arquivos:
+                self._fechar(file)
+
+    @staticmethod
+    def _fechar(file):
+        file.flush()
+        if COMMIT.fsync:
+            os.fsync(file.fileno())
+        file.close()
+
+
+ARQUIVOS = _ArquivosAbertos()
+
+
+class LogAppend:
+    """Arquivo só de acréscimos (histórico, ledger da carteira, dicionários).
+
+    - Recuperação: antes da primeira escrita (ou ao chamar `recuperar`), uma
+      cauda rasgada por uma gravação interrompida é cortada: a última linha
+      sem '\\n' (texto) ou o registro incompleto (`tamanho_registro`).
+    - Durabilidade: `acrescentar` escreve e entrega ao sistema operacional;
+      o fsync fica com o COMMIT (ver GrupoCommit).
+    - `cabecalho` (bytes) é gravado quando o arquivo é criado.
+    """
+
+    def __init__(self, caminho, cabecalho=None, tamanho_registro=None):
+        self.caminho = caminho
+        self.cabecalho = cabecalho
+        self.tamanho_registro = tamanho_registro
+        self._recuperado = False
+        self._lock = threading.Lock()
+
+    def recuperar(self):
+        """Corta a cauda rasgada (idempotente). Retorna quantos bytes foram descartados."""
+        with self._lock:
+            return self._recuperar()
+
+    def _recuperar(self):
+        if self._recuperado:
+            return 0
+        self._recuperado = True
+        try:
+            tamanho = os.path.getsize(self.caminho)
+        except FileNotFoundError:
+            return 0
+        if self.tamanho_registro:
+            valido = tamanho - tamanho % self.tamanho_registro
+        else:
+            valido = self._fim_ultima_linha(tamanho)
+        if valido == tamanho:
+            return 0
+        ARQUIVOS.fechar(self.caminho)
+        with open(self.caminho, 'r+b') as file:
+            file.truncate(valido)
+            if COMMIT.fsync:
+                os.fsync(file.fileno())
+        print(f"{self.caminho}: {tamanho - valido} bytes de uma gravação interrompida descartados.")
+        return tamanho - valido
+
+    def _fim_ultima_linha(self, tamanho):
+        with open(self.caminho, 'rb') as file:
+            pos = tamanho
+            while pos > 0:
+                passo = min(64 * 1024, pos)
+                file.seek(pos - passo)
+                bloco = file.read(passo)
+                fim = bloco.rfind(b'\n')
+                if fim >= 0:
+                    return pos - passo + fim + 1
+                pos -= passo
+        return 0
+
+    def truncar(self, tamanho):
+        """Corta o arquivo em `tamanho` bytes (recuperação de registros inválidos)."""
+        with self._lock:
+            ARQUIVOS.fechar(self.caminho)
+            with open(self.caminho, 'r+b') as file:
+                file.truncate(tamanho)
+                if COMMIT.fsync:
+                    os.fsync(file.fileno())
+
+    def acrescentar(self, dados):
+        with self._lock:
+            self._recuperar()
+            file = ARQUIVOS.obter(self.caminho)
+            if self.cabecalho and file.tell() == 0:
+                file.write(self.cabecalho)
+            file.write(dados)
+            file.flush()
+        COMMIT.registrar(self)
+
+    def sincronizar(self):
+        fd = ARQUIVOS.duplicar(self.caminho)
+        if fd is None:
+            return  # fechado pelo pool, que já fez o fsync
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class GrupoCommit:
+    """Faz o fsync dos logs alterados em grupo, numa thread própria.
+
+    Dentro de `coletar()` (a tarefa escritora do ArmazenamentoAssincrono), os
+    logs alterados por uma operação são só anotados; `confirmar` devolve um
+    Future que termina quando todos tiveram fsync. Enquanto um grupo está no
+    disco, as próximas operações continuam acrescentando, e o grupo seguinte
+    sai com um único fsync por arquivo, não importa quantos registros tenha.
+    Os arquivos de um grupo são sincronizados em paralelo (`paralelos`
+    threads): o sistema de arquivos junta fsyncs simultâneos num único
+    commit do journal. Fora de `coletar()` (scripts, chamadas diretas) o
+    fsync é feito na hora. Com `fsync` desligado nada é sincronizado (os
+    dados ficam no cache do SO).
+    """
+
+    def __init__(self, fsync=True, paralelos=FSYNC_PARALELOS):
+        self.fsync = fsync
+        self.paralelos = paralelos
+        self.grupos = 0
+        self._local = threading.local()
+        self._pedidos = []   # [(logs, Future)]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pool = None
+
+    @contextlib.contextmanager
+    def coletar(self):
+        """Anota (em ordem) os logs alterados no bloco, em vez de sincronizá-los."""
+        anteriores = getattr(self._local, 'logs', None)
+        self._local.logs = logs = {}
+        try:
+            yield logs
+        finally:
+            self._local.logs = anteriores
+
+    def registrar(self, log):
+        if not self.fsync:
+            return
+        logs = getattr(self._local, 'logs', None)
+        if logs is None:
+            log.sincronizar()
+        else:
+            logs.setdefault(log.caminho, log)
+
+    def confirmar(self, logs):
+        """Future concluído quando os `logs` tiverem fsync."""
+        futuro = concurrent.futures.Future()
+        if not self.fsync or not logs:
+            futuro.set_result(None)
+            return futuro
+        with self._cond:
+            if self._thread is None:
+                self._pool = concurrent.futures.ThreadPoolExecutor(self.paralelos, thread_name_prefix='fsync')
+                self._thread = threading.Thread(target=self._laco, name='group-commit', daemon=True)
+                self._thread.start()
+            self._pedidos.append((list(logs.values()), futuro))
+            self._cond.notify()
+        return futuro
+
+    def _laco(self):
+        while True:
+            with self._cond:
+                while not self._pedidos:
+                    self._cond.wait()
+                pedidos, self._pedidos = self._pedidos, []
+            logs = {}
+            for lista, _ in pedidos:
+                for log in lista:
+                    logs.setdefault(log.caminho, log)
+            erro = None
+            pendentes = {self._pool.submit(log.sincronizar): log for log in logs.values()}
+            for feito, log in pendentes.items():
+                try:
+                    feito.result()
+                except OSError as e:
+                    erro = e
+                    print(f"Erro no fsync de {log.caminho}: {e}")
+            self.grupos += 1
+            for _, futuro in pedidos:
+                if erro is None:
+                    futuro.set_result(None)
+                else:
+                    futuro.set_exception(erro)
+
+
+COMMIT = GrupoCommit()
+
+
+def executar_coletando(operacao):
+    """Executa `operacao` anotando os logs que ela alterou: (resultado, logs)."""
+    with COMMIT.coletar() as logs:
+        return operacao(), logs
@@ -0,0 +1,174 @@
+import csv
+import gzip
+import importlib.util
+import io
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile
+
+from comum import HISTORICO_HEADERS, TIMEZONE, DATA_FORMATO, normalizar_nome
+
+# ===================================================
+# EXPORTAÇÃO EM STREAMING (FILTRADA, COMPRIMIDA, EM PARTES)
+# ===================================================
+
+TRADES_HEADERS = ['trade_id', 'data_hora_compra', 'jogador', 'plataforma', 'preco_compra',
+                  'data_hora_venda', 'preco_venda', 'lucro_liquido']
+
+# Bots só enviam documentos de até 50 MB; cada parte fica abaixo disso
+LIMITE_PARTE = 45 * 1024 * 1024
+# Linhas gravadas por vez (e entre as checagens de tamanho)
+LINHAS_POR_BLOCO = 5000
+# Acima disso o arquivo temporário sai da memória e vai para o disco
+MEMORIA_SPOOL = 1024 * 1024
+
+FORMATOS = {'csv': '.csv.gz', 'parquet': '.parquet'}
+COLUNAS_INTEIRAS = {'preco_moedas', 'trade_id', 'preco_compra', 'preco_venda', 'lucro_liquido'}
+
+
+def parquet_disponivel():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+class ErroExportacao(Exception):
+    """Formato indisponível ou filtro inválido."""
+
+
+class FiltroExportacao:
+    """Filtros aplicados linha a linha: jogador, plataforma e intervalo de datas (inclusive)."""
+
+    def __init__(self, jogador=None, plataforma=None, inicio=None, fim=None):
+        self.jogador = normalizar_nome(jogador) if jogador else None
+        self.plataforma = plataforma
+        self.inicio = inicio  # 'AAAA-MM-DD[ HH:MM:SS]'
+        self.fim = fim
+
+    @classmethod
+    def ultimos_dias(cls, dias, **kwargs):
+        inicio = (datetime.now(TIMEZONE) - timedelta(days=dias)).strftime(DATA_FORMATO)
+        return cls(inicio=inicio, **kwargs)
+
+    def aceita(self, linha, campo_data):
+        if self.jogador and normalizar_nome(linha['jogador']) != self.jogador:
+            return False
+        if self.plataforma and linha['plataforma'] != self.plataforma:
+            return False
+        data = linha.get(campo_data) or ''
+        if self.inicio and data < self.inicio:
+            return False
+        # Só a data no fim inclui o dia inteiro
+        if self.fim and data[:len(self.fim)] > self.fim:
+            return False
+        return True
+
+    def descricao(self):
+        partes = []
+        if self.jogador:
+            partes.append(self.jogador.title())
+        if self.plataforma:
+            partes.append(self.plataforma)
+        if self.inicio or self.fim:
+            partes.append(f"{(self.inicio or '...')[:10]} a {(self.fim or '...')[:10]}")
+        return ", ".join(partes) or "tudo"
+
+
+def filtrar(linhas, filtro, campo_data):
+    """Gerador: só as linhas aceitas pelo filtro."""
+    for linha in linhas:
+        if filtro.aceita(linha, campo_data):
+            yield linha
+
+
+def _blocos(linhas, tamanho):
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+class _ParteCSV:
+    """CSV comprimido com gzip, escrito direto no arquivo temporário."""
+
+    def __init__(self, colunas):
+        self.arquivo = SpooledTemporaryFile(max_size=MEMORIA_SPOOL)
+        self._gzip = gzip.GzipFile(fileobj=self.arquivo, mode='wb')
+        self._texto = io.TextIOWrapper(self._gzip, encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._texto, fieldnames=colunas, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def escrever(self, bloco):
+        self._writer.writerows(bloco)
+        self._texto.flush()
+
+    def fechar(self):
+        self._texto.flush()
+        self._texto.detach()
+        self._gzip.close()
+        return self.arquivo
+
+
+class _ParteParquet:
+    """Parquet colunar: cada bloco vira um row group."""
+
+    def __init__(self, colunas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.colunas = colunas
+        self.schema = pa.schema([(c, pa.int64() if c in COLUNAS_INTEIRAS else pa.string()) for c in colunas])
+        self.arquivo = SpooledTemporaryFile(max_size=MEMORIA_SPOOL)
+        self._writer = pq.ParquetWriter(self.arquivo, self.schema, compression='zstd')
+
+    def escrever(self, bloco):
+        self._writer.write_table(self._pa.Table.from_pydict(
+            {c: [linha.get(c) for linha in bloco] for c in self.colunas}, schema=self.schema,
+        ))
+
+    def fechar(self):
+        self._writer.close()
+        return self.arquivo
+
+
+def exportar_partes(linhas, colunas, formato='csv', limite=LIMITE_PARTE, bloco=LINHAS_POR_BLOCO):
+    """Gerador de arquivos temporários (já posicionados no início), um por parte.
+
+    As linhas são consumidas em blocos; quando a parte atual passa de
+    `limite` bytes ela é fechada e entregue, e uma nova começa (cada parte é
+    um arquivo completo, com cabeçalho). Quem recebe deve fechar o arquivo.
+    """
+    if formato == 'parquet' and not parquet_disponivel():
+        raise ErroExportacao("Exportação Parquet requer o pacote pyarrow.")
+    if formato not in FORMATOS:
+        raise ErroExportacao(f"Formato desconhecido: {formato}")
+    nova_parte = _ParteParquet if formato == 'parquet' else _ParteCSV
+
+    parte = None
+    for linhas_bloco in _blocos(linhas, bloco):
+        if parte is None:
+            parte = nova_parte(colunas)
+        parte.escrever(linhas_bloco)
+        if parte.arquivo.tell() >= limite:
+            arquivo = parte.fechar()
+            arquivo.seek(0)
+            yield arquivo
+            parte = None
+    if parte is not None:
+        arquivo = parte.fechar()
+        arquivo.seek(0)
+        yield arquivo
+
+
+def nome_parte(base, formato, indice):
+    """'historico.csv.gz', ou 'historico.parte2.csv.gz' a partir da segunda parte."""
+    sufixo = f".parte{indice}" if indice > 1 else ""
+    return f"{base}{sufixo}{FORMATOS[formato]}"
+
+
+DATASETS = {
+    # nome: (colunas, campo de data usado no filtro)
+    'historico': (HISTORICO_HEADERS, 'data_hora'),
+    'carteira': (TRADES_HEADERS, 'data_hora_compra'),
+}
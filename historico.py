@@ -0,0 +1,232 @@
+import bisect
+import csv
+import threading
+from collections import namedtuple
+
+from comum import HISTORICO_FILE, HISTORICO_HEADERS, init_csv, agora_str, limpar_preco, normalizar_nome
+from durabilidade import LogAppend, linhas_csv
+from metricas import METRICAS
+
+# ===================================================
+# ÍNDICE EM MEMÓRIA DO HISTÓRICO DE PREÇOS
+# ===================================================
+
+RegistroPreco = namedtuple('RegistroPreco', ['data_hora', 'jogador', 'preco_moedas', 'plataforma'])
+# Página de uma listagem (registros do mais novo para o mais antigo) e os cursores
+# para as páginas vizinhas (None quando não há mais nada naquela direção)
+Pagina = namedtuple('Pagina', ['registros', 'cursor_antigos', 'cursor_novos'])
+
+# Bytes lidos por vez ao andar para trás no CSV
+BLOCO_LEITURA = 64 * 1024
+
+
+class HistoricoStore:
+    """Carrega o CSV de preços uma única vez e mantém um índice por jogador.
+
+    Cada jogador (nome normalizado) aponta para a lista dos seus registros em
+    ordem cronológica, então as consultas custam O(registros do jogador) e não
+    O(tamanho do arquivo). O índice só é montado na primeira consulta que
+    precisa dele: `registrar` apenas faz o append no CSV (e atualiza o índice
+    se ele já estiver carregado).
+    """
+
+    def __init__(self, filename=HISTORICO_FILE):
+        self.filename = filename
+        self._log = LogAppend(filename, cabecalho=linhas_csv([HISTORICO_HEADERS]))
+        self._por_jogador = {}
+        self._chaves = []  # chaves de _por_jogador em ordem alfabética (paginação)
+        self._carregado = False
+        self._lock = threading.RLock()
+
+    def carregar(self):
+        """Lê o CSV inteiro para o índice (apenas na primeira chamada)."""
+        with self._lock:
+            if self._carregado:
+                return
+            self._log.recuperar()
+            init_csv(self.filename, HISTORICO_HEADERS)
+            indice = {}
+            try:
+                with open(self.filename, 'r', encoding='utf-8') as file:
+                    reader = csv.DictReader(file)
+                    for row in reader:
+                        registro = self._linha_para_registro(row)
+                        if registro is None:
+                            continue
+                        indice.setdefault(normalizar_nome(registro.jogador), []).append(registro)
+                    METRICAS.contar('linhas_csv_lidas_total', max(reader.line_num - 1, 0),
+                                    arquivo='historico', operacao='carregar')
+            except FileNotFoundError:
+                pass
+            self._por_jogador = indice
+            self._chaves = sorted(indice)
+            self._carregado = True
+
+    @staticmethod
+    def _linha_para_registro(row):
+        try:
+            preco = int(row.get('preco_moedas') or 0)
+        except ValueError:
+            return None
+        return RegistroPreco(row.get('data_hora', ''), row.get('jogador', ''), preco, row.get('plataforma') or '')
+
+    def registrar(self, jogador, preco_moedas, plataforma):
+        """Adiciona o registro ao CSV e ao índice. Retorna o RegistroPreco gravado."""
+        try:
+            preco_limpo = limpar_preco(preco_moedas)
+        except ValueError:
+            preco_limpo = 0
+        registro = RegistroPreco(agora_str(), jogador, preco_limpo, plataforma)
+
+        with self._lock:
+            self._log.acrescentar(linhas_csv([registro]))
+            if self._carregado:
+                self._indexar(registro)
+        return registro
+
+    def registrar_lote(self, amostras):
+        """Grava várias amostras [(jogador, preço, plataforma)] com um único append."""
+        data_hora = agora_str()
+        registros = [RegistroPreco(data_hora, jogador, int(preco), plataforma) for jogador, preco, plataforma in amostras]
+        with self._lock:
+            self._log.acrescentar(linhas_csv(registros))
+            for registro in registros if self._carregado else ():
+                self._indexar(registro)
+        return registros
+
+    def _indexar(self, registro):
+        chave = normalizar_nome(registro.jogador)
+        registros = self._por_jogador.get(chave)
+        if registros is None:
+            registros = self._por_jogador[chave] = []
+            bisect.insort(self._chaves, chave)
+        registros.append(registro)
+
+    def iterar(self):
+        """Registros como dicts, lidos do CSV em streaming (sem montar lista)."""
+        self._log.recuperar()
+        init_csv(self.filename, HISTORICO_HEADERS)
+        with open(self.filename, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            try:
+                for row in reader:
+                    registro = self._linha_para_registro(row)
+                    if registro is not None:
+                        yield registro._asdict()
+            finally:
+                METRICAS.contar('linhas_csv_lidas_total', max(reader.line_num - 1, 0),
+                                arquivo='historico', operacao='iterar')
+
+    def series(self):
+        """Preços de cada (jogador normalizado, plataforma), em ordem cronológica."""
+        self.carregar()
+        series = {}
+        with self._lock:
+            for chave, registros in self._por_jogador.items():
+                for registro in registros:
+                    if registro.preco_moedas > 0:
+                        series.setdefault((chave, registro.plataforma), []).append(registro.preco_moedas)
+        return series
+
+    def ultimos(self, jogador, n):
+        """Últimos N registros do jogador, do mais antigo para o mais novo."""
+        self.carregar()
+        with self._lock:
+            registros = self._por_jogador.get(normalizar_nome(jogador), [])
+            return registros[-n:] if n > 0 else []
+
+    # ---------------------------------------------------
+    # Paginação (cursor = offset em bytes no CSV ou posição na lista do jogador)
+    # ---------------------------------------------------
+
+    def _inicio_dados(self, file):
+        """Offset da primeira linha depois do cabeçalho, e o cabeçalho."""
+        file.seek(0)
+        cabecalho = file.readline()
+        return file.tell(), next(csv.reader([cabecalho.decode('utf-8')]), HISTORICO_HEADERS)
+
+    def _decodificar(self, linhas, cabecalho):
+        METRICAS.contar('linhas_csv_lidas_total', len(linhas), arquivo='historico', operacao='pagina')
+        registros = []
+        for linha in linhas:
+            valores = next(csv.reader([linha.decode('utf-8', errors='replace')]), None)
+            registro = self._linha_para_registro(dict(zip(cabecalho, valores or [])))
+            if registro is not None:
+                registros.append(registro)
+        return registros
+
+    @staticmethod
+    def _linhas_antes(file, fim, n, minimo):
+        """Até N linhas completas que terminam em `fim`: [(offset, bytes)], lendo blocos de trás para frente."""
+        pos, bloco = fim, b''
+        while pos > minimo and bloco.count(b'\n') <= n:
+            passo = min(BLOCO_LEITURA, pos - minimo)
+            pos -= passo
+            file.seek(pos)
+            bloco = file.read(passo) + bloco
+        if pos > minimo:  # o primeiro pedaço é o fim de uma linha anterior
+            corte = bloco.index(b'\n') + 1
+            pos, bloco = pos + corte, bloco[corte:]
+        linhas, offset = [], pos
+        for linha in bloco.split(b'\n')[:-1]:
+            linhas.append((offset, linha))
+            offset += len(linha) + 1
+        return linhas[-n:]
+
+    @staticmethod
+    def _linhas_depois(file, inicio, n):
+        """Até N linhas completas a partir de `inicio`: [(offset, bytes)]."""
+        file.seek(inicio)
+        linhas = []
+        while len(linhas) < n:
+            offset = file.tell()
+            linha = file.readline()
+            if not linha.endswith(b'\n'):  # fim do arquivo (ou linha ainda sendo gravada)
+                break
+            linhas.append((offset, linha[:-1]))
+        return linhas
+
+    def pagina_recentes(self, n, antes=None, depois=None):
+        """N registros mais novos do usuário, todos os jogadores. Cada página faz um seek e lê só o próprio trecho."""
+        self._log.recuperar()
+        init_csv(self.filename, HISTORICO_HEADERS)
+        with open(self.filename, 'rb') as file:
+            inicio_dados, cabecalho = self._inicio_dados(file)
+            file.seek(0, 2)
+            tamanho = file.tell()
+            if depois is not None:
+                linhas = self._linhas_depois(file, max(depois, inicio_dados), n)
+            else:
+                fim = tamanho if antes is None else min(max(antes, inicio_dados), tamanho)
+                linhas = self._linhas_antes(file, fim, n, inicio_dados)
+            if not linhas:
+                return Pagina([], None, None)
+            primeiro = linhas[0][0]
+            ultimo = linhas[-1][0] + len(linhas[-1][1]) + 1
+            # Há algo mais novo se, depois da página, existe ao menos uma linha completa
+            mais_novos = ultimo if self._linhas_depois(file, ultimo, 1) else None
+        registros = self._decodificar([linha for _, linha in linhas], cabecalho)
+        return Pagina(registros[::-1], primeiro if primeiro > inicio_dados else None, mais_novos)
+
+    def pagina_jogador(self, jogador, n, antes=None, depois=None):
+        """N registros de um jogador, do mais novo para o mais antigo (fatia do índice em memória)."""
+        self.carregar()
+        with self._lock:
+            registros = self._por_jogador.get(normalizar_nome(jogador), [])
+            total = len(registros)
+            if depois is not None:
+                inicio = max(0, depois)
+                fim = min(total, inicio + n)
+            else:
+                fim = total if antes is None else min(max(antes, 0), total)
+                inicio = max(0, fim - n)
+            fatia = registros[inicio:fim]
+        return Pagina(fatia[::-1], inicio if inicio > 0 else None, fim if fim < total else None)
+
+    def jogadores(self, n, inicio=0):
+        """N jogadores em ordem alfabética a partir da posição `inicio`: [(chave, último registro)], próxima posição."""
+        self.carregar()
+        with self._lock:
+            pagina = [(chave, self._por_jogador[chave][-1]) for chave in self._chaves[inicio:inicio + n]]
+            proximo = inicio + n if inicio + n < len(self._chaves) else None
+        return pagina, proximo
@@ -0,0 +1,426 @@
+import argparse
+import bisect
+import csv
+import os
+import threading
+import time
+
+import numpy as np
+
+from comum import HISTORICO_FILE, HISTORICO_HEADERS, DATA_FORMATO, limpar_preco, normalizar_nome
+from durabilidade import LogAppend
+from historico import RegistroPreco, Pagina
+
+# ===================================================
+# HISTÓRICO EM FORMATO BINÁRIO (REGISTROS FIXOS, MEMORY-MAPPED)
+# ===================================================
+
+HISTORICO_BIN_FILE = 'preços_historico.bin'
+
+# Um registro = 24 bytes little-endian: epoch (s), preço, id do jogador, código da plataforma.
+# Sem NumPy o mesmo layout sai de um mmap com struct.iter_unpack('<qqIHH', ...).
+REGISTRO = np.dtype([
+    ('data_hora', '<i8'),
+    ('preco_moedas', '<i8'),
+    ('jogador', '<u4'),
+    ('plataforma', '<u2'),
+    ('_reservado', '<u2'),
+])
+
+# Registros convertidos por vez (conversores e iterar)
+LOTE = 100_000
+
+
+def _data_str(epoch):
+    return time.strftime(DATA_FORMATO, time.gmtime(int(epoch)))
+
+
+def _epochs(datas):
+    """'AAAA-MM-DD HH:MM:SS' (UTC) -> epoch, vetorizado; datas inválidas viram -1."""
+    try:
+        return np.array(datas, dtype='datetime64[s]').astype(np.int64)
+    except ValueError:
+        resultado = np.empty(len(datas), dtype=np.int64)
+        for i, data in enumerate(datas):
+            try:
+                resultado[i] = np.datetime64(data, 's').astype(np.int64)
+            except ValueError:
+                resultado[i] = -1
+        return resultado
+
+
+class _Dicionario:
+    """Textos internados (nomes de jogadores ou plataformas): id = linha do arquivo."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.textos = []
+        self.ids = {}
+        self._log = LogAppend(arquivo)
+
+    def carregar(self):
+        self._log.recuperar()
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as file:
+                self.textos = [linha.rstrip('\n') for linha in file]
+        except FileNotFoundError:
+            self.textos = []
+        self.ids = {texto: i for i, texto in enumerate(self.textos)}
+
+    def id(self, texto):
+        """Id do texto, gravando-o no arquivo antes se for novo (os registros nunca apontam para um id inexistente)."""
+        texto = str(texto).replace('\n', ' ')
+        existente = self.ids.get(texto)
+        if existente is not None:
+            return existente
+        self._log.acrescentar((texto + '\n').encode('utf-8'))
+        self.ids[texto] = len(self.textos)
+        self.textos.append(texto)
+        return self.ids[texto]
+
+
+class HistoricoBinario:
+    """Histórico de preços em registros binários de tamanho fixo, lido via memmap.
+
+    O arquivo principal só recebe appends de registros de 24 bytes
+    (REGISTRO); nomes de jogadores e plataformas ficam em dicionários ao
+    lado (`.jogadores`, `.plataformas`), um texto por linha. As leituras
+    usam uma visão NumPy memmap do arquivo, sem copiar nem parsear nada.
+
+    A tabela de offsets por jogador (índices dos registros agrupados por
+    jogador, em ordem cronológica, e o início de cada grupo) é montada na
+    primeira consulta por jogador com uma contagem e uma ordenação estável
+    vetorizadas; registros gravados depois entram numa lista por jogador.
+    Mesma interface do HistoricoStore (CSV).
+    """
+
+    def __init__(self, filename=HISTORICO_BIN_FILE):
+        self.filename = filename
+        self._jogadores = _Dicionario(filename + '.jogadores')
+        self._plataformas = _Dicionario(filename + '.plataformas')
+        self._por_chave = {}       # nome normalizado -> [ids de jogador]
+        self._chaves = []          # chaves de _por_chave em ordem alfabética (paginação)
+        self._mapa = None          # memmap dos registros completos
+        self._ordem = None         # índices dos registros, agrupados por jogador
+        self._inicios = None       # id de jogador -> início do grupo em _ordem
+        self._indexados = 0        # registros cobertos por _ordem/_inicios
+        self._extras = {}          # id de jogador -> [índices gravados depois da tabela]
+        self._log = LogAppend(filename, tamanho_registro=REGISTRO.itemsize)
+        self._carregado = False
+        self._lock = threading.RLock()
+
+    def carregar(self):
+        """Lê os dicionários (os registros em si nunca são carregados, só mapeados)."""
+        with self._lock:
+            if self._carregado:
+                return
+            self._jogadores.carregar()
+            self._plataformas.carregar()
+            self._log.recuperar()
+            self._descartar_orfaos()
+            self._por_chave = {}
+            for jogador_id, nome in enumerate(self._jogadores.textos):
+                self._por_chave.setdefault(normalizar_nome(nome), []).append(jogador_id)
+            self._chaves = sorted(self._por_chave)
+            self._carregado = True
+
+    # ---------------------------------------------------
+    # Gravação
+    # ---------------------------------------------------
+
+    def _descartar_orfaos(self):
+        """Corta registros do fim que apontam para um nome ou plataforma que não chegou ao disco.
+
+        Os dicionários são gravados antes dos registros, mas numa queda de
+        energia o fsync de um grupo pode ter chegado só ao arquivo principal.
+        """
+        total = os.path.getsize(self.filename) // REGISTRO.itemsize if os.path.exists(self.filename) else 0
+        if not total:
+            return
+        mapa = np.memmap(self.filename, dtype=REGISTRO, mode='r', shape=(total,))
+        jogadores, plataformas = len(self._jogadores.textos), len(self._plataformas.textos)
+        fim = total
+        while fim > 0:
+            inicio = max(0, fim - LOTE)
+            bloco = mapa[inicio:fim]
+            invalidos = np.flatnonzero((bloco['jogador'] >= jogadores) | (bloco['plataforma'] >= plataformas))
+            if not len(invalidos):
+                break
+            fim = inicio + int(invalidos[0])
+        del mapa
+        if fim < total:
+            self._log.truncar(fim * REGISTRO.itemsize)
+            print(f"{self.filename}: {total - fim} registros sem nome gravado descartados.")
+
+    def _acrescentar(self, registros):
+        """Append de um array REGISTRO (a cauda incompleta de uma gravação interrompida é descartada antes)."""
+        self._log.acrescentar(registros.tobytes())
+
+    def _id_jogador(self, nome):
+        jogador_id = self._jogadores.id(nome)
+        chave = normalizar_nome(nome)
+        ids = self._por_chave.get(chave)
+        if ids is None:
+            ids = self._por_chave[chave] = []
+            bisect.insort(self._chaves, chave)
+        if jogador_id not in ids:
+            ids.append(jogador_id)
+        return jogador_id
+
+    def _novos_registros(self, amostras, epoch):
+        """Array REGISTRO para [(jogador, preço, plataforma)], internando nomes e plataformas novos."""
+        registros = np.zeros(len(amostras), dtype=REGISTRO)
+        registros['data_hora'] = epoch
+        registros['preco_moedas'] = [preco for _, preco, _ in amostras]
+        registros['jogador'] = [self._id_jogador(jogador) for jogador, _, _ in amostras]
+        registros['plataforma'] = [self._plataformas.id(plataforma) for _, _, plataforma in amostras]
+        return registros
+
+    def registrar(self, jogador, preco_moedas, plataforma):
+        """Adiciona o registro ao arquivo. Retorna o RegistroPreco gravado."""
+        try:
+            preco_limpo = limpar_preco(preco_moedas)
+        except ValueError:
+            preco_limpo = 0
+        return self.registrar_lote([(jogador, preco_limpo, plataforma)])[0]
+
+    def registrar_lote(self, amostras):
+        """Grava várias amostras [(jogador, preço, plataforma)] com um único append."""
+        self.carregar()
+        epoch = int(time.time())
+        with self._lock:
+            registros = self._novos_registros([(j, int(p), pl) for j, p, pl in amostras], epoch)
+            self._acrescentar(registros)
+        data_hora = _data_str(epoch)
+        return [RegistroPreco(data_hora, jogador, int(preco), plataforma) for jogador, preco, plataforma in amostras]
+
+    # ---------------------------------------------------
+    # Leitura
+    # ---------------------------------------------------
+
+    def registros(self):
+        """Visão memmap (sem cópia) de todos os registros completos."""
+        self.carregar()
+        with self._lock:
+            total = os.path.getsize(self.filename) // REGISTRO.itemsize if os.path.exists(self.filename) else 0
+            if self._mapa is None or len(self._mapa) != total:
+                if total:
+                    self._mapa = np.memmap(self.filename, dtype=REGISTRO, mode='r', shape=(total,))
+                else:
+                    self._mapa = np.empty(0, dtype=REGISTRO)
+            return self._mapa
+
+    def _para_registros(self, linhas):
+        nomes, plataformas = self._jogadores.textos, self._plataformas.textos
+        return [
+            RegistroPreco(_data_str(data_hora), nomes[jogador], int(preco), plataformas[plataforma])
+            for data_hora, preco, jogador, plataforma in zip(
+                linhas['data_hora'].tolist(), linhas['preco_moedas'].tolist(),
+                linhas['jogador'].tolist(), linhas['plataforma'].tolist(),
+            )
+        ]
+
+    def _tabela(self):
+        """Monta (ou completa) a tabela de offsets por jogador e retorna os registros."""
+        registros = self.registros()
+        with self._lock:
+            if self._ordem is None:
+                ids = registros['jogador']
+                contagem = np.bincount(ids, minlength=len(self._jogadores.textos)) if len(ids) else np.zeros(0, np.int64)
+                self._inicios = np.concatenate(([0], np.cumsum(contagem)))
+                self._ordem = np.argsort(ids, kind='stable')
+                self._indexados = len(registros)
+                self._extras = {}
+            elif len(registros) > self._indexados:
+                novos = registros['jogador'][self._indexados:].tolist()
+                for indice, jogador_id in enumerate(novos, self._indexados):
+                    self._extras.setdefault(jogador_id, []).append(indice)
+                self._indexados = len(registros)
+        return registros
+
+    def indices_jogador(self, jogador):
+        """Índices (em ordem cronológica) dos registros do jogador; uma fatia da tabela quando possível."""
+        self._tabela()
+        with self._lock:
+            partes = []
+            for jogador_id in self._por_chave.get(normalizar_nome(jogador), []):
+                if jogador_id + 1 < len(self._inicios):
+                    partes.append(self._ordem[self._inicios[jogador_id]:self._inicios[jogador_id + 1]])
+                if jogador_id in self._extras:
+                    partes.append(np.asarray(self._extras[jogador_id], dtype=np.int64))
+        partes = [parte for parte in partes if len(parte)]
+        if not partes:
+            return np.zeros(0, dtype=np.int64)
+        if len(partes) == 1:
+            return partes[0]
+        return np.sort(np.concatenate(partes))
+
+    def iterar(self):
+        """Registros como dicts, em blocos (sem montar lista)."""
+        registros = self.registros()
+        for inicio in range(0, len(registros), LOTE):
+            for registro in self._para_registros(registros[inicio:inicio + LOTE]):
+                yield registro._asdict()
+
+    def series(self):
+        """Preços de cada (jogador normalizado, plataforma), em ordem cronológica (arrays NumPy)."""
+        registros = self.registros()
+        with self._lock:
+            nomes, plataformas = list(self._jogadores.textos), list(self._plataformas.textos)
+        registros = registros[registros['preco_moedas'] > 0]
+        if not len(registros):
+            return {}
+        grupos = {}
+        grupo_de_id = np.array([grupos.setdefault(normalizar_nome(nome), len(grupos)) for nome in nomes], dtype=np.int64)
+        chaves = list(grupos)
+        n_plataformas = max(len(plataformas), 1)
+        chave = grupo_de_id[registros['jogador']] * n_plataformas + registros['plataforma']
+        ordem = np.argsort(chave, kind='stable')
+        chave, precos = chave[ordem], registros['preco_moedas'][ordem]
+        cortes = np.flatnonzero(np.diff(chave)) + 1
+        series = {}
+        for codigo, bloco in zip(chave[np.r_[0, cortes]].tolist(), np.split(precos, cortes)):
+            grupo, plataforma = divmod(codigo, n_plataformas)
+            series[(chaves[grupo], plataformas[plataforma])] = bloco
+        return series
+
+    def series_jogador(self, jogador):
+        """{plataforma: preços} de um jogador, lidos da fatia dele; a plataforma do registro mais novo vem por último."""
+        linhas = self.registros()[self.indices_jogador(jogador)]
+        linhas = linhas[linhas['preco_moedas'] > 0]
+        if not len(linhas):
+            return {}
+        with self._lock:
+            plataformas = list(self._plataformas.textos)
+        codigos = linhas['plataforma']
+        ultima = int(codigos[-1])
+        ordem = [int(codigo) for codigo in np.unique(codigos) if codigo != ultima] + [ultima]
+        return {plataformas[codigo]: linhas['preco_moedas'][codigos == codigo] for codigo in ordem}
+
+    def ultimos(self, jogador, n):
+        """Últimos N registros do jogador, do mais antigo para o mais novo."""
+        if n <= 0:
+            return []
+        registros = self.registros()
+        return self._para_registros(registros[self.indices_jogador(jogador)[-n:]])
+
+    # ---------------------------------------------------
+    # Paginação (cursor = índice do registro ou posição na lista do jogador)
+    # ---------------------------------------------------
+
+    @staticmethod
+    def _janela(total, n, antes, depois):
+        if depois is not None:
+            inicio = max(0, depois)
+            fim = min(total, inicio + n)
+        else:
+            fim = total if antes is None else min(max(antes, 0), total)
+            inicio = max(0, fim - n)
+        return inicio, fim
+
+    def pagina_recentes(self, n, antes=None, depois=None):
+        """N registros mais novos do usuário, todos os jogadores (fatia direta do memmap)."""
+        registros = self.registros()
+        inicio, fim = self._janela(len(registros), n, antes, depois)
+        pagina = self._para_registros(registros[inicio:fim])
+        return Pagina(pagina[::-1], inicio if inicio > 0 else None, fim if fim < len(registros) else None)
+
+    def pagina_jogador(self, jogador, n, antes=None, depois=None):
+        """N registros de um jogador, do mais novo para o mais antigo."""
+        indices = self.indices_jogador(jogador)
+        inicio, fim = self._janela(len(indices), n, antes, depois)
+        pagina = self._para_registros(self.registros()[indices[inicio:fim]])
+        return Pagina(pagina[::-1], inicio if inicio > 0 else None, fim if fim < len(indices) else None)
+
+    def jogadores(self, n, inicio=0):
+        """N jogadores em ordem alfabética a partir da posição `inicio`: [(chave, último registro)], próxima posição."""
+        registros = self._tabela()
+        pagina = []
+        with self._lock:
+            chaves = self._chaves
+            i = inicio
+            while i < len(chaves) and len(pagina) < n:
+                indices = self.indices_jogador(chaves[i])
+                if len(indices):
+                    pagina.append((chaves[i], self._para_registros(registros[indices[-1:]])[0]))
+                i += 1
+            proximo = i if pagina and i < len(chaves) else None
+        return pagina, proximo
+
+
+# ===================================================
+# CONVERSÃO CSV <-> BINÁRIO
+# ===================================================
+
+def csv_para_binario(caminho_csv, caminho_bin, lote=LOTE):
+    """Converte um CSV de histórico; linhas com preço ou data inválidos são ignoradas. Retorna quantas entraram."""
+    destino = HistoricoBinario(caminho_bin)
+    destino.carregar()
+    total = 0
+
+    def gravar(linhas):
+        epochs = _epochs([linha[0] for linha in linhas])
+        validos = [(linha, epoch) for linha, epoch in zip(linhas, epochs.tolist()) if epoch >= 0]
+        registros = destino._novos_registros([linha[1:] for linha, _ in validos], 0)
+        registros['data_hora'] = [epoch for _, epoch in validos]
+        destino._acrescentar(registros)
+        return len(registros)
+
+    with open(caminho_csv, 'r', encoding='utf-8') as file:
+        linhas = []
+        for row in csv.DictReader(file):
+            try:
+                preco = int(row.get('preco_moedas') or 0)
+            except ValueError:
+                continue
+            linhas.append((row.get('data_hora', ''), row.get('jogador', ''), preco, row.get('plataforma') or ''))
+            if len(linhas) >= lote:
+                total += gravar(linhas)
+                linhas = []
+        if linhas:
+            total += gravar(linhas)
+    return total
+
+
+def binario_para_csv(caminho_bin, caminho_csv, lote=LOTE):
+    """Converte de volta para o CSV de histórico. Retorna quantos registros foram escritos."""
+    origem = HistoricoBinario(caminho_bin)
+    registros = origem.registros()
+    nomes = np.array(origem._jogadores.textos + [''], dtype=object)
+    plataformas = np.array(origem._plataformas.textos + [''], dtype=object)
+    with open(caminho_csv, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(HISTORICO_HEADERS)
+        for inicio in range(0, len(registros), lote):
+            bloco = registros[inicio:inicio + lote]
+            datas = np.char.replace(np.datetime_as_string(bloco['data_hora'].astype('datetime64[s]')), 'T', ' ')
+            writer.writerows(zip(
+                datas.tolist(), nomes[bloco['jogador']].tolist(),
+                bloco['preco_moedas'].tolist(), plataformas[bloco['plataforma']].tolist(),
+            ))
+    return len(registros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte o histórico de preços entre CSV e o formato binário.")
+    sub = parser.add_subparsers(dest='direcao', required=True)
+    para_bin = sub.add_parser('para-binario', help="CSV -> binário")
+    para_bin.add_argument('csv', nargs='?', default=HISTORICO_FILE)
+    para_bin.add_argument('binario', nargs='?', default=HISTORICO_BIN_FILE)
+    para_csv = sub.add_parser('para-csv', help="binário -> CSV")
+    para_csv.add_argument('binario', nargs='?', default=HISTORICO_BIN_FILE)
+    para_csv.add_argument('csv', nargs='?', default=HISTORICO_FILE)
+    args = parser.parse_args()
+
+    if args.direcao == 'para-binario':
+        if os.path.exists(args.binario):
+            parser.error(f"{args.binario} já existe.")
+        print(f"{csv_para_binario(args.csv, args.binario)} registros -> {args.binario}")
+    else:
+        if os.path.exists(args.csv):
+            parser.error(f"{args.csv} já existe.")
+        print(f"{binario_para_csv(args.binario, args.csv)} registros -> {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from durabilidade import LogAppend
+
+# ===================================================
+# ÍNDICE DE NOMES DE JOGADORES (BUSCA APROXIMADA)
+# ===================================================
+
+
+def dobrar_nome(nome):
+    """Forma usada na busca: sem acentos, minúsculas, sem pontuação ('Vinícius Jr.' -> 'vinicius jr')."""
+    sem_acentos = ''.join(
+        c for c in unicodedata.normalize('NFKD', str(nome)) if not unicodedata.combining(c)
+    )
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', sem_acentos.lower()).split())
+
+
+def trigramas(dobrado):
+    """Trigramas de cada palavra, com as bordas marcadas (como no pg_trgm)."""
+    resultado = set()
+    for palavra in dobrado.split():
+        texto = f"  {palavra} "
+        resultado.update(texto[i:i + 3] for i in range(len(texto) - 2))
+    return resultado
+
+
+class IndiceNomes:
+    """Nomes de jogadores conhecidos, com busca tolerante a acentos, pontuação e erros de digitação.
+
+    Cada nome vira uma chave dobrada (`dobrar_nome`) e um conjunto de
+    trigramas. Os candidatos vêm de duas estruturas: uma lista ordenada das
+    palavras (consultas por prefixo, via busca binária) e um índice invertido
+    trigrama -> nomes (erros de digitação). Só os candidatos são ranqueados,
+    por similaridade de Jaccard com bônus para prefixos. Os nomes são
+    persistidos num arquivo texto (um por linha, só com appends).
+    """
+
+    # Ids lidos das listas invertidas por busca (as dos trigramas mais raros primeiro)
+    ORCAMENTO_POSTAGENS = 1500
+    # Candidatos com mais trigramas em comum que recebem a pontuação completa
+    MAX_CANDIDATOS = 32
+    # Palavras examinadas na busca por prefixo
+    MAX_PREFIXO = 256
+
+    def __init__(self, arquivo=None):
+        self.arquivo = arquivo
+        self._nomes = []        # id -> nome de exibição
+        self._dobrados = []     # id -> chave dobrada
+        self._trigramas = []    # id -> frozenset de trigramas
+        self._por_chave = {}    # chave dobrada -> id
+        self._invertido = {}    # trigrama -> set de ids
+        self._palavras = []     # [(palavra, id)] ordenada, para prefixos
+        self._log = LogAppend(arquivo) if arquivo else None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nomes)
+
+    @property
+    def existe(self):
+        return bool(self.arquivo) and os.path.exists(self.arquivo)
+
+    def carregar(self):
+        if self._log:
+            self._log.recuperar()
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as file:
+                nomes = [linha.strip() for linha in file]
+        except FileNotFoundError:
+            return
+        with self._lock:
+            for nome in nomes:
+                if nome:
+                    self._indexar(nome, ordenar=False)
+            self._palavras.sort()
+
+    def _indexar(self, nome, ordenar=True):
+        """Inclui o nome se a chave ainda não existe. Retorna True se for novo.
+
+        Na carga em lote (`ordenar=False`) a lista de palavras é ordenada uma vez no fim.
+        """
+        chave = dobrar_nome(nome)
+        if not chave or chave in self._por_chave:
+            return False
+        novo_id = len(self._nomes)
+        tri = frozenset(trigramas(chave))
+        self._nomes.append(nome)
+        self._dobrados.append(chave)
+        self._trigramas.append(tri)
+        self._por_chave[chave] = novo_id
+        for t in tri:
+            self._invertido.setdefault(t, set()).add(novo_id)
+        for palavra in set(chave.split()):
+            if ordenar:
+                bisect.insort(self._palavras, (palavra, novo_id))
+            else:
+                self._palavras.append((palavra, novo_id))
+        return True
+
+    def adicionar(self, nome):
+        """Indexa um nome (ex: a cada registro) e grava no arquivo se for novo."""
+        nome = ' '.join(str(nome).split())
+        with self._lock:
+            novo = self._indexar(nome)
+        if novo and self._log:
+            self._log.acrescentar((nome + '\n').encode('utf-8'))
+        return novo
+
+    def exato(self, consulta):
+        """Nome conhecido com a mesma chave dobrada, ou None."""
+        with self._lock:
+            indice = self._por_chave.get(dobrar_nome(consulta))
+            return self._nomes[indice] if indice is not None else None
+
+    def buscar(self, consulta, limite=5, minimo=0.3):
+        """Até `limite` nomes parecidos com a consulta: [(nome, pontuação)], do melhor para o pior."""
+        chave = dobrar_nome(consulta)
+        if not chave:
+            return []
+        tri = trigramas(chave)
+        palavras = chave.split()
+        with self._lock:
+            exato = self._por_chave.get(chave)
+            candidatos = {exato} if exato is not None else set()
+            candidatos.update(self._por_prefixo(palavras))
+
+            postagens = sorted((self._invertido[t] for t in tri if t in self._invertido), key=len)
+            contagem = Counter()
+            lidos = 0
+            for i, ids in enumerate(postagens):
+                if i >= 2 and lidos + len(ids) > self.ORCAMENTO_POSTAGENS:
+                    break
+                lidos += len(ids)
+                contagem.update(ids)
+            candidatos.update(candidato for candidato, _ in contagem.most_common(self.MAX_CANDIDATOS))
+
+            resultados = []
+            for candidato in candidatos:
+                tri_candidato = self._trigramas[candidato]
+                comuns = len(tri & tri_candidato)
+                pontuacao = comuns / (len(tri) + len(tri_candidato) - comuns)
+                dobrado = self._dobrados[candidato]
+                if candidato == exato:
+                    pontuacao = 2.0
+                elif dobrado.startswith(chave):
+                    pontuacao += 0.3
+                elif self._prefixos_batem(palavras, dobrado):
+                    pontuacao += 0.5
+                if pontuacao >= minimo:
+                    resultados.append((pontuacao, -len(dobrado), candidato))
+            melhores = heapq.nlargest(limite, resultados)
+            return [(self._nomes[candidato], min(pontuacao, 1.0)) for pontuacao, _, candidato in melhores]
+
+    @staticmethod
+    def _prefixos_batem(palavras, dobrado):
+        """Cada palavra da consulta é início de alguma palavra do nome."""
+        palavras_nome = dobrado.split()
+        return all(any(p.startswith(q) for p in palavras_nome) for q in palavras)
+
+    def _por_prefixo(self, palavras):
+        """Ids cujas palavras começam com as da consulta (a palavra mais longa guia a busca binária)."""
+        guia = max(palavras, key=len)
+        encontrados = []
+        i = bisect.bisect_left(self._palavras, (guia,))
+        fim = min(len(self._palavras), i + self.MAX_PREFIXO)
+        while i < fim and self._palavras[i][0].startswith(guia):
+            candidato = self._palavras[i][1]
+            if len(palavras) == 1 or self._prefixos_batem(palavras, self._dobrados[candidato]):
+                encontrados.append(candidato)
+                if len(encontrados) >= self.MAX_CANDIDATOS:
+                    break
+            i += 1
+        return encontrados
@@ -0,0 +1,186 @@
+import asyncio
+import bisect
+import itertools
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from notificacoes import PRIORIDADE_INTERATIVA
+
+# ===================================================
+# ENVIO PARA O TELEGRAM (FILA COM LIMITE DE TAXA)
+# ===================================================
+
+# Métodos que contam nos limites de flood por chat; o resto (getMe, answerCallbackQuery...) passa direto
+PREFIXOS_LIMITADOS = ('send', 'edit', 'copy', 'forward')
+
+
+def _segundos(espera):
+    """`RetryAfter.retry_after` pode vir como int ou timedelta."""
+    return espera.total_seconds() if hasattr(espera, 'total_seconds') else float(espera)
+
+
+class BaldeTokens:
+    """Token bucket: `taxa` envios por segundo, com rajadas de até `capacidade`."""
+
+    __slots__ = ('taxa', 'capacidade', 'tokens', 'atualizado')
+
+    def __init__(self, taxa, capacidade, agora=None):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.atualizado = time.monotonic() if agora is None else agora
+
+    def _repor(self, agora):
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    def espera(self, agora):
+        """Segundos até haver um token (0 se já há)."""
+        self._repor(agora)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.taxa
+
+    def consumir(self, agora):
+        self._repor(agora)
+        self.tokens -= 1
+
+    def cheio(self, agora):
+        self._repor(agora)
+        return self.tokens >= self.capacidade
+
+
+class LimitadorEnvio(BaseRateLimiter):
+    """Limitador de taxa de todas as chamadas do bot à Bot API.
+
+    Cada envio (sendMessage, editMessageText, sendDocument...) espera um token
+    do balde global (`por_segundo`) e do balde do seu chat (`por_chat` em
+    privado, `por_minuto_grupo` em grupos). Quem espera fica numa fila única
+    ordenada por (prioridade, chegada): respostas interativas passam na frente
+    das notificações em lote (PRIORIDADE_LOTE), e um chat sem token não segura
+    os outros. Um 429 (RetryAfter) pausa o chat (ou tudo, sem chat) pelo tempo
+    pedido e o envio volta para a fila no mesmo lugar, até `max_tentativas`.
+
+    As respostas dos handlers continuam sendo aguardadas (só as exportações
+    vão para o segundo plano): a ordem na fila só vale até a requisição sair,
+    e duas mensagens do mesmo chat em voo ao mesmo tempo podem chegar trocadas
+    ao Telegram ("Buscando..." depois do resultado). Aguardar custa pouco, já
+    que a rajada do chat cobre as 2-3 mensagens de uma interação sem espera.
+    """
+
+    def __init__(self, por_segundo=25, por_chat=1.0, rajada_chat=3, por_minuto_grupo=20, max_tentativas=3):
+        self.por_segundo = por_segundo
+        self.por_chat = por_chat
+        self.rajada_chat = rajada_chat
+        self.por_minuto_grupo = por_minuto_grupo
+        self.max_tentativas = max_tentativas
+        self._global = BaldeTokens(por_segundo, por_segundo)
+        self._chats = {}         # chat_id -> BaldeTokens
+        self._pausas = {}        # chat_id (None = global) -> monotonic até quando
+        self._fila = []          # [prioridade, seq, chat_id, futuro], ordenada
+        self._seq = itertools.count()
+        self._timer = None
+
+    @property
+    def aguardando(self):
+        return len(self._fila)
+
+    def ajustar_taxa(self, por_segundo):
+        """Troca o teto global (ex: a fatia deste processo quando o bot roda em vários)."""
+        self.por_segundo = por_segundo
+        self._global.taxa = self._global.capacidade = por_segundo
+        self._global.tokens = min(self._global.tokens, por_segundo)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for *_, futuro in self._fila:
+            futuro.cancel()
+        self._fila.clear()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if not endpoint.startswith(PREFIXOS_LIMITADOS):
+            return await callback(*args, **kwargs)
+        prioridade = PRIORIDADE_INTERATIVA if rate_limit_args is None else rate_limit_args
+        chat_id = data.get('chat_id')
+        seq = next(self._seq)
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self._reservar(prioridade, seq, chat_id)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if tentativa == self.max_tentativas:
+                    raise
+                self._pausas[chat_id] = time.monotonic() + _segundos(e.retry_after)
+                print(f"Flood control em {endpoint} (chat {chat_id}): aguardando {e.retry_after}")
+
+    # --- Fila ---
+
+    async def _reservar(self, prioridade, seq, chat_id):
+        futuro = asyncio.get_running_loop().create_future()
+        bisect.insort(self._fila, [prioridade, seq, chat_id, futuro], key=lambda item: item[:2])
+        self._despachar()
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            # Cancelado na fila: o token não foi usado (se já tinha sido concedido, fica perdido)
+            self._fila = [item for item in self._fila if item[3] is not futuro]
+            raise
+
+    def _balde(self, chat_id, agora):
+        balde = self._chats.get(chat_id)
+        if balde is None:
+            if len(self._chats) >= 10000:
+                # Baldes cheios equivalem a um balde novo: descarta para não crescer sem limite
+                self._chats = {c: b for c, b in self._chats.items() if not b.cheio(agora)}
+            grupo = not isinstance(chat_id, int) or chat_id < 0
+            if grupo:
+                balde = BaldeTokens(self.por_minuto_grupo / 60, self.rajada_chat, agora)
+            else:
+                balde = BaldeTokens(self.por_chat, self.rajada_chat, agora)
+            self._chats[chat_id] = balde
+        return balde
+
+    def _espera_pausa(self, chave, agora):
+        ate = self._pausas.get(chave)
+        if ate is None:
+            return 0
+        if ate <= agora:
+            del self._pausas[chave]
+            return 0
+        return ate - agora
+
+    def _despachar(self):
+        """Libera, em ordem de prioridade, quem tem token global e do próprio chat."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        agora = time.monotonic()
+        proxima = None
+        restantes = []
+        for indice, item in enumerate(self._fila):
+            _, _, chat_id, futuro = item
+            if futuro.done():
+                continue
+            espera = max(self._global.espera(agora), self._espera_pausa(None, agora))
+            if espera > 0:
+                # Sem token global ninguém passa; os de menor prioridade continuam atrás
+                restantes.extend(self._fila[indice:])
+                proxima = espera
+                break
+            balde = self._balde(chat_id, agora)
+            espera = max(balde.espera(agora), self._espera_pausa(chat_id, agora))
+            if espera > 0:
+                restantes.append(item)
+                proxima = espera if proxima is None else min(proxima, espera)
+                continue
+            self._global.consumir(agora)
+            balde.consumir(agora)
+            futuro.set_result(None)
+        self._fila = restantes
+        if proxima is not None:
+            self._timer = asyncio.get_running_loop().call_later(proxima, self._despachar)
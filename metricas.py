@@ -0,0 +1,329 @@
+import collections
+import contextlib
+import functools
+import os
+import re
+import sys
+import threading
+import time
+
+# ===================================================
+# MÉTRICAS (FORMATO PROMETHEUS) E PERFILADOR DE REQUISIÇÕES LENTAS
+# ===================================================
+
+# Limites (segundos) dos buckets dos histogramas de latência
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_NADA = contextlib.nullcontext()
+
+
+def _rotulos(rotulos):
+    return tuple(sorted(rotulos.items()))
+
+
+def _formatar_rotulos(rotulos, extra=()):
+    pares = [*rotulos, *extra]
+    if not pares:
+        return ''
+    texto = ','.join(
+        f'{chave}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for chave, valor in pares
+    )
+    return '{' + texto + '}'
+
+
+class _Histograma:
+    __slots__ = ('contagens', 'soma', 'total')
+
+    def __init__(self):
+        self.contagens = [0] * len(BUCKETS_LATENCIA)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BUCKETS_LATENCIA):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+
+class Metricas:
+    """Registro de contadores, histogramas e medidores, exposto no formato texto do Prometheus.
+
+    Desligado (padrão), cada chamada só testa `ativo` e retorna: o custo nos
+    caminhos quentes é desprezível. Medidores são funções lidas apenas na
+    hora da coleta (ex: tamanho de uma fila), sem custo entre coletas.
+    Pode ser usado de qualquer thread.
+    """
+
+    def __init__(self):
+        self.ativo = False
+        self._lock = threading.Lock()
+        self._contadores = {}    # nome -> {rótulos: valor}
+        self._histogramas = {}   # nome -> {rótulos: _Histograma}
+        self._medidores = {}     # nome -> função () -> número ou {rótulos(dict ordenado): número}
+        self._ajuda = {}
+        self._servidor = None
+
+    def ativar(self):
+        self.ativo = True
+
+    def descrever(self, nome, ajuda):
+        self._ajuda[nome] = ajuda
+
+    def contar(self, nome, valor=1, **rotulos):
+        if not self.ativo:
+            return
+        chave = _rotulos(rotulos)
+        with self._lock:
+            serie = self._contadores.setdefault(nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        if not self.ativo:
+            return
+        chave = _rotulos(rotulos)
+        with self._lock:
+            serie = self._histogramas.setdefault(nome, {})
+            histograma = serie.get(chave)
+            if histograma is None:
+                histograma = serie[chave] = _Histograma()
+            histograma.observar(valor)
+
+    def cronometro(self, nome, **rotulos):
+        """Context manager que observa a duração do bloco em `nome` (nulo quando desligado)."""
+        if not self.ativo:
+            return _NADA
+        return self._cronometro(nome, rotulos)
+
+    @contextlib.contextmanager
+    def _cronometro(self, nome, rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def medidor(self, nome, funcao, ajuda=None):
+        """Registra um medidor lido na coleta; `funcao` retorna um número ou {(('rótulo', valor),): número}."""
+        self._medidores[nome] = funcao
+        if ajuda:
+            self._ajuda[nome] = ajuda
+
+    # --- Exposição ---
+
+    def exposicao(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        linhas = []
+
+        def cabecalho(nome, tipo):
+            if nome in self._ajuda:
+                linhas.append(f"# HELP {nome} {self._ajuda[nome]}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+
+        with self._lock:
+            contadores = {nome: dict(serie) for nome, serie in self._contadores.items()}
+            histogramas = {
+                nome: {r: (list(h.contagens), h.soma, h.total) for r, h in serie.items()}
+                for nome, serie in self._histogramas.items()
+            }
+        for nome, serie in sorted(contadores.items()):
+            cabecalho(nome, 'counter')
+            for rotulos, valor in sorted(serie.items()):
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+        for nome, serie in sorted(histogramas.items()):
+            cabecalho(nome, 'histogram')
+            for rotulos, (contagens, soma, total) in sorted(serie.items()):
+                acumulado = 0
+                for limite, contagem in zip(BUCKETS_LATENCIA, contagens):
+                    acumulado += contagem
+                    linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', limite)])} {acumulado}")
+                linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', '+Inf')])} {total}")
+                linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {soma}")
+                linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {total}")
+        for nome, funcao in sorted(self._medidores.items()):
+            try:
+                valor = funcao()
+            except Exception as e:
+                print(f"Erro ao ler o medidor {nome}: {e}")
+                continue
+            cabecalho(nome, 'gauge')
+            if isinstance(valor, dict):
+                for rotulos, v in sorted(valor.items()):
+                    linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {v}")
+            else:
+                linhas.append(f"{nome} {valor}")
+        return '\n'.join(linhas) + '\n'
+
+    def servir(self, porta, host='127.0.0.1'):
+        """Sobe o endpoint HTTP `/metrics` numa thread (idempotente)."""
+        if self._servidor is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metricas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                dados = metricas.exposicao().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((host, porta), Handler)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name='metricas', daemon=True).start()
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+METRICAS = Metricas()
+
+
+class PerfiladorAmostragem:
+    """Perfilador por amostragem para requisições lentas (opcional).
+
+    Enquanto há alguma requisição em andamento, uma thread copia a pilha de
+    todas as threads a cada `intervalo` segundos para um buffer circular.
+    Quando uma requisição termina depois de `limite` segundos, as amostras
+    do seu intervalo (as da thread do loop só quando a pilha passa pela
+    função medida; as das threads de leitura/escrita, todas) são gravadas em
+    `pasta` no formato "folded" (uma pilha por linha + contagem), aceito por
+    flamegraph.pl, speedscope e inferno.
+    """
+
+    def __init__(self, pasta, limite=0.5, intervalo=0.005, max_amostras=50000):
+        self.pasta = pasta
+        self.limite = limite
+        self.intervalo = intervalo
+        self._amostras = collections.deque(maxlen=max_amostras)  # (instante, thread, (code, ...))
+        self._ativos = 0
+        self._acordar = threading.Event()
+        self._gravar = collections.deque()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread is None:
+            os.makedirs(self.pasta, exist_ok=True)
+            self._thread = threading.Thread(target=self._laco, name='perfilador', daemon=True)
+            self._thread.start()
+
+    def entrar(self):
+        self._ativos += 1
+        self._acordar.set()
+        return time.perf_counter()
+
+    def sair(self, nome, codigo, inicio):
+        self._ativos -= 1
+        duracao = time.perf_counter() - inicio
+        if duracao >= self.limite:
+            self._gravar.append((nome, codigo, threading.get_ident(), inicio, inicio + duracao))
+            self._acordar.set()
+
+    def _laco(self):
+        proprio = threading.get_ident()
+        while True:
+            if not self._ativos and not self._gravar:
+                self._acordar.wait()
+                self._acordar.clear()
+            if self._ativos:
+                agora = time.perf_counter()
+                for thread, frame in sys._current_frames().items():
+                    if thread == proprio:
+                        continue
+                    pilha = []
+                    while frame is not None:
+                        pilha.append(frame.f_code)
+                        frame = frame.f_back
+                    self._amostras.append((agora, thread, tuple(pilha)))
+            while self._gravar:
+                self._salvar(*self._gravar.popleft())
+            time.sleep(self.intervalo)
+
+    def _salvar(self, nome, codigo, thread_loop, inicio, fim):
+        nomes = {t.ident: t.name for t in threading.enumerate()}
+        pilhas = collections.Counter()
+        for instante, thread, pilha in list(self._amostras):
+            if not inicio <= instante <= fim:
+                continue
+            if thread == thread_loop:
+                if codigo not in pilha:
+                    continue
+            elif not nomes.get(thread, '').startswith(('leitura', 'escrita')) or pilha[0].co_name == '_worker':
+                continue  # outras threads, ou thread do pool parada esperando trabalho
+            quadros = [nomes.get(thread, str(thread))]
+            quadros += [f"{c.co_name} ({os.path.basename(c.co_filename)}:{c.co_firstlineno})" for c in reversed(pilha)]
+            pilhas[';'.join(quadros)] += 1
+        if not pilhas:
+            return
+        nome = re.sub(r'[^\w-]', '_', nome)
+        arquivo = os.path.join(self.pasta, f"{time.strftime('%Y%m%d-%H%M%S')}_{nome}_{(fim - inicio) * 1000:.0f}ms.folded")
+        try:
+            with open(arquivo, 'w', encoding='utf-8') as file:
+                file.writelines(f"{pilha} {n}\n" for pilha, n in pilhas.most_common())
+        except OSError as e:
+            print(f"Erro ao gravar perfil {arquivo}: {e}")
+
+
+PERFILADOR = None
+
+
+def ativar_perfilador(pasta, limite, intervalo=0.005):
+    """Liga o perfilador de requisições lentas (`limite` em segundos)."""
+    global PERFILADOR
+    if PERFILADOR is None:
+        PERFILADOR = PerfiladorAmostragem(pasta, limite, intervalo)
+        PERFILADOR.iniciar()
+    return PERFILADOR
+
+
+def instrumentar(nome, ramo=None):
+    """Decorador de handlers: histograma de latência por handler e `ramo(update, context)`.
+
+    Com o perfilador ligado, requisições mais lentas que o limite dele têm as
+    amostras gravadas. Sem métricas nem perfilador, só testa duas flags.
+    """
+    def decorador(funcao):
+        codigo = funcao.__code__
+
+        @functools.wraps(funcao)
+        async def medido(update, context, *args, **kwargs):
+            if not METRICAS.ativo and PERFILADOR is None:
+                return await funcao(update, context, *args, **kwargs)
+            rotulo = ramo(update, context) if ramo else ''
+            perfilador = PERFILADOR
+            inicio = perfilador.entrar() if perfilador else time.perf_counter()
+            erro = 'nao'
+            try:
+                return await funcao(update, context, *args, **kwargs)
+            except BaseException:
+                erro = 'sim'
+                raise
+            finally:
+                METRICAS.observar('handler_duracao_segundos', time.perf_counter() - inicio,
+                                  handler=nome, ramo=rotulo, erro=erro)
+                if perfilador:
+                    perfilador.sair(f"{nome}-{rotulo}" if rotulo else nome, codigo, inicio)
+        return medido
+    return decorador
+
+
+METRICAS.descrever('handler_duracao_segundos', "Duração dos handlers do bot, por handler e ramo.")
+METRICAS.descrever('armazenamento_segundos', "Duração das chamadas ao armazenamento (fila + execução).")
+METRICAS.descrever('armazenamento_espera_segundos', "Tempo das escritas na fila até a tarefa escritora pegá-las.")
+METRICAS.descrever('linhas_csv_lidas_total', "Linhas de CSV lidas, por arquivo e operação.")
+METRICAS.descrever('cache_acessos_total', "Consultas aos caches, por cache e resultado (acerto/falta/expirado).")
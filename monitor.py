@@ -1,16 +1,94 @@
-import csv
+from __future__ import annotations
+
+import asyncio
 import os
+import signal
+import sys
 from datetime import datetime
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
-from pytz import timezone
+from typing import TYPE_CHECKING
+
+from comum import TIMEZONE, normalizar_nome
+from armazenamento import ArmazenamentoAssincrono
+from durabilidade import ARQUIVOS, COMMIT
+from usuarios import CacheUsuarios, listar_usuarios
+from carteira import marcar_a_mercado
+from precos import FontePrecos, MotorPrecos
+from agendador import Watchlist, AgendadorPrecos
+from alertas import TIPOS_ALERTA, IndiceAlertas
+from notificacoes import Notificador
+from metricas import METRICAS, ativar_perfilador, instrumentar
+from indice_nomes import IndiceNomes
+from tendencias import Tendencias
+from trabalhadores import ConexaoFrente, Frente, montar_pacote, pasta_trabalhador, separar_pacote
+from exportacao import (
+    DATASETS, FORMATOS, ErroExportacao, FiltroExportacao,
+    exportar_partes, filtrar, nome_parte, parquet_disponivel,
+)
+
+# O python-telegram-bot (a maior parte do tempo de import) só é importado ao montar a
+# Application e dentro dos handlers; aqui, só para as anotações
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import Application, ContextTypes
 
 # ===================================================
 # 1. CONFIGURAÇÃO E DADOS VISUAIS
 # ===================================================
 
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
-TIMEZONE = timezone('UTC') 
+# Endereço da Bot API (padrão: o oficial), ex: uma API falsa local nos benchmarks
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL")
+# Motor de armazenamento: 'csv' (padrão), 'sqlite' ou 'binario' (histórico em registros fixos via memmap)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "csv").lower()
+# Diretório dos shards por usuário e quantos usuários ficam carregados em memória (com sqlite cada um mantém
+# uma conexão por thread, 3 arquivos cada: o padrão menor fica bem abaixo de um ulimit de 1024 descritores)
+DATA_DIR = os.environ.get("DATA_DIR", "dados")
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "32" if STORAGE_BACKEND == 'sqlite' else "1000"))
+# Sites consultados, em ordem de preferência (FUTBIN_URL/FUTGG_URL trocam o endereço, ex: servidor local de testes)
+PRICE_SOURCES = [nome.strip() for nome in os.environ.get("PRICE_SOURCES", "futbin,futgg").split(',') if nome.strip()]
+PRICE_CACHE_TTL = int(os.environ.get("PRICE_CACHE_TTL", "300"))
+# Coleta automática dos preços da watchlist (posições abertas + jogadores fixados)
+PRICE_POLLING = os.environ.get("PRICE_POLLING", "1") == "1"
+POLL_INTERVAL = int(os.environ.get("POLL_INTERVAL", "900"))
+# Modo webhook: com WEBHOOK_URL (endereço público HTTPS) o bot sobe um servidor HTTP local em vez de fazer polling
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+# Updates processados ao mesmo tempo (os de um mesmo usuário continuam em ordem, um por vez)
+MAX_CONCURRENT_UPDATES = int(os.environ.get("MAX_CONCURRENT_UPDATES", "64"))
+# Fluxos de conversa (compra/venda em andamento) parados há mais que isso (segundos) são descartados
+SESSION_TTL = int(os.environ.get("SESSION_TTL", "3600"))
+# Envios por segundo para a Bot API, somando todos os chats (as respostas passam na frente das notificações)
+SEND_PER_SECOND = int(os.environ.get("SEND_PER_SECOND", "25"))
+# Métricas no formato Prometheus em http://METRICS_LISTEN:METRICS_PORT/metrics (0 = desligado)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_LISTEN = os.environ.get("METRICS_LISTEN", "127.0.0.1")
+# Perfilador por amostragem: handlers mais lentos que isso (ms) têm a pilha gravada em PROFILE_DIR (0 = desligado)
+PROFILE_SLOW_MS = int(os.environ.get("PROFILE_SLOW_MS", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(DATA_DIR, "perfis"))
+# fsync das gravações antes de confirmar (em grupo); 0 = mais rápido, mas uma queda de energia perde as últimas
+DURABLE_WRITES = os.environ.get("DURABLE_WRITES", "1") == "1"
+# Janela (segundos) dos mais buscados e das maiores variações de preço do menu e de /tendencias
+TRENDING_WINDOW = int(os.environ.get("TRENDING_WINDOW", "3600"))
+# Processos trabalhadores (0 = tudo num processo só); os usuários são repartidos entre eles por hash do user_id
+WORKERS = int(os.environ.get("WORKERS", "0"))
+# Definidos pela frente em cada trabalhador que ela inicia (não defina à mão)
+WORKER_ID = os.environ.get("WORKER_ID")
+FRONT_ADDRESS = os.environ.get("FRONT_ADDRESS")
+FRONT_KEY = os.environ.get("FRONT_KEY")
+
+if METRICS_PORT:
+    METRICAS.ativar()
+COMMIT.fsync = DURABLE_WRITES
+
+# Num trabalhador: a conexão com a frente e a pasta do estado global dele (watchlist, alertas, sessões, nomes)
+FRENTE = ConexaoFrente(int(WORKER_ID), WORKERS, FRONT_ADDRESS, FRONT_KEY) if WORKER_ID else None
+STATE_DIR = pasta_trabalhador(DATA_DIR, WORKER_ID) if WORKER_ID else DATA_DIR
+
+# Só os tipos de update que os handlers tratam (mensagens/comandos e botões: Update.MESSAGE, Update.CALLBACK_QUERY)
+ALLOWED_UPDATES = ['message', 'callback_query']
 
 # Tipos de plataformas disponíveis (com emojis para visual)
 PLATFORMS = {
@@ -19,12 +97,21 @@ PLATFORMS = {
     'PC': 'PC 💻'
 }
 
+# Nome de exibição -> chave (ex: 'PlayStation 🎮' -> 'PS')
+PLATFORM_KEYS = {display_name: key for key, display_name in PLATFORMS.items()}
+
+# Sugestões mostradas quando a busca não acha o nome exato
+SUGGESTION_LIMIT = 5
+
+# Itens por página nas telas de histórico (cabe com folga nos 4096 caracteres de uma mensagem)
+HISTORY_PAGE_SIZE = 10
+PLAYERS_PAGE_SIZE = 12
+
 # Constantes para Gestão de Carteira (P&L)
 TRADE_ACTIONS = {
     'COMPRA': 'Comprado 🟢',
     'VENDA': 'Vendido 🔴',
 }
-CARTEIRA_FILE = 'carteira_trades.csv'
 
 # ===================================================
 # 2. FUNÇÕES DE FORMATAÇÃO E DADOS
@@ -37,167 +124,171 @@ def format_price(price):
     price_str = f"{price:,}".replace(",", "X").replace(".", ",").replace("X", ".")
     return f"{price_str} 🪙"
 
-def init_csv(filename, headers):
-    """Garante que o arquivo CSV exista com os cabeçalhos corretos."""
-    if not os.path.exists(filename):
-        try:
-            with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(headers)
-        except Exception as e:
-            print(f"Erro ao criar {filename}: {e}")
+# Histórico e carteira de cada usuário (carregados sob demanda, despejados por LRU)
+USUARIOS = CacheUsuarios(STORAGE_BACKEND, USER_CACHE_SIZE, DATA_DIR)
+# Handlers acessam os dados por aqui: leituras no pool, escritas na fila única
+ARMAZENAMENTO = ArmazenamentoAssincrono()
+# Preços dos sites (pool HTTP compartilhado + cache TTL)
+MOTOR_PRECOS = MotorPrecos(
+    [FontePrecos(nome, os.environ.get(f"{nome.upper()}_URL")) for nome in PRICE_SOURCES],
+    ttl=PRICE_CACHE_TTL,
+)
+# Jogadores coletados em segundo plano
+WATCHLIST = Watchlist(os.path.join(STATE_DIR, 'watchlist.json'))
+# Alertas de preço (indexados por jogador) e envio agrupado das notificações
+ALERTAS = IndiceAlertas(os.path.join(STATE_DIR, 'alertas.json'), format_price)
+NOTIFICADOR = Notificador()
+# Nomes de jogadores já vistos (registros, carteira e sites), para a busca aproximada
+NOMES = IndiceNomes(os.path.join(STATE_DIR, 'jogadores.txt'))
+# Estado da conversa de cada usuário, sobrevive a reinícios (PersistenciaSessoes, criada por build_application)
+SESSOES = None
+# Mais buscados/registrados e maiores variações de preço recentes (memória fixa)
+TENDENCIAS = Tendencias(PLATFORMS, janela=TRENDING_WINDOW)
 
-# Inicializa os dois CSVs
-init_csv('preços_historico.csv', ['data_hora', 'jogador', 'preco_moedas', 'plataforma'])
-init_csv(CARTEIRA_FILE, ['data_hora_compra', 'jogador', 'preco_compra', 'plataforma', 'preco_venda', 'lucro_liquido'])
 
+def platform_key(plataforma):
+    """Chave da plataforma ('PS', 'XB', 'PC') a partir do nome de exibição gravado."""
+    return PLATFORM_KEYS.get(plataforma, plataforma)
 
-def registrar_historico(jogador, preco_moedas, plataforma):
-    """Adiciona o registro de preço manual ao arquivo CSV."""
-    
-    init_csv('preços_historico.csv', ['data_hora', 'jogador', 'preco_moedas', 'plataforma'])
-        
-    with open('preços_historico.csv', 'a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        now = datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S')
-        try:
-            preco_limpo = int(str(preco_moedas).replace('.', '').replace(',', ''))
-        except ValueError:
-            preco_limpo = 0
-            
-        writer.writerow([now, jogador, preco_limpo, plataforma])
 
+def avaliar_alertas(user_id, dados, amostras):
+    """Confere os alertas do usuário contra as novas amostras [(jogador, preço, chave da plataforma)].
 
-def registrar_trade_compra(jogador, preco_compra, plataforma):
-    """Registra uma nova COMPRA na carteira."""
-    init_csv(CARTEIRA_FILE, ['data_hora_compra', 'jogador', 'preco_compra', 'plataforma', 'preco_venda', 'lucro_liquido'])
-    
-    with open(CARTEIRA_FILE, 'a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        now = datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S')
-        preco_limpo = int(str(preco_compra).replace('.', '').replace(',', ''))
-        # Registra a compra, deixando os campos de venda vazios
-        writer.writerow([now, jogador, preco_limpo, plataforma, '', ''])
+    Só os jogadores com algum alerta são consultados (e a carteira só para
+    alertas LUCRO); os disparos vão para a fila de notificações.
+    """
+    for jogador, preco, key in amostras:
+        if not preco or not ALERTAS.tem_alertas(jogador):
+            continue
+        posicoes = None
+        if ALERTAS.tem_alertas(jogador, user_id, 'LUCRO'):
+            posicoes = dados.carteira.abertas_do_jogador(jogador, PLATFORMS.get(key, key))
+        for alerta, mensagem in ALERTAS.avaliar(user_id, jogador, key, preco, posicoes):
+            NOTIFICADOR.notificar(
+                user_id,
+                f"🔔 **Alerta #{alerta['id']}** - **{alerta['jogador']}** ({PLATFORMS.get(key, key)})\n{mensagem}",
+            )
+    if ALERTAS.alterado:
+        ALERTAS.salvar()
 
 
-def registrar_trade_venda(jogador, preco_venda, plataforma):
-    """Busca a última COMPRA aberta e registra a VENDA e P&L."""
-    
-    # 1. Busca todos os trades para o jogador na carteira
-    trades = []
-    jogador_upper = jogador.upper()
-    try:
-        with open(CARTEIRA_FILE, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['jogador'].upper() == jogador_upper:
-                    trades.append(row)
-    except FileNotFoundError:
-        return "Nenhum registro de compra encontrado."
-
-    # 2. Identifica o último trade aberto (preco_venda vazio)
-    trade_aberto = None
-    trade_index = -1
-    for i, trade in enumerate(reversed(trades)):
-        if not trade.get('preco_venda') or not trade['preco_venda'].strip():
-            trade_aberto = trade
-            trade_index = len(trades) - 1 - i
-            break
-
-    if not trade_aberto:
-        return f"Nenhuma compra aberta para **{jogador}**."
-
-    # 3. Calcula o P&L
+def registrar_historico(user_id, jogador, preco_moedas, plataforma):
+    """Adiciona o registro de preço manual ao histórico do usuário."""
+    with USUARIOS.usar(user_id) as dados:
+        with dados.analise.gravando():
+            registro = dados.historico.registrar(jogador, preco_moedas, plataforma)
+            dados.analise.atualizar(jogador, plataforma, registro.preco_moedas)
+        avaliar_alertas(user_id, dados, [(jogador, registro.preco_moedas, platform_key(plataforma))])
+        dados.marcacao.invalidar(jogador)
+    NOMES.adicionar(jogador)
+    TENDENCIAS.amostra(jogador, registro.preco_moedas, platform_key(plataforma))
+    return registro
+
+
+def registrar_amostras(amostras):
+    """Grava as amostras da coleta automática: {user_id: [(jogador, preço, chave da plataforma)]}."""
+    for user_id, lista in amostras.items():
+        with USUARIOS.usar(user_id) as dados:
+            with dados.analise.gravando():
+                dados.historico.registrar_lote(
+                    [(jogador, preco, PLATFORMS.get(key, key)) for jogador, preco, key in lista]
+                )
+                for jogador, preco, key in lista:
+                    dados.analise.atualizar(jogador, PLATFORMS.get(key, key), preco)
+            for jogador, preco, key in lista:
+                NOMES.adicionar(jogador)
+                TENDENCIAS.amostra(jogador, preco, key)
+                dados.marcacao.invalidar(jogador)
+            avaliar_alertas(user_id, dados, lista)
+
+
+def registrar_trade_compra(user_id, jogador, preco_compra, plataforma):
+    """Registra uma nova COMPRA na carteira do usuário."""
+    with USUARIOS.usar(user_id) as dados:
+        posicao = dados.carteira.registrar_compra(jogador, preco_compra, plataforma)
+        dados.marcacao.invalidar()
+    NOMES.adicionar(jogador)
+    WATCHLIST.posicao_aberta(user_id, jogador, platform_key(plataforma))
+    WATCHLIST.salvar()
+    return posicao
+
+
+def registrar_trade_venda(user_id, jogador, preco_venda, plataforma):
+    """Fecha a COMPRA aberta mais antiga do jogador na plataforma e registra o P&L."""
     try:
-        preco_compra = int(trade_aberto['preco_compra'])
-        preco_venda_limpo = int(str(preco_venda).replace('.', '').replace(',', ''))
-        
-        # O P&L no EA FC é (Venda * 0.95) - Compra
-        TAXA_EA_FC = 0.05
-        lucro_bruto = preco_venda_limpo - preco_compra
-        taxa = preco_venda_limpo * TAXA_EA_FC
-        lucro_liquido = lucro_bruto - taxa
-        
+        with USUARIOS.usar(user_id) as dados:
+            posicao = dados.carteira.registrar_venda(jogador, preco_venda, plataforma)
+            dados.marcacao.invalidar()
     except ValueError:
         return "Erro ao calcular P&L. Verifique os preços."
-        
-    # 4. Reescreve o CSV com o trade fechado
-    linhas = []
-    with open(CARTEIRA_FILE, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        linhas = list(reader)
 
-    # Atualiza a linha do trade aberto
-    linhas[trade_index]['preco_venda'] = str(preco_venda_limpo)
-    linhas[trade_index]['lucro_liquido'] = str(int(lucro_liquido))
-    
-    # Reescreve o arquivo
-    with open(CARTEIRA_FILE, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=linhas[0].keys())
-        writer.writeheader()
-        writer.writerows(linhas)
-        
-    # Retorna o resultado
+    if not posicao:
+        return f"Nenhuma compra aberta para **{jogador}** ({plataforma})."
+
+    WATCHLIST.posicao_fechada(user_id, posicao['jogador'], platform_key(plataforma))
+    WATCHLIST.salvar()
+
     return {
-        'jogador': jogador,
-        'compra': preco_compra,
-        'venda': preco_venda_limpo,
-        'lucro': int(lucro_liquido)
+        'jogador': posicao['jogador'],
+        'compra': posicao['preco_compra'],
+        'venda': posicao['preco_venda'],
+        'lucro': posicao['lucro_liquido']
     }
 
 
-def get_trade_tip(jogador_nome, preco_atual_moedas):
-    """Gera o 'gráfico simples' (Dica de Trade com emojis)."""
-    # (Lógica omitida por ser a mesma do código anterior, com leitura de preços_historico.csv)
-    
-    historico = []
-    player_name_upper = jogador_nome.upper()
-    
-    try:
-        with open('preços_historico.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['jogador'].upper() == player_name_upper:
-                    historico.append(row)
-    except FileNotFoundError:
+# Amostras na janela a partir das quais as faixas de percentil valem como sinal
+MIN_AMOSTRAS_FAIXA = 5
+
+
+def get_trade_tip(user_id, jogador_nome, preco_atual_moedas, plataforma=None):
+    """Gera a Dica de Trade a partir das estatísticas em memória do jogador (sem ler o histórico)."""
+    with USUARIOS.usar(user_id) as dados:
+        stats = dados.analise.resumo(jogador_nome, plataforma)
+
+    if not stats or stats['anterior'] is None:
         return "Primeiro registro. Registre mais preços para ativar a Dica de Trade!"
 
-    
-    if len(historico) > 1:
-        ultimo_registro = historico[-2]
-        
-        try:
-            preco_anterior = int(ultimo_registro['preco_moedas'])
-        except ValueError:
-             return "Erro ao ler preço anterior."
+    diferenca = preco_atual_moedas - stats['anterior']
+    diferenca_formatada = format_price(abs(diferenca))
+    poucas_amostras = stats['janela'] < MIN_AMOSTRAS_FAIXA
 
-        diferenca = preco_atual_moedas - preco_anterior
-        diferenca_formatada = format_price(abs(diferenca))
-        
-        if diferenca > 0:
-            return f"⬆️ **{diferenca_formatada} mais caro** que o registro anterior. **PODE SER HORA DE VENDER!**"
-        elif diferenca < 0:
-            return f"⬇️ **{diferenca_formatada} mais barato** que o registro anterior. **PODE SER HORA DE COMPRAR!**"
-        else:
-            return "➡️ Preço estável desde o registro anterior."
+    if diferenca > 0:
+        linhas = [f"⬆️ **{diferenca_formatada} mais caro** que o registro anterior."
+                  + (" **PODE SER HORA DE VENDER!**" if poucas_amostras else "")]
+    elif diferenca < 0:
+        linhas = [f"⬇️ **{diferenca_formatada} mais barato** que o registro anterior."
+                  + (" **PODE SER HORA DE COMPRAR!**" if poucas_amostras else "")]
     else:
-        return "Primeiro registro. Registre mais preços para ativar a Dica de Trade!"
+        linhas = ["➡️ Preço estável desde o registro anterior."]
+    if poucas_amostras:
+        return "\n".join(linhas)
+
+    ema_curta, ema_longa = stats['ema_curta'], stats['ema_longa']
+    if ema_curta > ema_longa * 1.01:
+        tendencia = "alta 📈"
+    elif ema_curta < ema_longa * 0.99:
+        tendencia = "baixa 📉"
+    else:
+        tendencia = "lateral ➡️"
+    linhas += [
+        f"📊 Média curta: {format_price(round(ema_curta))} | longa: {format_price(round(ema_longa))} (tendência de {tendencia})",
+        f"↕️ Últimos {stats['janela']}: mín {format_price(stats['minimo'])} | máx {format_price(stats['maximo'])}",
+        f"🎯 Faixa normal (P10-P90): {format_price(round(stats['faixa_baixa']))} a {format_price(round(stats['faixa_alta']))}",
+        f"🌪️ Volatilidade: {stats['volatilidade']:.1%} por registro",
+    ]
+    if preco_atual_moedas >= stats['faixa_alta']:
+        linhas.append("**PODE SER HORA DE VENDER!** O preço está no topo da faixa.")
+    elif preco_atual_moedas <= stats['faixa_baixa']:
+        linhas.append("**PODE SER HORA DE COMPRAR!** O preço está no fundo da faixa.")
+    else:
+        linhas.append("Preço dentro da faixa normal.")
+    return "\n".join(linhas)
 
         
-def get_detailed_player_history(player_name, limit=3):
+def get_detailed_player_history(user_id, player_name, limit=3):
     """BUSCA DETALHADA: Retorna os últimos N registros de preço para um jogador específico."""
-    # (Lógica omitida por ser a mesma do código anterior)
-    historico = []
-    player_name_upper = player_name.upper()
-    
-    try:
-        with open('preços_historico.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['jogador'].upper() == player_name_upper:
-                    historico.append(row)
-    except FileNotFoundError:
-        return "Histórico não encontrado."
+    with USUARIOS.usar(user_id) as dados:
+        historico = dados.historico.ultimos(player_name, max(limit, 2))
 
     if len(historico) <= 1:
         return "Nenhum registro anterior para comparação."
@@ -207,13 +298,12 @@ def get_detailed_player_history(player_name, limit=3):
     detailed_history = []
     for entry in recent_entries:
         try:
-            dt_obj = datetime.strptime(entry['data_hora'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=TIMEZONE)
-            preco_moedas = int(entry.get('preco_moedas', 0))
+            dt_obj = datetime.strptime(entry.data_hora, '%Y-%m-%d %H:%M:%S').replace(tzinfo=TIMEZONE)
         except ValueError:
             continue
             
         entry_line = (
-            f"   • **{format_price(preco_moedas)}** ({entry['plataforma'].replace(' ', ' ')})\n"
+            f"   • **{format_price(entry.preco_moedas)}** ({entry.plataforma})\n"
             f"     Em: *{dt_obj.strftime('%d/%m %H:%M')}*"
         )
         detailed_history.append(entry_line)
@@ -221,51 +311,143 @@ def get_detailed_player_history(player_name, limit=3):
     return "\n".join(detailed_history)
 
 
-def get_open_trades():
+def get_recent_history(user_id, antes=None, depois=None):
+    """Uma página da atividade recente do usuário (todos os jogadores, do mais novo para o mais antigo)."""
+    with USUARIOS.usar(user_id) as dados:
+        return dados.historico.pagina_recentes(HISTORY_PAGE_SIZE, antes, depois)
+
+
+def get_player_history_page(user_id, player_name, antes=None, depois=None):
+    """Uma página do histórico de um jogador."""
+    with USUARIOS.usar(user_id) as dados:
+        return dados.historico.pagina_jogador(player_name, HISTORY_PAGE_SIZE, antes, depois)
+
+
+def get_all_registered_players(user_id, inicio=0):
+    """Uma página dos jogadores com preço registrado, em ordem alfabética: ([(chave, último registro)], próxima posição)."""
+    with USUARIOS.usar(user_id) as dados:
+        return dados.historico.jogadores(PLAYERS_PAGE_SIZE, inicio)
+
+
+def get_open_trades(user_id):
     """Retorna a lista de trades abertos (sem preço de venda)."""
-    open_trades = []
-    try:
-        with open(CARTEIRA_FILE, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if not row.get('preco_venda') or not row['preco_venda'].strip():
-                    open_trades.append(row)
-    except FileNotFoundError:
-        pass
-        
-    return open_trades[::-1] # Do mais novo para o mais antigo
+    with USUARIOS.usar(user_id) as dados:
+        return dados.carteira.abertas() # Do mais novo para o mais antigo
 
-def get_closed_trades_summary():
+def get_closed_trades_summary(user_id):
     """Calcula o P&L total e os últimos 5 trades fechados."""
-    closed_trades = []
-    pnl_total = 0
-    try:
-        with open(CARTEIRA_FILE, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row.get('preco_venda') and row['preco_venda'].strip():
-                    closed_trades.append(row)
-                    try:
-                        pnl_total += int(row.get('lucro_liquido', 0))
-                    except ValueError:
-                        pass
-    except FileNotFoundError:
-        pass
-        
     # Últimos 5 fechados (do mais novo para o mais antigo)
-    recent_closed = closed_trades[-5:][::-1] 
-    
-    return pnl_total, recent_closed
+    with USUARIOS.usar(user_id) as dados:
+        return dados.carteira.resumo_fechadas(5)
+
+def get_wallet_summary(user_id):
+    """Agregados da carteira (P&L, taxa de acerto, custo aberto), mantidos a cada trade."""
+    with USUARIOS.usar(user_id) as dados:
+        return dados.carteira.agregados()
+
+
+def get_portfolio_valuation(user_id):
+    """Posições abertas marcadas a mercado (veja `marcar_a_mercado`).
+
+    Um preço por (jogador, plataforma), não por posição: o último do
+    histórico do usuário (o índice em memória) e, sem ele, o que estiver no
+    cache dos sites. Guardada até chegar um preço novo de um desses jogadores,
+    um trade ou vencer o primeiro preço do cache usado, então abrir o
+    /carteira de novo não lê nada.
+    """
+    with USUARIOS.usar(user_id) as dados:
+        def calcular():
+            posicoes = dados.carteira.abertas()
+            pares = {(normalizar_nome(p['jogador']), p['plataforma']) for p in posicoes}
+            precos = dados.analise.ultimos(pares)
+            expira_em = None
+            for par in pares - precos.keys():
+                em_cache = MOTOR_PRECOS.preco_em_cache(par[0], platform_key(par[1]))
+                if em_cache:
+                    precos[par] = em_cache[0]
+                    expira_em = em_cache[1] if expira_em is None else min(expira_em, em_cache[1])
+            return marcar_a_mercado(posicoes, precos), {jogador for jogador, _ in pares}, expira_em
+
+        return dados.marcacao.obter(calcular)
+
+
+def get_last_price_record(user_id, player_name):
+    """Último registro de preço do jogador feito pelo usuário (ou None)."""
+    with USUARIOS.usar(user_id) as dados:
+        ultimos = dados.historico.ultimos(player_name, 1)
+    return ultimos[0] if ultimos else None
+
+
+async def get_player_price(player_name, platform_key, force=False):
+    """Preço atual nos sites: (nome no site, preço) ou None."""
+    return await MOTOR_PRECOS.preco(player_name, platform_key, forcar=force)
+
+
+def get_top_5_players(platform_key=None):
+    """Os 5 jogadores mais buscados/registrados na última TRENDING_WINDOW: [(jogador, buscas)]."""
+    return TENDENCIAS.mais_buscados(platform_key, 5)
+
+
+async def get_last_registered_price(user_id, player_name):
+    """Preço do jogador para a busca: sites primeiro, senão o último registro do usuário.
+
+    Retorna (resultado, erro); resultado tem 'player_name', 'preco_num' e 'price_message'.
+    """
+    respostas = await asyncio.gather(
+        *(get_player_price(player_name, key) for key in PLATFORMS),
+        return_exceptions=True,
+    )
+    precos = {
+        key: resposta for key, resposta in zip(PLATFORMS, respostas)
+        if resposta and not isinstance(resposta, BaseException)
+    }
+
+    if precos:
+        nome_site = next(iter(precos.values()))[0]
+        await ARMAZENAMENTO.escrever(NOMES.adicionar, nome_site)
+        linhas = [f"💰 **{nome_site}** - Preço atual:"]
+        for key, (_, preco) in precos.items():
+            linhas.append(f"   {PLATFORMS[key]}: **{format_price(preco)}**")
+        return {
+            'player_name': nome_site,
+            'preco_num': next(iter(precos.values()))[1],
+            'price_message': "\n".join(linhas),
+        }, None
+
+    registro = await ARMAZENAMENTO.ler(get_last_price_record, user_id, player_name)
+    if registro:
+        return {
+            'player_name': registro.jogador,
+            'preco_num': registro.preco_moedas,
+            'price_message': (
+                f"💰 **{registro.jogador}** - Último preço registrado:\n"
+                f"   {registro.plataforma}: **{format_price(registro.preco_moedas)}**"
+            ),
+        }, None
+
+    return None, "Jogador não encontrado nos sites nem no seu histórico."
 
 
 # ===================================================
 # 3. HANDLERS E FLUXO DE CONVERSA
 # ===================================================
 
+def flow_branch(update, context):
+    return context.user_data.get('flow_state', 'READY')
+
+
+def button_branch(update, context):
+    action, _, value = update.callback_query.data.partition(':')
+    return f"{action}:{value}" if action == 'MENU' else action
+
+
+@instrumentar('handle_message_flow', flow_branch)
 async def handle_message_flow(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Lida com mensagens de texto do usuário, controlando o estado da conversa."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
     
     text = update.message.text.strip()
+    user_id = update.effective_user.id
     user_data = context.user_data
     current_state = user_data.get('flow_state', 'READY')
     
@@ -309,12 +491,15 @@ async def handle_message_flow(update: Update, context: ContextTypes.DEFAULT_TYPE
             user_data['flow_state'] = 'READY'
             return
 
+        # Conta com o nome canônico do jogador, se já conhecido (o digitado pode vir sem acentos)
+        TENDENCIAS.buscar(NOMES.exato(player_name) or player_name, platform_key(platform))
+
         # Executa a ação específica (REGISTRO ou TRADE)
         if action_type == 'COMPRA':
-            registrar_trade_compra(player_name, price, platform)
+            await ARMAZENAMENTO.escrever(registrar_trade_compra, user_id, player_name, price, platform)
             msg_final = f"✅ **COMPRA Registrada!**\n\n**{player_name}** ({platform}) comprado por **{format_price(price)}**."
         elif action_type == 'VENDA':
-            result = registrar_trade_venda(player_name, price, platform)
+            result = await ARMAZENAMENTO.escrever(registrar_trade_venda, user_id, player_name, price, platform)
             if isinstance(result, str):
                 msg_final = f"🚨 **VENDA FALHOU:** {result}"
             else:
@@ -329,8 +514,8 @@ async def handle_message_flow(update: Update, context: ContextTypes.DEFAULT_TYPE
                     f"   *Inclui a taxa de 5% do mercado.*"
                 )
         else: # Apenas Registro de Preço
-            registrar_historico(player_name, price, platform)
-            trade_tip = get_trade_tip(player_name, price)
+            await ARMAZENAMENTO.escrever(registrar_historico, user_id, player_name, price, platform)
+            trade_tip = await ARMAZENAMENTO.ler(get_trade_tip, user_id, player_name, price, platform)
             msg_final = (
                 f"✅ **Registro de Preço Concluído!**\n\n"
                 f"**{player_name}** ({platform}) salvo por **{format_price(price)}**.\n"
@@ -355,38 +540,20 @@ async def handle_message_flow(update: Update, context: ContextTypes.DEFAULT_TYPE
     # ----------------------------------------------------
     elif current_state == 'WAITING_FOR_SEARCH_NAME':
         
-        player_name_search = text.title()
-        user_data['flow_state'] = 'READY' 
-        
-        result, error_msg = get_last_registered_price(player_name_search)
-        
-        if result:
-            trade_tip = get_trade_tip(result["player_name"], result["preco_num"])
-            detailed_history = get_detailed_player_history(result["player_name"], limit=3)
-
-            response_text = (
-                f"{result['price_message']}\n"
-                f"---\n"
-                f"📈 **Dica de Trade:**\n{trade_tip}\n"
-                f"---\n"
-                f"📚 **Últimos Registros (3):**\n"
-                f"{detailed_history}"
-            )
+        user_data['flow_state'] = 'READY'
+        encontrado = await search_player(update, context, text)
+        if encontrado:
+            TENDENCIAS.buscar(encontrado)
+        return
             
-            await update.message.reply_text(
-                response_text,
-                parse_mode='Markdown'
-            )
-            return
+    # ----------------------------------------------------
+    # ESTADO: ESPERANDO NOME DO JOGADOR (EXPORTAÇÃO)
+    # ----------------------------------------------------
+    elif current_state == 'WAITING_FOR_EXPORT_PLAYER':
+        user_data['flow_state'] = 'READY'
+        start_export(update, context, 'historico', 'csv', FiltroExportacao(jogador=text))
+        return
 
-        else:
-            await update.message.reply_text(
-                f"🚨 Não encontrei registros para **{player_name_search}**.\n\n"
-                f"Use /start para voltar ao menu ou clique em **Pesquisar Jogador** novamente.",
-                parse_mode='Markdown'
-            )
-            return
-            
     # ----------------------------------------------------
     # ESTADO: PRONTO (QUALQUER OUTRO TEXTO)
     # ----------------------------------------------------
@@ -396,63 +563,251 @@ async def handle_message_flow(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
 
+async def search_player(update: Update, context: ContextTypes.DEFAULT_TYPE, text):
+    """Busca o jogador (sites + histórico) e sugere nomes parecidos do índice quando o digitado não bate exatamente.
+
+    Retorna o nome do jogador encontrado (ou None).
+    """
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    user_id = update.effective_user.id
+    canonical_name = NOMES.exato(text)
+    player_name_search = canonical_name or text.title()
+    suggestions = [] if canonical_name else [nome for nome, _ in NOMES.buscar(text, SUGGESTION_LIMIT)]
+
+    result, error_msg = await get_last_registered_price(user_id, player_name_search)
+
+    keyboard = [[InlineKeyboardButton(f"🔎 {nome}", callback_data=callback_with('SEARCH_HISTORY', nome))] for nome in suggestions]
+    if result:
+        context.user_data['history_player'] = result["player_name"]
+        trade_tip = await ARMAZENAMENTO.ler(get_trade_tip, user_id, result["player_name"], result["preco_num"])
+        detailed_history = await ARMAZENAMENTO.ler(get_detailed_player_history, user_id, result["player_name"], limit=3)
+
+        response_text = (
+            f"{result['price_message']}\n"
+            f"---\n"
+            f"📈 **Dica de Trade:**\n{trade_tip}\n"
+            f"---\n"
+            f"📚 **Últimos Registros (3):**\n"
+            f"{detailed_history}"
+        )
+        if suggestions:
+            response_text += "\n---\n🔎 **Outros jogadores parecidos:**"
+        keyboard.append([InlineKeyboardButton("📚 Histórico completo", callback_data='JOGADOR:INICIO')])
+    elif suggestions:
+        response_text = f"🚨 Não encontrei **{player_name_search}**. Você quis dizer:"
+    else:
+        response_text = (
+            f"🚨 Não encontrei registros para **{player_name_search}**.\n\n"
+            f"Use /start para voltar ao menu ou clique em **Pesquisar Jogador** novamente."
+        )
+
+    await reply_or_edit(update, response_text, InlineKeyboardMarkup(keyboard) if keyboard else None)
+    return result["player_name"] if result else None
+
+
+def trending_text(platform_key=None):
+    """Mais buscados e maiores variações da janela recente, em texto (vazio se ainda não há nenhum)."""
+    linhas = []
+    populares = get_top_5_players(platform_key)
+    if populares:
+        linhas.append("🔥 **Mais buscados:**")
+        linhas += [f"   {i}. {jogador} ({buscas})" for i, (jogador, buscas) in enumerate(populares, 1)]
+    variacoes = TENDENCIAS.maiores_variacoes(platform_key, 5)
+    if variacoes:
+        linhas.append("📊 **Maiores variações:**")
+        linhas += [
+            f"   {'📈' if variacao > 0 else '📉'} {jogador} ({key}) {variacao:+.1%}" for jogador, key, variacao in variacoes
+        ]
+    return "\n".join(linhas)
+
+
+def trending_buttons():
+    """Um botão de busca para cada um dos mais buscados, em linhas de 3."""
+    from telegram import InlineKeyboardButton
+    botoes = [
+        InlineKeyboardButton(f"🔥 {jogador}", callback_data=callback_with('SEARCH_HISTORY', jogador))
+        for jogador, _ in get_top_5_players()
+    ]
+    return [botoes[i:i + 3] for i in range(0, len(botoes), 3)]
+
+
+@instrumentar('start_command')
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Menu Principal."""
+    """Menu Principal, com os mais buscados e as maiores variações da última TRENDING_WINDOW."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
     
     keyboard = [
         [InlineKeyboardButton("💰 Novo Registro de Preço", callback_data='MENU:REGISTRAR_PRECO')],
         [InlineKeyboardButton("🟢 Registrar COMPRA", callback_data='MENU:REGISTRAR_COMPRA'), InlineKeyboardButton("🔴 Registrar VENDA", callback_data='MENU:REGISTRAR_VENDA')],
-        [InlineKeyboardButton("🔎 Pesquisar Jogador", callback_data='MENU:PESQUISAR')],
+        [InlineKeyboardButton("🔎 Pesquisar Jogador", callback_data='MENU:PESQUISAR'), InlineKeyboardButton("🕒 Atividade Recente", callback_data='MENU:RECENTES')],
         [InlineKeyboardButton("📈 Minha Carteira (P&L)", callback_data='MENU:CARTEIRA'), InlineKeyboardButton("📚 Histórico Completo", callback_data='MENU:HISTORICO')],
-        [InlineKeyboardButton("💾 Exportar Dados (CSV)", callback_data='MENU:EXPORTAR')], 
+        [InlineKeyboardButton("💾 Exportar Dados", callback_data='MENU:EXPORTAR')], 
+        *trending_buttons(),
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    message_source = update.callback_query.message if update.callback_query else update.message
-
     context.user_data['flow_state'] = 'READY' 
 
-    await message_source.reply_text(
+    tendencias = trending_text()
+    # Para o chat: depois de uma exportação pelo menu, a mensagem do botão já foi apagada
+    await context.bot.send_message(
+        update.effective_chat.id,
         "👋 **Menu Principal - SuperBot Trade EA FC**\n\n"
-        "O que deseja monitorar ou negociar?",
+        + (f"{tendencias}\n\n" if tendencias else "")
+        + "O que deseja monitorar ou negociar?",
         reply_markup=reply_markup,
         parse_mode='Markdown'
     )
 
-async def export_command(message_source: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Envia o arquivo CSV do histórico."""
-    
-    files_to_export = [
-        ('preços_historico.csv', "Histórico de Preços:"),
-        (CARTEIRA_FILE, "Carteira de Trades (P&L):")
+
+@instrumentar('trending_command')
+async def trending_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/tendencias [PS|XB|PC]: mais buscados e maiores variações recentes (de todas as plataformas, sem argumento)."""
+    key = context.args[0].upper() if context.args and context.args[0].upper() in PLATFORMS else None
+    titulo = f" - {PLATFORMS[key]}" if key else ""
+    texto = trending_text(key) or "Ainda não há buscas nem preços recentes."
+    await update.message.reply_text(
+        f"🔥 **Tendências{titulo}** (últimos {TRENDING_WINDOW // 60} min)\n\n{texto}",
+        parse_mode='Markdown'
+    )
+
+def parse_export_args(args):
+    """'/exportar carteira parquet PS dias=30 Vini Jr' -> (dataset, formato, FiltroExportacao).
+
+    Tudo é opcional: histórico, CSV e sem filtros por padrão. Datas: de=AAAA-MM-DD, ate=AAAA-MM-DD.
+    Lança ValueError se uma data ou número for inválido.
+    """
+    dataset, formato, plataforma, inicio, fim, nome = 'historico', 'csv', None, None, None, []
+    for arg in args:
+        chave, _, valor = arg.partition('=')
+        if arg.lower() in DATASETS:
+            dataset = arg.lower()
+        elif arg.lower() in FORMATOS:
+            formato = arg.lower()
+        elif arg.upper() in PLATFORMS:
+            plataforma = PLATFORMS[arg.upper()]
+        elif chave.lower() == 'dias':
+            inicio = FiltroExportacao.ultimos_dias(int(valor)).inicio
+        elif chave.lower() == 'de':
+            inicio = datetime.strptime(valor, '%Y-%m-%d').strftime('%Y-%m-%d')
+        elif chave.lower() in ('ate', 'até'):
+            fim = datetime.strptime(valor, '%Y-%m-%d').strftime('%Y-%m-%d')
+        else:
+            nome.append(arg)
+    filtro = FiltroExportacao(" ".join(nome) or None, plataforma, inicio, fim)
+    return dataset, formato, filtro
+
+
+def export_parts(user_id, dataset, formato, filtro):
+    """Gerador das partes da exportação (roda no pool de leitura, uma parte por vez)."""
+    colunas, campo_data = DATASETS[dataset]
+    with USUARIOS.usar(user_id) as dados:
+        linhas = dados.historico.iterar() if dataset == 'historico' else dados.carteira.iterar_trades()
+        yield from exportar_partes(filtrar(linhas, filtro, campo_data), colunas, formato)
+
+
+async def send_export(bot, chat_id, user_id, dataset, formato, filtro):
+    """Gera e envia a exportação parte por parte, sem montar o arquivo inteiro em memória.
+
+    Envia para o chat, e não como resposta a uma mensagem: a do menu é apagada ao exportar.
+    """
+    await bot.send_message(chat_id, f"Preparando exportação ({filtro.descricao()})...")
+    partes = export_parts(user_id, dataset, formato, filtro)
+    enviadas = 0
+    try:
+        while True:
+            arquivo = await ARMAZENAMENTO.ler(next, partes, None)
+            if arquivo is None:
+                break
+            enviadas += 1
+            with arquivo:
+                # Os bytes da parte (o PTB leria o arquivo inteiro de qualquer forma, e o temporário não tem nome)
+                await bot.send_document(
+                    chat_id,
+                    document=arquivo.read(),
+                    filename=nome_parte(dataset, formato, enviadas),
+                    caption=(
+                        f"💾 **{'Histórico de Preços' if dataset == 'historico' else 'Carteira de Trades (P&L)'}**"
+                        f"{f' - parte {enviadas}' if enviadas > 1 else ''}\n\nPronto para análise em Excel, Sheets ou pandas!"
+                    ),
+                    parse_mode='Markdown'
+                )
+    except ErroExportacao as e:
+        await bot.send_message(chat_id, f"🚨 {e}")
+        return
+    except Exception as e:
+        await bot.send_message(chat_id, f"🚨 Erro ao exportar: {e}")
+        return
+    finally:
+        partes.close()
+
+    if not enviadas:
+        await bot.send_message(chat_id, "🚨 Nenhum registro encontrado para esse filtro.")
+
+
+def start_export(update, context, dataset, formato, filtro, menu=False):
+    """Dispara a exportação em segundo plano e retorna na hora (o handler não espera os uploads).
+
+    Com `menu`, o menu principal é mostrado depois do último arquivo.
+    """
+    async def exportar():
+        await send_export(
+            context.bot, update.effective_chat.id, update.effective_user.id, dataset, formato, filtro)
+        if menu:
+            await start_command(update, context)
+
+    context.application.create_task(exportar(), update=update)
+
+
+def export_menu_markup():
+    """Opções do botão Exportar."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    keyboard = [
+        [InlineKeyboardButton("📚 Histórico (.csv.gz)", callback_data='EXPORT:historico:csv'),
+         InlineKeyboardButton("💼 Carteira (.csv.gz)", callback_data='EXPORT:carteira:csv')],
+        [InlineKeyboardButton("📅 Histórico 7 dias", callback_data='EXPORT:historico:csv:7'),
+         InlineKeyboardButton("📅 Histórico 30 dias", callback_data='EXPORT:historico:csv:30')],
     ]
-    
-    await message_source.reply_text("Preparando exportação de dados...")
-    
-    for filename, caption_prefix in files_to_export:
-        try:
-            if os.path.exists(filename):
-                with open(filename, 'rb') as doc:
-                    await message_source.reply_document(
-                        document=doc,
-                        caption=f"💾 **{caption_prefix}**\n\nPronto para análise em Excel ou Sheets!",
-                        parse_mode='Markdown'
-                    )
-            else:
-                await message_source.reply_text(f"🚨 Arquivo {filename} não encontrado.")
-        except Exception as e:
-            await message_source.reply_text(f"🚨 Erro ao exportar {filename}: {e}")
-            
-    # Retorna ao menu
-    await start_command(message_source, context)
+    if parquet_disponivel():
+        keyboard.append([InlineKeyboardButton("📊 Histórico (.parquet)", callback_data='EXPORT:historico:parquet'),
+                         InlineKeyboardButton("📊 Carteira (.parquet)", callback_data='EXPORT:carteira:parquet')])
+    keyboard.append([InlineKeyboardButton("🔎 Histórico de um jogador", callback_data='EXPORT:jogador')])
+    return InlineKeyboardMarkup(keyboard)
 
 
+@instrumentar('export_command')
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/exportar [historico|carteira] [csv|parquet] [PS|XB|PC] [dias=N] [de=AAAA-MM-DD] [ate=AAAA-MM-DD] [jogador].
+
+    Sem argumentos, mostra as opções de exportação.
+    """
+    if not context.args:
+        await update.message.reply_text(
+            "💾 **O que deseja exportar?**\n\n"
+            "Para filtros avançados: /exportar historico PS dias=30 Vini Jr",
+            reply_markup=export_menu_markup(),
+            parse_mode='Markdown'
+        )
+        return
+    try:
+        dataset, formato, filtro = parse_export_args(context.args)
+    except ValueError:
+        await update.message.reply_text("🚨 Filtro inválido. Ex: /exportar carteira de=2024-01-01 ate=2024-01-31")
+        return
+    start_export(update, context, dataset, formato, filtro)
+
+
+@instrumentar('carteira_command')
 async def carteira_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Mostra o resumo da carteira (trades abertos e P&L total)."""
+    """Mostra o resumo da carteira (P&L realizado, posições abertas marcadas a mercado e últimos trades)."""
     query = update.callback_query
+    user_id = update.effective_user.id
     
-    pnl_total, recent_closed = get_closed_trades_summary()
-    open_trades = get_open_trades()
+    resumo = await ARMAZENAMENTO.ler(get_wallet_summary, user_id)
+    avaliacao = await ARMAZENAMENTO.ler(get_portfolio_valuation, user_id)
+    open_trades = avaliacao['posicoes']
+    pnl_total = resumo['pnl_total']
+    recent_closed = resumo['ultimas_fechadas']
 
     pnl_sign = "🟢" if pnl_total >= 0 else "🔴"
     
@@ -460,8 +815,22 @@ async def carteira_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     summary_text = (
         f"📈 **Resumo de Performance (P&L)**\n"
         f"📊 **Lucro/Prejuízo Total:** {pnl_sign} **{format_price(pnl_total)}**\n"
-        f"---\n"
     )
+    if resumo['total_fechadas']:
+        summary_text += f"🎯 **Taxa de Acerto:** {resumo['taxa_acerto']:.0%} ({resumo['vitorias']}/{resumo['total_fechadas']} trades)\n"
+    for plataforma, pnl_plataforma in resumo['pnl_por_plataforma'].items():
+        summary_text += f"   {plataforma}: {format_price(pnl_plataforma)}\n"
+    if resumo['total_abertas']:
+        summary_text += f"💼 **Custo em Aberto:** {format_price(resumo['custo_aberto'])} ({resumo['total_abertas']} posições)\n"
+    if avaliacao['custo']:
+        pnl_aberto = avaliacao['lucro_nao_realizado']
+        summary_text += (
+            f"🏷️ **Valor de Mercado (líquido):** {format_price(avaliacao['valor_liquido'])}\n"
+            f"📉 **P&L Não Realizado:** {'🟢' if pnl_aberto >= 0 else '🔴'} **{format_price(pnl_aberto)}**\n"
+        )
+        if avaliacao['sem_preco']:
+            summary_text += f"   *{avaliacao['sem_preco']} posições sem preço recente ficaram de fora.*\n"
+    summary_text += "---\n"
     
     # 2. Trades Abertos
     if open_trades:
@@ -472,6 +841,12 @@ async def carteira_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
                 f"🔸 **{trade['jogador']}** ({trade['plataforma']})\n"
                 f"   Compra: {format_price(int(trade['preco_compra']))} em {dt_obj.strftime('%d/%m %H:%M')}\n"
             )
+            if trade['preco_atual'] is not None:
+                pnl_t = trade['lucro_nao_realizado']
+                open_text += (
+                    f"   Agora: {format_price(trade['preco_atual'])} | "
+                    f"Se vender: {'🟢' if pnl_t >= 0 else '🔴'} {format_price(pnl_t)}\n"
+                )
         summary_text += open_text
         summary_text += "---\n"
 
@@ -487,14 +862,248 @@ async def carteira_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             )
         summary_text += closed_text
 
-    await query.edit_message_text(
-        summary_text,
+    if query:
+        await query.edit_message_text(summary_text, parse_mode='Markdown')
+    else: # Chamado pelo comando /carteira
+        await update.message.reply_text(summary_text, parse_mode='Markdown')
+
+def parse_player_args(args):
+    """'/fixar PS Vini Jr' -> ('Vini Jr', 'PS'). Sem plataforma, assume PS."""
+    if args and args[0].upper() in PLATFORMS:
+        return " ".join(args[1:]).title(), args[0].upper()
+    return " ".join(args).title(), 'PS'
+
+
+@instrumentar('pin_command')
+async def pin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/fixar [PS|XB|PC] <jogador>: coleta o preço do jogador automaticamente. Sem argumentos, lista os fixados."""
+    user_id = update.effective_user.id
+    player_name, key = parse_player_args(context.args)
+
+    if not player_name:
+        fixados = WATCHLIST.fixados(user_id)
+        if not fixados:
+            await update.message.reply_text("📌 Nenhum jogador fixado. Use /fixar PS Vini Jr.")
+            return
+        linhas = [f"   • **{nome}** ({PLATFORMS.get(key, key)})" for nome, key in fixados]
+        await update.message.reply_text("📌 **Jogadores fixados:**\n" + "\n".join(linhas), parse_mode='Markdown')
+        return
+
+    WATCHLIST.fixar(user_id, player_name, key)
+    await ARMAZENAMENTO.escrever(WATCHLIST.salvar)
+    await update.message.reply_text(
+        f"📌 **{player_name}** ({PLATFORMS[key]}) fixado! O preço será coletado automaticamente.",
         parse_mode='Markdown'
     )
 
-# Funções history_command e recent_history_command (Omitidas por serem iguais, focando em texto)
-# ...
 
+@instrumentar('unpin_command')
+async def unpin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/desafixar [PS|XB|PC] <jogador>."""
+    player_name, key = parse_player_args(context.args)
+    if not player_name:
+        await update.message.reply_text("Use /desafixar PS Vini Jr.")
+        return
+    WATCHLIST.desafixar(update.effective_user.id, player_name, key)
+    await ARMAZENAMENTO.escrever(WATCHLIST.salvar)
+    await update.message.reply_text(f"📍 **{player_name}** ({PLATFORMS[key]}) desafixado.", parse_mode='Markdown')
+
+def parse_alert_args(args):
+    """'/alerta PS acima 150000 Vini Jr' -> (jogador, plataforma, tipo, valor, janela_min).
+
+    Variação aceita uma janela opcional em minutos: '/alerta variacao 10 30 Vini Jr'.
+    Lança ValueError se faltar algo.
+    """
+    args = list(args)
+    key = args.pop(0).upper() if args and args[0].upper() in PLATFORMS else 'PS'
+    if len(args) < 3:
+        raise ValueError("argumentos insuficientes")
+    tipo = args.pop(0).upper().replace('Ç', 'C').replace('Ã', 'A')
+    if tipo not in TIPOS_ALERTA:
+        raise ValueError(f"tipo desconhecido: {tipo}")
+    bruto = args.pop(0).replace('%', '')
+    valor = float(bruto.replace(',', '.')) if tipo == 'VARIACAO' else int(bruto.replace('.', '').replace(',', ''))
+    if valor <= 0 and tipo != 'LUCRO':
+        raise ValueError("valor deve ser positivo")
+    janela_min = 60
+    if tipo == 'VARIACAO' and len(args) > 1 and args[0].isdigit():
+        janela_min = int(args.pop(0))
+    jogador = " ".join(args).title()
+    if not jogador:
+        raise ValueError("faltou o jogador")
+    return jogador, key, tipo, valor, janela_min
+
+
+def describe_alert(alerta):
+    """Linha de exibição de um alerta."""
+    tipo, valor = alerta['tipo'], alerta['valor']
+    if tipo == 'VARIACAO':
+        condicao = f"{TIPOS_ALERTA[tipo]} {valor:g}% em {alerta['janela_min']} min"
+    else:
+        condicao = f"{TIPOS_ALERTA[tipo]} {format_price(valor)}"
+    return f"   #{alerta['id']} **{alerta['jogador']}** ({PLATFORMS.get(alerta['plataforma'], alerta['plataforma'])}): {condicao}"
+
+
+@instrumentar('alert_command')
+async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/alerta [PS|XB|PC] <acima|abaixo|variacao|lucro> <valor> [janela_min] <jogador>."""
+    user_id = update.effective_user.id
+    try:
+        jogador, key, tipo, valor, janela_min = parse_alert_args(context.args)
+    except ValueError:
+        await update.message.reply_text(
+            "Use:\n"
+            "/alerta PS acima 150000 Vini Jr\n"
+            "/alerta abaixo 90000 Vini Jr\n"
+            "/alerta variacao 10 30 Vini Jr (10% em 30 min)\n"
+            "/alerta lucro 20000 Vini Jr (lucro líquido das posições abertas)"
+        )
+        return
+
+    alerta = ALERTAS.adicionar(user_id, jogador, key, tipo, valor, janela_min)
+    WATCHLIST.alerta_criado(user_id, jogador, key)
+    await ARMAZENAMENTO.escrever(ALERTAS.salvar)
+    await ARMAZENAMENTO.escrever(WATCHLIST.salvar)
+    await update.message.reply_text(
+        f"🔔 Alerta criado! O preço será coletado automaticamente.\n{describe_alert(alerta)}",
+        parse_mode='Markdown'
+    )
+
+
+@instrumentar('alerts_command')
+async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/alertas: lista os alertas do usuário."""
+    alertas = ALERTAS.do_usuario(update.effective_user.id)
+    if not alertas:
+        await update.message.reply_text("🔕 Nenhum alerta. Use /alerta PS acima 150000 Vini Jr.")
+        return
+    linhas = [describe_alert(alerta) for alerta in alertas]
+    await update.message.reply_text(
+        "🔔 **Seus alertas:**\n" + "\n".join(linhas) + "\n\nPara remover: /remover_alerta <id>",
+        parse_mode='Markdown'
+    )
+
+
+@instrumentar('remove_alert_command')
+async def remove_alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/remover_alerta <id>."""
+    user_id = update.effective_user.id
+    if not context.args or not context.args[0].lstrip('#').isdigit():
+        await update.message.reply_text("Use /remover_alerta <id> (veja os ids em /alertas).")
+        return
+    alerta = ALERTAS.remover(user_id, int(context.args[0].lstrip('#')))
+    if not alerta:
+        await update.message.reply_text("🚨 Alerta não encontrado.")
+        return
+    WATCHLIST.alerta_removido(user_id, alerta['jogador'], alerta['plataforma'])
+    await ARMAZENAMENTO.escrever(ALERTAS.salvar)
+    await ARMAZENAMENTO.escrever(WATCHLIST.salvar)
+    await update.message.reply_text(f"🔕 Alerta #{alerta['id']} removido.")
+
+def format_date(data_hora):
+    """'2024-05-01 18:30:00' -> '01/05 18:30'."""
+    try:
+        return datetime.strptime(data_hora, '%Y-%m-%d %H:%M:%S').replace(tzinfo=TIMEZONE).strftime('%d/%m %H:%M')
+    except ValueError:
+        return data_hora
+
+
+def callback_with(prefix, value):
+    """callback_data cortado no limite de 64 bytes do Telegram."""
+    return f"{prefix}:{value}".encode('utf-8')[:64].decode('utf-8', errors='ignore')
+
+
+def page_buttons(prefix, pagina):
+    """Botões ◀️ Mais novos / Mais antigos ▶️ com os cursores da página."""
+    from telegram import InlineKeyboardButton
+    botoes = []
+    if pagina.cursor_novos is not None:
+        botoes.append(InlineKeyboardButton("◀️ Mais novos", callback_data=f"{prefix}:D:{pagina.cursor_novos}"))
+    if pagina.cursor_antigos is not None:
+        botoes.append(InlineKeyboardButton("Mais antigos ▶️", callback_data=f"{prefix}:A:{pagina.cursor_antigos}"))
+    return botoes
+
+
+def parse_page_cursor(value):
+    """'A:1234' -> {'antes': 1234}; 'D:1234' -> {'depois': 1234}."""
+    direcao, _, cursor = value.partition(':')
+    return {'antes' if direcao == 'A' else 'depois': int(cursor)}
+
+
+async def reply_or_edit(update: Update, text, reply_markup=None):
+    """Edita a mensagem do botão (paginação) ou responde ao comando."""
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    else:
+        await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+
+@instrumentar('history_command')
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE, inicio=0) -> None:
+    """/historico: jogadores registrados (página a página); cada um abre o histórico detalhado."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    jogadores, proximo = await ARMAZENAMENTO.ler(get_all_registered_players, update.effective_user.id, inicio)
+    if not jogadores:
+        await reply_or_edit(update, "📚 Nenhum preço registrado ainda. Use **Novo Registro de Preço** no /start.")
+        return
+
+    keyboard = [
+        [InlineKeyboardButton(f"{registro.jogador} - {format_price(registro.preco_moedas)}",
+                              callback_data=callback_with('SEARCH_HISTORY', registro.jogador))]
+        for _, registro in jogadores
+    ]
+    navegacao = []
+    if inicio:
+        navegacao.append(InlineKeyboardButton("⏮️ Início", callback_data='HISTORICO:'))
+    if proximo:
+        # Cursor posicional: um nome de jogador nem sempre cabe nos 64 bytes do callback_data
+        navegacao.append(InlineKeyboardButton("Próxima ▶️", callback_data=f"HISTORICO:{proximo}"))
+    if navegacao:
+        keyboard.append(navegacao)
+
+    await reply_or_edit(
+        update,
+        "📚 **Histórico Completo**\n\nJogadores com preço registrado (último preço). Toque em um para ver o histórico:",
+        InlineKeyboardMarkup(keyboard),
+    )
+
+
+async def player_history_view(update: Update, context: ContextTypes.DEFAULT_TYPE, player_name, antes=None, depois=None) -> None:
+    """Histórico detalhado de um jogador, paginado."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    context.user_data['history_player'] = player_name
+    pagina = await ARMAZENAMENTO.ler(get_player_history_page, update.effective_user.id, player_name, antes, depois)
+    if not pagina.registros:
+        await reply_or_edit(update, f"🚨 Nenhum registro para **{player_name}**.")
+        return
+
+    linhas = [f"📚 **{pagina.registros[0].jogador}** - Histórico de Preços:"]
+    for registro in pagina.registros:
+        linhas.append(f"   • **{format_price(registro.preco_moedas)}** ({registro.plataforma}) em *{format_date(registro.data_hora)}*")
+    keyboard = [page_buttons('JOGADOR', pagina), [InlineKeyboardButton("📚 Todos os jogadores", callback_data='HISTORICO:')]]
+    await reply_or_edit(update, "\n".join(linhas), InlineKeyboardMarkup([linha for linha in keyboard if linha]))
+
+
+@instrumentar('recent_history_command')
+async def recent_history_command(update: Update, context: ContextTypes.DEFAULT_TYPE, antes=None, depois=None) -> None:
+    """/recentes: últimos preços registrados (manuais e coletados), de todos os jogadores."""
+    from telegram import InlineKeyboardMarkup
+    pagina = await ARMAZENAMENTO.ler(get_recent_history, update.effective_user.id, antes, depois)
+    if not pagina.registros:
+        await reply_or_edit(update, "🕒 Nenhuma atividade registrada ainda.")
+        return
+
+    linhas = ["🕒 **Atividade Recente:**"]
+    for registro in pagina.registros:
+        linhas.append(
+            f"   • *{format_date(registro.data_hora)}* **{registro.jogador}** ({registro.plataforma}): "
+            f"{format_price(registro.preco_moedas)}"
+        )
+    botoes = page_buttons('RECENTES', pagina)
+    await reply_or_edit(update, "\n".join(linhas), InlineKeyboardMarkup([botoes]) if botoes else None)
+
+
+@instrumentar('button_callback', button_branch)
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Lida com todos os botões inline."""
     query = update.callback_query
@@ -523,21 +1132,26 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await query.edit_message_text("🔎 Por favor, **digite o nome completo** do jogador que você procura abaixo.", parse_mode='Markdown')
             
         elif value == 'HISTORICO':
-            # Chama a função de histórico de preços (já existente)
-            # ...
-            pass 
+            await history_command(update, context)
             
         elif value == 'RECENTES':
-            # Chama a função de histórico recente (já existente)
-            # ...
-            pass
+            await recent_history_command(update, context)
             
         elif value == 'CARTEIRA':
             await carteira_command(update, context)
             
         elif value == 'EXPORTAR':
-            await export_command(query.message, context)
-            await query.delete_message()
+            await query.edit_message_text("💾 **O que deseja exportar?**", reply_markup=export_menu_markup(), parse_mode='Markdown')
+
+    elif action == 'EXPORT':
+        if value == 'jogador':
+            context.user_data['flow_state'] = 'WAITING_FOR_EXPORT_PLAYER'
+            await query.edit_message_text("🔎 **Digite o nome do jogador** cujo histórico deseja exportar.", parse_mode='Markdown')
+            return
+        dataset, formato, *dias = value.split(':')
+        filtro = FiltroExportacao.ultimos_dias(int(dias[0])) if dias else FiltroExportacao()
+        await query.delete_message()
+        start_export(update, context, dataset, formato, filtro, menu=True)
 
 
     elif action == 'PLATFORM' and context.user_data.get('flow_state') == 'ASKING_FOR_PLATFORM':
@@ -566,43 +1180,288 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         
     elif action == 'SEARCH_HISTORY':
-        # Lógica de busca detalhada (já existente)
-        # ...
-        pass # A Lógica de SEARCH_HISTORY está no código anterior e pode ser copiada.
+        await search_player(update, context, value)
+
+    elif action == 'JOGADOR' and context.user_data.get('history_player'):
+        cursor = {} if value == 'INICIO' else parse_page_cursor(value)
+        await player_history_view(update, context, context.user_data['history_player'], **cursor)
 
+    elif action == 'HISTORICO':
+        # (botões antigos, com o nome do jogador como cursor, voltam para o início)
+        await history_command(update, context, inicio=int(value) if value.isdigit() else 0)
 
-# ... (Funções history_command, recent_history_command, e get_last_registered_price continuam as mesmas) ...
-# ... (Devido ao limite de espaço, assumo que essas funções que não foram alteradas serão mantidas) ...
+    elif action == 'RECENTES':
+        await recent_history_command(update, context, **parse_page_cursor(value))
 
 # ===================================================
 # 4. EXECUÇÃO
 # ===================================================
 
-def main() -> None:
-    """Conecta o bot ao Telegram e inicia a escuta."""
-    if not TELEGRAM_BOT_TOKEN:
-        print("ERRO CRÍTICO: Token do Telegram não encontrado! Verifique a variável de ambiente.")
-        return
-        
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+def usuarios_atendidos():
+    """Usuários com dados em DATA_DIR atendidos por este processo (todos, fora do modo multiprocesso)."""
+    return [user_id for user_id in listar_usuarios(DATA_DIR) if FRENTE is None or FRENTE.e_meu(user_id)]
+
+
+def rebuild_watchlist():
+    """Monta a watchlist a partir das posições abertas de todos os usuários (só na primeira execução)."""
+    for user_id in usuarios_atendidos():
+        with USUARIOS.usar(user_id) as dados:
+            for trade in dados.carteira.abertas():
+                WATCHLIST.posicao_aberta(user_id, trade['jogador'], platform_key(trade['plataforma']))
+    WATCHLIST.salvar()
+
+
+def rebuild_name_index():
+    """Monta o índice de nomes a partir dos históricos e carteiras de todos os usuários (só na primeira execução).
+
+    Os históricos são lidos em streaming, sem montar o índice de cada usuário em memória.
+    """
+    for user_id in usuarios_atendidos():
+        with USUARIOS.usar(user_id) as dados:
+            vistos = set()
+            for registro in dados.historico.iterar():
+                if registro['jogador'] not in vistos:
+                    vistos.add(registro['jogador'])
+                    NOMES.adicionar(registro['jogador'])
+            for trade in dados.carteira.abertas():
+                NOMES.adicionar(trade['jogador'])
+
+
+async def gravar_amostras(amostras):
+    await ARMAZENAMENTO.escrever(registrar_amostras, amostras)
+
+
+AGENDADOR = AgendadorPrecos(
+    WATCHLIST,
+    lambda nome, plataforma: get_player_price(nome, plataforma, force=True),
+    gravar_amostras,
+    intervalo=POLL_INTERVAL,
+)
+
+
+async def iniciar_armazenamento(application: Application) -> None:
+    """Sobe o pool de leitura, a tarefa escritora, as notificações, a expiração das sessões, a coleta automática de preços e as métricas."""
+    await ARMAZENAMENTO.iniciar()
+    NOTIFICADOR.iniciar(application.bot)
+    await ARMAZENAMENTO.ler(ALERTAS.carregar)
+    if NOMES.existe:
+        await ARMAZENAMENTO.ler(NOMES.carregar)
+    else:
+        await ARMAZENAMENTO.escrever(rebuild_name_index)
+    if WATCHLIST.existe:
+        await ARMAZENAMENTO.ler(WATCHLIST.carregar)
+    elif FRENTE is None:
+        # (num trabalhador a watchlist vem da frente, junto com os usuários)
+        await ARMAZENAMENTO.escrever(rebuild_watchlist)
+    SESSOES.iniciar(application)
+    if PRICE_POLLING:
+        AGENDADOR.iniciar()
+    if PROFILE_SLOW_MS:
+        ativar_perfilador(PROFILE_DIR, PROFILE_SLOW_MS / 1000)
+    if METRICS_PORT:
+        register_gauges(application)
+        METRICAS.servir(METRICS_PORT, METRICS_LISTEN)
+
+
+def register_gauges(application):
+    """Medidores lidos a cada coleta: profundidade das filas e ocupação dos caches."""
+    limitador = application.bot.rate_limiter
+    processador = application.update_processor
+    METRICAS.medidor('fila_profundidade', lambda: {
+        (('fila', 'escritas'),): ARMAZENAMENTO.escritas_na_fila,
+        (('fila', 'leituras'),): ARMAZENAMENTO.leituras_em_andamento,
+        (('fila', 'envios'),): limitador.aguardando if limitador else 0,
+        (('fila', 'notificacoes'),): NOTIFICADOR.pendentes,
+        (('fila', 'updates'),): getattr(processador, 'pendentes', 0),
+    }, "Itens esperando em cada fila (escritas, leituras, envios à Bot API, notificações, updates).")
+    METRICAS.medidor('cache_itens', lambda: {
+        (('cache', 'usuarios'),): USUARIOS.residentes,
+        (('cache', 'precos'),): len(MOTOR_PRECOS.cache),
+        (('cache', 'sessoes'),): SESSOES.ativas,
+    }, "Itens residentes em cada cache.")
+
+
+async def parar_envio(application: Application) -> None:
+    """Para a coleta automática e entrega as notificações na fila enquanto o bot ainda está conectado."""
+    await AGENDADOR.parar()
+    await NOTIFICADOR.parar()
+
+
+async def parar_armazenamento(application: Application) -> None:
+    """Grava as escritas pendentes e os snapshots das carteiras antes de encerrar."""
+    await AGENDADOR.parar()
+    await SESSOES.parar()
+    await ARMAZENAMENTO.escrever(USUARIOS.fechar_todos)
+    await ARMAZENAMENTO.escrever(ALERTAS.salvar)
+    await ARMAZENAMENTO.parar()
+    ARQUIVOS.fechar_todos()
+    await NOTIFICADOR.parar()
+    await MOTOR_PRECOS.fechar()
+    METRICAS.parar()
+
+
+def send_share(trabalhadores):
+    """Fatia de SEND_PER_SECOND de cada processo: o limite da Bot API é do bot, não de cada trabalhador."""
+    return max(1, SEND_PER_SECOND // max(trabalhadores, 1))
+
+
+def exportar_usuarios(filtro):
+    """Tira deste trabalhador o estado dos usuários com `filtro(user_id)` verdadeiro (passam a outro processo)."""
+    pacote = montar_pacote(WATCHLIST.extrair(filtro), ALERTAS.extrair(filtro), SESSOES.extrair(filtro))
+    # Em disco antes de sair dos arquivos deste processo: se algo cair daqui em diante, a frente reentrega
+    FRENTE.gravar_entrega(pacote)
+    USUARIOS.liberar(filtro)
+    ARQUIVOS.fechar_todos()
+    WATCHLIST.salvar()
+    ALERTAS.salvar()
+    SESSOES.salvar()
+    return pacote
+
+
+def importar_usuarios(pacote):
+    """Inverso de `exportar_usuarios`: passa a atender esses usuários."""
+    watchlist, alertas, sessoes = separar_pacote(pacote)
+    WATCHLIST.incorporar(watchlist)
+    ALERTAS.incorporar(alertas)
+    SESSOES.incorporar(sessoes)
+    WATCHLIST.salvar()
+    ALERTAS.salvar()
+    SESSOES.salvar()
+
+
+async def rodar_trabalhador(application):
+    """Um trabalhador do modo multiprocesso: os updates vêm da frente, e não do Telegram.
+
+    Fora de `run_polling`, os post_init/post_stop/post_shutdown são chamados aqui.
+    """
+    # Ctrl+C e SIGTERM chegam a todo o grupo de processos; quem encerra os trabalhadores é a frente
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    await application.initialize()
+    await iniciar_armazenamento(application)
+    await application.start()
+    await FRENTE.rodar(
+        application,
+        lambda filtro: ARMAZENAMENTO.escrever(exportar_usuarios, filtro),
+        lambda pacote: ARMAZENAMENTO.escrever(importar_usuarios, pacote),
+        STATE_DIR,
+        lambda trabalhadores: application.bot.rate_limiter.ajustar_taxa(send_share(trabalhadores)),
+    )
+    await application.stop()
+    await parar_envio(application)
+    await application.shutdown()
+    await parar_armazenamento(application)
+
+
+def build_front(token, base_url=None):
+    """Monta a Application da frente: recebe os updates e só os repassa aos WORKERS trabalhadores.
+
+    SIGUSR1/SIGUSR2 acrescentam/tiram um trabalhador, com o bot no ar.
+    """
+    from telegram import Update
+    from telegram.ext import Application, TypeHandler
+
+    frente = Frente(WORKERS, [sys.executable, os.path.abspath(__file__)], DATA_DIR, porta_metricas=METRICS_PORT)
+
+    async def encaminhar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        usuario = update.effective_user
+        frente.encaminhar(usuario.id if usuario else 0, update.to_dict())
+
+    async def iniciar_frente(application: Application) -> None:
+        await frente.iniciar()
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, 'SIGUSR1'):
+            loop.add_signal_handler(
+                signal.SIGUSR1, lambda: loop.create_task(frente.redimensionar(frente.trabalhadores + 1)))
+            loop.add_signal_handler(
+                signal.SIGUSR2, lambda: loop.create_task(frente.redimensionar(frente.trabalhadores - 1)))
+
+    async def parar_frente(application: Application) -> None:
+        await frente.parar()
+
+    builder = Application.builder().token(token).post_init(iniciar_frente).post_shutdown(parar_frente)
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+    application.add_handler(TypeHandler(Update, encaminhar))
+    return application
+
+
+def build_application(token, base_url=None):
+    """Monta a Application com os handlers, o processamento concorrente por usuário e o limite de envio.
+
+    `base_url` troca o endereço da Bot API (ex: API falsa local no benchmark de webhook).
+    """
+    from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters
+    from limitador import LimitadorEnvio
+    from processamento import ProcessadorPorUsuario
+    from sessoes import PersistenciaSessoes
+
+    global SESSOES
+    if SESSOES is None:
+        SESSOES = PersistenciaSessoes(os.path.join(STATE_DIR, 'sessoes.json'), PLATFORMS.values(), ttl=SESSION_TTL)
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(ProcessadorPorUsuario(MAX_CONCURRENT_UPDATES))
+        .persistence(SESSOES)
+        .rate_limiter(LimitadorEnvio(por_segundo=send_share(WORKERS) if FRENTE else SEND_PER_SECOND))
+        .post_init(iniciar_armazenamento)
+        .post_stop(parar_envio)
+        .post_shutdown(parar_armazenamento)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
 
     # Handlers
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("carteira", carteira_command))
+    application.add_handler(CommandHandler("exportar", export_command))
+    application.add_handler(CommandHandler("historico", history_command))
+    application.add_handler(CommandHandler("recentes", recent_history_command))
+    application.add_handler(CommandHandler("fixar", pin_command))
+    application.add_handler(CommandHandler("desafixar", unpin_command))
+    application.add_handler(CommandHandler("alerta", alert_command))
+    application.add_handler(CommandHandler("alertas", alerts_command))
+    application.add_handler(CommandHandler("remover_alerta", remove_alert_command))
+    application.add_handler(CommandHandler("tendencias", trending_command))
     application.add_handler(CallbackQueryHandler(button_callback))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message_flow))
+    return application
+
+
+def main() -> None:
+    """Conecta o bot ao Telegram e inicia a escuta (webhook se WEBHOOK_URL estiver definido, senão polling).
+
+    Com WORKERS, este processo é só a frente e os handlers rodam nos trabalhadores.
+    """
+    if not TELEGRAM_BOT_TOKEN:
+        print("ERRO CRÍTICO: Token do Telegram não encontrado! Verifique a variável de ambiente.")
+        return
+        
+    if FRENTE is not None:
+        asyncio.run(rodar_trabalhador(build_application(TELEGRAM_BOT_TOKEN, TELEGRAM_API_URL)))
+        return
+    if WORKERS:
+        application = build_front(TELEGRAM_BOT_TOKEN, TELEGRAM_API_URL)
+    else:
+        application = build_application(TELEGRAM_BOT_TOKEN, TELEGRAM_API_URL)
 
     print("🤖 SuperBot Trade iniciado e ouvindo...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WEBHOOK_URL:
+        # Servidor HTTP local; o proxy reverso (HTTPS) encaminha WEBHOOK_URL para WEBHOOK_LISTEN:WEBHOOK_PORT
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES,
+        )
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == '__main__':
-    # Garante que os arquivos CSV existam ao iniciar
-    init_csv('preços_historico.csv', ['data_hora', 'jogador', 'preco_moedas', 'plataforma'])
-    init_csv(CARTEIRA_FILE, ['data_hora_compra', 'jogador', 'preco_compra', 'plataforma', 'preco_venda', 'lucro_liquido'])
-    
     main()
-
-# NOTA: O código final completo deve incluir as funções get_last_registered_price, get_trade_tip, 
-# get_detailed_player_history, get_all_registered_players, get_recent_history, history_command, 
-# e recent_history_command. Devido a limitações de espaço, o código acima focou nas novas funcionalidades de P&L.
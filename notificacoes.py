@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+# ===================================================
+# NOTIFICAÇÕES EM LOTE PARA O TELEGRAM
+# ===================================================
+
+LIMITE_MENSAGEM = 4096
+
+# Faixas de prioridade do LimitadorEnvio (`rate_limit_args` das chamadas do bot; sem nada = interativa)
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_LOTE = 1
+
+
+class Notificador:
+    """Fila de notificações em lote (alertas, avisos) para o Telegram.
+
+    `notificar` só enfileira e retorna (pode ser chamado de qualquer thread).
+    Textos para o mesmo chat que chegam enquanto ele espera a vez (ou enquanto
+    a mensagem anterior ainda está sendo enviada) são juntados numa única
+    mensagem. O ritmo fica com o LimitadorEnvio do bot: as notificações vão
+    na PRIORIDADE_LOTE, atrás das respostas interativas. No máximo
+    `simultaneos` chats são enviados ao mesmo tempo.
+    """
+
+    def __init__(self, simultaneos=64):
+        self.simultaneos = simultaneos
+        self._bot = None
+        self._loop = None
+        self._pendentes = {}     # chat_id -> [textos], na ordem de chegada dos chats
+        self._enviando = set()   # chats com envio em andamento
+        self._tarefas = set()
+        self._acordar = None
+        self._tarefa = None
+
+    @property
+    def pendentes(self):
+        """Textos esperando envio."""
+        return sum(len(textos) for textos in self._pendentes.values())
+
+    def iniciar(self, bot):
+        self._bot = bot
+        self._loop = asyncio.get_running_loop()
+        self._acordar = asyncio.Event()
+        self._tarefa = self._loop.create_task(self._laco())
+
+    async def parar(self, espera=10):
+        """Tenta entregar o que está na fila (até `espera` segundos) e encerra."""
+        if self._tarefa is None:
+            return
+        inicio = time.monotonic()
+        while (self._pendentes or self._enviando) and time.monotonic() - inicio < espera:
+            self._acordar.set()
+            await asyncio.sleep(0.05)
+        self._tarefa.cancel()
+        for tarefa in list(self._tarefas):
+            tarefa.cancel()
+        await asyncio.gather(self._tarefa, *self._tarefas, return_exceptions=True)
+        self._tarefa = None
+
+    def notificar(self, chat_id, texto):
+        """Enfileira um texto (thread-safe)."""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._enfileirar, chat_id, texto)
+
+    def _enfileirar(self, chat_id, texto):
+        self._pendentes.setdefault(chat_id, []).append(texto)
+        self._acordar.set()
+
+    async def _laco(self):
+        while True:
+            await self._acordar.wait()
+            self._acordar.clear()
+            for chat_id in list(self._pendentes):
+                if len(self._enviando) >= self.simultaneos:
+                    break
+                if chat_id in self._enviando:
+                    continue
+                textos = self._pendentes.pop(chat_id)
+                self._enviando.add(chat_id)
+                tarefa = self._loop.create_task(self._enviar(chat_id, textos))
+                self._tarefas.add(tarefa)
+                tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _enviar(self, chat_id, textos):
+        try:
+            for mensagem in self._juntar(textos):
+                try:
+                    await self._bot.send_message(
+                        chat_id=chat_id, text=mensagem, parse_mode='Markdown',
+                        rate_limit_args=PRIORIDADE_LOTE,
+                    )
+                except Exception as e:
+                    print(f"Erro ao notificar {chat_id}: {e}")
+        finally:
+            self._enviando.discard(chat_id)
+            self._acordar.set()
+
+    @staticmethod
+    def _partes(texto):
+        """Corta um texto em pedaços de até LIMITE_MENSAGEM caracteres, de preferência numa quebra de linha."""
+        while len(texto) > LIMITE_MENSAGEM:
+            corte = texto.rfind('\n', 0, LIMITE_MENSAGEM)
+            if corte <= 0:
+                corte = LIMITE_MENSAGEM
+            yield texto[:corte]
+            texto = texto[corte:].lstrip('\n')
+        if texto:
+            yield texto
+
+    @classmethod
+    def _juntar(cls, textos):
+        """Concatena os textos em mensagens de até LIMITE_MENSAGEM caracteres (textos maiores são cortados antes)."""
+        mensagens, atual = [], ''
+        for texto in textos:
+            for parte in cls._partes(texto):
+                if atual and len(atual) + len(parte) + 2 > LIMITE_MENSAGEM:
+                    mensagens.append(atual)
+                    atual = ''
+                atual = f"{atual}\n\n{parte}" if atual else parte
+        if atual:
+            mensagens.append(atual)
+        return mensagens
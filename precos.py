@@ -0,0 +1,286 @@
+import asyncio
+import random
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode, urlsplit
+
+from comum import normalizar_nome
+from metricas import METRICAS
+
+# ===================================================
+# MOTOR DE PREÇOS: SCRAPING COM POOL, LIMITES E CACHE
+# ===================================================
+
+# Plataforma do bot -> plataforma nos sites (PS e Xbox compartilham o mercado de console)
+PLATAFORMAS_SITE = {'PS': 'ps', 'XB': 'ps', 'PC': 'pc'}
+
+# Teto (segundos) para a espera pedida no Retry-After de um 429
+ESPERA_MAXIMA_429 = 30
+
+
+def interpretar_preco(texto):
+    """Converte '1.2M', '850K', '15,000' ou '15.000' em moedas (int). None se vazio."""
+    texto = (texto or '').strip().upper().replace(' ', '')
+    if not texto or texto in ('-', '0'):
+        return None
+    multiplicador = 1
+    if texto.endswith('M'):
+        multiplicador, texto = 1_000_000, texto[:-1]
+    elif texto.endswith('K'):
+        multiplicador, texto = 1_000, texto[:-1]
+    if multiplicador > 1:
+        try:
+            return int(float(texto.replace(',', '.')) * multiplicador)
+        except ValueError:
+            return None
+    digitos = re.sub(r'[^0-9]', '', texto)
+    return int(digitos) if digitos else None
+
+
+class CacheTTL:
+    """Cache LRU com expiração por item."""
+
+    def __init__(self, ttl=300, max_itens=5000, nome='precos'):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.nome = nome
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            METRICAS.contar('cache_acessos_total', cache=self.nome, resultado='falta')
+            return None
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._itens[chave]
+            METRICAS.contar('cache_acessos_total', cache=self.nome, resultado='expirado')
+            return None
+        self._itens.move_to_end(chave)
+        METRICAS.contar('cache_acessos_total', cache=self.nome, resultado='acerto')
+        return valor
+
+    def espiar(self, chave):
+        """(expira_em, valor) ainda válido, sem mexer na ordem do LRU nem nas métricas (pode ser chamado fora do loop)."""
+        item = self._itens.get(chave)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item
+
+    def guardar(self, chave, valor):
+        self._itens[chave] = (time.monotonic() + self.ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+
+# ---------------------------------------------------
+# Parsers (um por site). Para trocar de site, basta registrar outro parser.
+# ---------------------------------------------------
+
+class ParserFutbin:
+    """Lê a página de busca do Futbin."""
+
+    LINHA = 'tr.player-row'
+    NOME = '.table-player-name'
+    PRECO = '.price'
+
+    def url_busca(self, base_url, nome, plataforma):
+        return f"{base_url}/players?{urlencode({'search': nome, 'platform': PLATAFORMAS_SITE.get(plataforma, 'ps')})}"
+
+    def _linhas(self, html):
+        from bs4 import BeautifulSoup
+        for linha in BeautifulSoup(html, 'html.parser').select(self.LINHA):
+            nome = linha.select_one(self.NOME)
+            if nome is not None:
+                yield nome.get_text(strip=True), linha
+
+    def extrair_preco(self, html, nome):
+        """(nome, preço) da primeira linha cujo nome bate com o buscado, ou None."""
+        alvo = normalizar_nome(nome)
+        for nome_linha, linha in self._linhas(html):
+            if normalizar_nome(nome_linha) != alvo:
+                continue
+            preco_tag = linha.select_one(self.PRECO)
+            preco = interpretar_preco(preco_tag.get_text() if preco_tag else '')
+            if preco is not None:
+                return nome_linha, preco
+        return None
+
+
+class ParserFutgg(ParserFutbin):
+    """Fut.gg: mesma ideia, marcação diferente."""
+
+    LINHA = 'div.player-card'
+    NOME = '.player-name'
+    PRECO = '.player-price'
+
+    def url_busca(self, base_url, nome, plataforma):
+        return f"{base_url}/players/?{urlencode({'name': nome, 'platform': PLATAFORMAS_SITE.get(plataforma, 'ps')})}"
+
+
+PARSERS = {
+    'futbin': ParserFutbin(),
+    'futgg': ParserFutgg(),
+}
+
+SITES = {
+    'futbin': 'https://www.futbin.com',
+    'futgg': 'https://www.fut.gg',
+}
+
+
+class FontePrecos:
+    """Um site de preços: URL base e o parser que entende suas páginas."""
+
+    def __init__(self, nome, base_url=None, parser=None):
+        self.nome = nome
+        self.base_url = (base_url or SITES[nome]).rstrip('/')
+        self.parser = parser or PARSERS[nome]
+        self.host = urlsplit(self.base_url).netloc
+
+
+def espera_retry_after(resposta):
+    """Segundos pedidos no Retry-After (número ou data HTTP), até ESPERA_MAXIMA_429. None se não veio."""
+    valor = (resposta.headers.get('Retry-After') or '').strip()
+    if not valor:
+        return None
+    try:
+        segundos = float(valor)
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            segundos = parsedate_to_datetime(valor).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(segundos, 0), ESPERA_MAXIMA_429)
+
+
+class ErroFonte(Exception):
+    """Falha definitiva ao consultar uma fonte (após as tentativas)."""
+
+
+class MotorPrecos:
+    """Busca preços nas fontes configuradas.
+
+    - um único `httpx.AsyncClient` (pool de conexões keep-alive);
+    - no máximo `por_host` requisições simultâneas por site;
+    - novas tentativas com backoff exponencial + jitter em erros de rede, 429 e 5xx;
+    - pedidos simultâneos do mesmo (jogador, plataforma) compartilham a mesma busca;
+    - resultados ficam num cache TTL com despejo LRU.
+    """
+
+    def __init__(self, fontes, ttl=300, max_itens=5000, por_host=4, tentativas=3, timeout=10.0):
+        self.fontes = fontes
+        self.cache = CacheTTL(ttl, max_itens)
+        self.por_host = por_host
+        self.tentativas = tentativas
+        self.timeout = timeout
+        self._cliente = None
+        self._semaforos = {}
+        self._em_andamento = {}  # chave -> tarefa da busca, compartilhada
+
+    def _http(self):
+        if self._cliente is None:
+            import httpx
+            self._cliente = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={'User-Agent': 'Mozilla/5.0 (fcmonitor)'},
+                limits=httpx.Limits(max_connections=self.por_host * max(len(self.fontes), 1),
+                                    max_keepalive_connections=self.por_host * max(len(self.fontes), 1)),
+            )
+        return self._cliente
+
+    async def fechar(self):
+        for tarefa in list(self._em_andamento.values()):
+            tarefa.cancel()
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+    async def _baixar(self, fonte, url):
+        """GET com limite por host e novas tentativas. Retorna o HTML."""
+        import httpx
+        semaforo = self._semaforos.setdefault(fonte.host, asyncio.Semaphore(self.por_host))
+        ultimo_erro = None
+        espera = None  # Retry-After do último 429, no lugar do backoff
+        for tentativa in range(self.tentativas):
+            if tentativa:
+                if espera is None:
+                    espera = 0.5 * 2 ** (tentativa - 1) + random.uniform(0, 0.25)
+                await asyncio.sleep(espera)
+                espera = None
+            try:
+                async with semaforo:
+                    resposta = await self._http().get(url)
+            except httpx.TransportError as e:
+                ultimo_erro = e
+                continue
+            if resposta.status_code == 429 or resposta.status_code >= 500:
+                if resposta.status_code == 429:
+                    espera = espera_retry_after(resposta)
+                ultimo_erro = ErroFonte(f"{fonte.nome}: HTTP {resposta.status_code}")
+                continue
+            if resposta.status_code != 200:
+                raise ErroFonte(f"{fonte.nome}: HTTP {resposta.status_code}")
+            return resposta.text
+        raise ErroFonte(f"{fonte.nome}: {ultimo_erro}")
+
+    async def _coalescer(self, chave, buscar, usar_cache=True):
+        """Cache -> busca em andamento -> nova busca (compartilhada com quem chegar depois).
+
+        A busca roda numa tarefa própria: quem desiste (ex: cancelado ao
+        desligar) não cancela a busca dos outros que esperam por ela.
+        """
+        valor = self.cache.obter(chave) if usar_cache else None
+        if valor is not None:
+            return valor
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = self._em_andamento[chave] = asyncio.ensure_future(self._buscar_e_guardar(chave, buscar))
+            # Ninguém mais esperando: evita o aviso de exceção não lida
+            tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(tarefa)
+
+    async def _buscar_e_guardar(self, chave, buscar):
+        try:
+            valor = await buscar()
+            if valor is not None:
+                self.cache.guardar(chave, valor)
+            return valor
+        finally:
+            del self._em_andamento[chave]
+
+    async def preco(self, nome, plataforma, forcar=False):
+        """(nome no site, preço) do jogador na plataforma, ou None se nenhuma fonte achou.
+
+        `forcar` ignora o valor em cache (a busca nova ainda atualiza o cache).
+        """
+        async def buscar():
+            for fonte in self.fontes:
+                try:
+                    html = await self._baixar(fonte, fonte.parser.url_busca(fonte.base_url, nome, plataforma))
+                except ErroFonte as e:
+                    print(f"Falha ao buscar {nome} ({plataforma}): {e}")
+                    continue
+                # BeautifulSoup é CPU puro: fora do loop para não segurar os outros handlers
+                resultado = await asyncio.to_thread(fonte.parser.extrair_preco, html, nome)
+                if resultado:
+                    return resultado
+            return None
+
+        chave = ('preco', normalizar_nome(nome), PLATAFORMAS_SITE.get(plataforma, plataforma))
+        return await self._coalescer(chave, buscar, usar_cache=not forcar)
+
+    def preco_em_cache(self, nome, plataforma):
+        """(preço, expira_em monotonic) já em cache do jogador na plataforma (sem buscar nos sites), ou None."""
+        item = self.cache.espiar(('preco', normalizar_nome(nome), PLATAFORMAS_SITE.get(plataforma, plataforma)))
+        if item is None:
+            return None
+        expira_em, (_, preco) = item
+        return preco, expira_em
@@ -0,0 +1,63 @@
+from collections import deque
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# ===================================================
+# PROCESSAMENTO CONCORRENTE COM ORDEM POR USUÁRIO
+# ===================================================
+
+
+class ProcessadorPorUsuario(BaseUpdateProcessor):
+    """Processa até `max_concurrent_updates` updates ao mesmo tempo, mas os de
+    um mesmo usuário sempre um de cada vez e na ordem de chegada.
+
+    Assim o `flow_state` em `context.user_data` nunca é lido e alterado por
+    dois handlers do mesmo usuário ao mesmo tempo, enquanto usuários
+    diferentes não esperam uns pelos outros. O PTB segura uma vaga do
+    semáforo durante todo o `do_process_update`, então só o primeiro update
+    de cada usuário fica com a vaga: os seguintes entram na fila do usuário e
+    retornam na hora, e quem tem a vaga processa a fila até ela esvaziar. Um
+    usuário com centenas de updates pendentes ocupa uma vaga, não todas.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._filas = {}  # user_id -> deque das corrotinas esperando a vez (existe enquanto há uma em andamento)
+
+    @property
+    def pendentes(self):
+        """Updates em andamento ou esperando a vez do usuário."""
+        return sum(len(fila) + 1 for fila in self._filas.values())
+
+    async def do_process_update(self, update, coroutine):
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await coroutine
+            return
+
+        fila = self._filas.get(user.id)
+        if fila is not None:
+            # O update em andamento do usuário processa este depois (sem ocupar outra vaga)
+            fila.append(coroutine)
+            return
+
+        fila = self._filas[user.id] = deque()
+        try:
+            while coroutine is not None:
+                try:
+                    await coroutine
+                except Exception as e:
+                    print(f"Erro ao processar update do usuário {user.id}: {e}")
+                coroutine = fila.popleft() if fila else None
+        finally:
+            del self._filas[user.id]
+            # Cancelado (ex: desligando): os que ainda esperavam não rodam mais
+            for pendente in fila:
+                pendente.close()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import threading
+import time
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from durabilidade import gravar_atomico
+
+# ===================================================
+# ESTADO DA CONVERSA PERSISTIDO (COMPACTO, COM TTL)
+# ===================================================
+
+# Chaves de `context.user_data` que formam o fluxo em andamento
+CHAVES_FLUXO = ('flow_state', 'temp_player_name', 'temp_platform', 'temp_action')
+
+# Valores conhecidos são gravados como índices nestas tabelas (desconhecidos, como texto)
+ESTADOS = ('READY', 'WAITING_FOR_PLAYER', 'ASKING_FOR_PLATFORM', 'WAITING_FOR_PRICE',
+           'WAITING_FOR_SEARCH_NAME', 'WAITING_FOR_EXPORT_PLAYER')
+ACOES = ('PREÇO', 'COMPRA', 'VENDA')
+
+
+def _codificar(valor, tabela):
+    if valor is None:
+        return None
+    try:
+        return tabela.index(valor)
+    except ValueError:
+        return valor
+
+
+def _decodificar(codigo, tabela):
+    if isinstance(codigo, int) and 0 <= codigo < len(tabela):
+        return tabela[codigo]
+    return codigo
+
+
+class PersistenciaSessoes(BasePersistence):
+    """Persistência do fluxo de conversa (`flow_state` e `temp_*`) de cada usuário.
+
+    - Compacto: só as chaves de CHAVES_FLUXO, num registro
+      [estado, jogador, plataforma, ação, atualizado_em] com os valores
+      conhecidos trocados por índices; quem está em READY sem nada pendente
+      não ocupa registro.
+    - Write-behind: a Application entrega os usuários alterados a cada
+      `update_interval` segundos e o arquivo inteiro (só sessões ativas) é
+      regravado uma vez, `atraso` segundos depois da última alteração.
+    - TTL: sessões paradas há mais de `ttl` segundos são descartadas, e o
+      `user_data` de quem ficou inativo esse tempo sai da memória.
+    - Restauração preguiçosa: ao iniciar só as sessões ainda válidas são
+      lidas, e cada uma volta para o `user_data` no primeiro update do usuário.
+
+    O resto de `user_data` (ex: o jogador da tela de histórico) não é persistido.
+    """
+
+    def __init__(self, arquivo, plataformas=(), ttl=3600, update_interval=5, atraso=1.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.arquivo = arquivo
+        self.plataformas = tuple(plataformas)
+        self.ttl = ttl
+        self.atraso = atraso
+        self._sessoes = {}    # user_id -> registro compacto
+        self._pendentes = set()  # lidas do arquivo e ainda não devolvidas ao user_data
+        self._vistos = {}     # user_id -> último update (time.time)
+        self._sujo = False
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+        self._gravacao = None
+        self._limpeza = None
+
+    @property
+    def ativas(self):
+        # (sem __len__: a Application testa `if not self.persistence`)
+        return len(self._sessoes)
+
+    # --- Registro compacto ---
+
+    def _compactar(self, user_data, agora):
+        estado = user_data.get('flow_state', 'READY')
+        campos = [user_data.get(chave) for chave in CHAVES_FLUXO[1:]]
+        if estado == 'READY' and not any(campos):
+            return None
+        jogador, plataforma, acao = campos
+        return [
+            _codificar(estado, ESTADOS), jogador, _codificar(plataforma, self.plataformas),
+            _codificar(acao, ACOES), int(agora),
+        ]
+
+    def _expandir(self, registro):
+        estado, jogador, plataforma, acao, _ = registro
+        valores = (
+            _decodificar(estado, ESTADOS), jogador,
+            _decodificar(plataforma, self.plataformas), _decodificar(acao, ACOES),
+        )
+        return {chave: valor for chave, valor in zip(CHAVES_FLUXO, valores) if valor is not None}
+
+    # --- Arquivo ---
+
+    def carregar(self):
+        """Lê só as sessões dentro do TTL; elas ficam pendentes até o primeiro update do usuário."""
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as file:
+                sessoes = json.load(file)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            print(f"Erro ao ler sessões de {self.arquivo}: {e}")
+            return
+        limite = time.time() - self.ttl
+        with self._lock:
+            self._sessoes = {
+                int(user_id): registro for user_id, registro in sessoes.items() if registro[-1] >= limite
+            }
+            self._pendentes = set(self._sessoes)
+            self._sujo = len(self._sessoes) != len(sessoes)
+
+    def salvar(self):
+        # O lock do arquivo garante que uma gravação mais nova nunca é sobrescrita por uma mais velha
+        with self._lock_arquivo:
+            with self._lock:
+                if not self._sujo:
+                    return
+                texto = json.dumps({str(user_id): r for user_id, r in self._sessoes.items()},
+                                   ensure_ascii=False, separators=(',', ':'))
+                self._sujo = False
+            gravar_atomico(self.arquivo, texto)
+
+    def _marcar_sujo(self):
+        self._sujo = True
+        if self._gravacao is None or self._gravacao.done():
+            self._gravacao = asyncio.get_running_loop().create_task(self._gravar_depois())
+
+    async def _gravar_depois(self):
+        # Junta as alterações que chegarem durante o atraso numa única gravação
+        while self._sujo:
+            await asyncio.sleep(self.atraso)
+            await asyncio.to_thread(self.salvar)
+
+    # --- Passagem de usuários para outro processo ---
+
+    def extrair(self, filtro):
+        """Tira as sessões dos usuários com `filtro(user_id)` verdadeiro: {user_id: registro}. Grave com `salvar`."""
+        with self._lock:
+            extraidas = {user_id: registro for user_id, registro in self._sessoes.items() if filtro(user_id)}
+            for user_id in extraidas:
+                del self._sessoes[user_id]
+                self._pendentes.discard(user_id)
+            self._vistos = {user_id: visto for user_id, visto in self._vistos.items() if not filtro(user_id)}
+            if extraidas:
+                self._sujo = True
+        return extraidas
+
+    def incorporar(self, sessoes):
+        """Inverso de `extrair`: cada sessão volta para o `user_data` no próximo update do usuário."""
+        with self._lock:
+            for user_id, registro in sessoes.items():
+                self._sessoes[int(user_id)] = registro
+                self._pendentes.add(int(user_id))
+            self._sujo = self._sujo or bool(sessoes)
+
+    # --- Expiração ---
+
+    def iniciar(self, application):
+        """Começa a varredura periódica que expira sessões e tira da memória os usuários inativos."""
+        if self._limpeza is None:
+            self._limpeza = asyncio.get_running_loop().create_task(self._laco_limpeza(application))
+
+    async def parar(self):
+        if self._limpeza is not None:
+            self._limpeza.cancel()
+            try:
+                await self._limpeza
+            except asyncio.CancelledError:
+                pass
+            self._limpeza = None
+
+    async def _laco_limpeza(self, application):
+        while True:
+            await asyncio.sleep(max(self.ttl / 4, 1))
+            for user_id in self.expirar():
+                application.drop_user_data(user_id)
+
+    def expirar(self, agora=None):
+        """Descarta as sessões vencidas e retorna os usuários inativos há mais de `ttl`."""
+        limite = (agora or time.time()) - self.ttl
+        with self._lock:
+            vencidas = [user_id for user_id, registro in self._sessoes.items() if registro[-1] < limite]
+            for user_id in vencidas:
+                del self._sessoes[user_id]
+                self._pendentes.discard(user_id)
+            inativos = [user_id for user_id, visto in self._vistos.items() if visto < limite]
+            for user_id in inativos:
+                del self._vistos[user_id]
+        if vencidas:
+            self._marcar_sujo()
+        return inativos
+
+    # --- BasePersistence: user_data ---
+
+    async def get_user_data(self):
+        await asyncio.to_thread(self.carregar)
+        return {}
+
+    async def refresh_user_data(self, user_id, user_data):
+        agora = time.time()
+        with self._lock:
+            self._vistos[user_id] = agora
+            if user_id not in self._pendentes:
+                return
+            self._pendentes.discard(user_id)
+            registro = self._sessoes.get(user_id)
+        if registro is not None and registro[-1] >= agora - self.ttl:
+            # O registro vale mais que o user_data em memória (pode ter vindo de outro processo)
+            for chave in CHAVES_FLUXO:
+                user_data.pop(chave, None)
+            user_data.update(self._expandir(registro))
+
+    async def update_user_data(self, user_id, data):
+        registro = self._compactar(data, time.time())
+        with self._lock:
+            self._pendentes.discard(user_id)
+            if registro is None:
+                if self._sessoes.pop(user_id, None) is None:
+                    return
+            else:
+                self._sessoes[user_id] = registro
+        self._marcar_sujo()
+
+    async def drop_user_data(self, user_id):
+        with self._lock:
+            self._vistos.pop(user_id, None)
+            self._pendentes.discard(user_id)
+            if self._sessoes.pop(user_id, None) is None:
+                return
+        self._marcar_sujo()
+
+    async def flush(self):
+        if self._gravacao is not None:
+            self._gravacao.cancel()
+            try:
+                await self._gravacao
+            except asyncio.CancelledError:
+                pass
+            self._gravacao = None
+        await asyncio.to_thread(self.salvar)
+
+    # --- BasePersistence: o resto não é persistido ---
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
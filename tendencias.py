@@ -0,0 +1,216 @@
+import heapq
+import threading
+import time
+from collections import Counter, deque
+
+from indice_nomes import dobrar_nome
+
+# ===================================================
+# MAIS BUSCADOS E MAIORES VARIAÇÕES (JANELA DESLIZANTE, MEMÓRIA FIXA)
+# ===================================================
+
+# Jogadores acompanhados por balde de tempo (os demais são aproximados pelo Space-Saving)
+CAPACIDADE_PADRAO = 64
+# Baldes da janela: ela anda de `janela / BALDES` em `janela / BALDES` segundos
+BALDES = 12
+
+
+class SpaceSaving:
+    """Contagem aproximada dos itens mais frequentes de um fluxo com memória fixa (Space-Saving).
+
+    Guarda no máximo `capacidade` contadores. Um item novo com tudo cheio
+    toma o lugar do de menor contagem e herda essa contagem (o `erro`), então
+    cada contagem é no máximo `erro` acima da real e todo item com mais de
+    total/capacidade ocorrências está garantidamente na tabela. O menor
+    contador sai de um heap com entradas vencidas descartadas na hora de usar.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.capacidade = capacidade
+        self.contagens = {}  # item -> [contagem, erro]
+        self._heap = []      # (contagem, item); vale só se ainda bate com `contagens`
+
+    def adicionar(self, item, peso=1):
+        """Conta o item; retorna o item que saiu da tabela para dar lugar a ele (ou None)."""
+        contador = self.contagens.get(item)
+        removido = None
+        if contador is None:
+            if len(self.contagens) < self.capacidade:
+                contador = self.contagens[item] = [0, 0]
+            else:
+                minimo, removido = self._minimo()
+                del self.contagens[removido]
+                contador = self.contagens[item] = [minimo, minimo]
+        contador[0] += peso
+        heapq.heappush(self._heap, (contador[0], item))
+        if len(self._heap) > 4 * self.capacidade:
+            self._heap = [(c, i) for i, (c, _) in self.contagens.items()]
+            heapq.heapify(self._heap)
+        return removido
+
+    def _minimo(self):
+        while True:
+            contagem, item = self._heap[0]
+            contador = self.contagens.get(item)
+            if contador is not None and contador[0] == contagem:
+                return contagem, item
+            heapq.heappop(self._heap)
+
+
+class _Balde:
+    __slots__ = ('inicio', 'buscas', 'amostras', 'precos')
+
+    def __init__(self, inicio, capacidade):
+        self.inicio = inicio
+        self.buscas = SpaceSaving(capacidade)
+        self.amostras = SpaceSaving(capacidade)
+        self.precos = {}  # jogador -> [primeiro preço, último preço] no balde (só os acompanhados em `amostras`)
+
+
+class JanelaTendencias:
+    """Buscas e preços dos últimos `janela` segundos, em baldes de tempo de memória fixa.
+
+    Cada balde tem dois Space-Saving (buscas/registros e amostras de preço)
+    e o primeiro e o último preço de cada jogador acompanhado; o balde mais
+    velho sai inteiro quando a janela passa por ele. A soma das buscas dos
+    baldes é mantida a cada busca (no máximo BALDES x capacidade nomes), e o
+    top-N guardado só é refeito quando a busca nova pode mudá-lo ou quando um
+    balde sai da janela: a consulta do menu costuma ser O(1).
+    """
+
+    def __init__(self, janela=3600, baldes=BALDES, capacidade=CAPACIDADE_PADRAO):
+        self.janela = janela
+        self.duracao = janela / baldes
+        self.capacidade = capacidade
+        self._baldes = deque()
+        self._buscas = Counter()  # soma das contagens de todos os baldes
+        self._buscados = {}       # n -> top-n guardado
+        self._variacoes = {}      # n -> maiores variações guardadas
+
+    def _expirar(self, agora):
+        while self._baldes and self._baldes[0].inicio <= agora - self.janela:
+            balde = self._baldes.popleft()
+            self._buscas.subtract({jogador: c for jogador, (c, _) in balde.buscas.contagens.items()})
+            self._buscas = +self._buscas
+            self._buscados.clear()
+            self._variacoes.clear()
+
+    def _atual(self, agora):
+        self._expirar(agora)
+        inicio = agora - agora % self.duracao
+        if not self._baldes or self._baldes[-1].inicio != inicio:
+            self._baldes.append(_Balde(inicio, self.capacidade))
+        return self._baldes[-1]
+
+    def buscar(self, jogador, agora):
+        buscas = self._atual(agora).buscas
+        antes = buscas.contagens.get(jogador, (0,))[0]
+        removido = buscas.adicionar(jogador)
+        if removido is not None:
+            # O novo herdou a contagem do removido: ela passa de um para o outro na soma
+            herdado = buscas.contagens[jogador][1]
+            self._buscas[removido] -= herdado
+            if self._buscas[removido] <= 0:
+                del self._buscas[removido]
+        self._buscas[jogador] += buscas.contagens[jogador][0] - antes
+        total = self._buscas[jogador]
+        for n, top in list(self._buscados.items()):
+            nomes = [nome for nome, _ in top]
+            if len(top) < n or jogador in nomes or removido in nomes or total >= top[-1][1]:
+                del self._buscados[n]
+
+    def amostra(self, jogador, preco, agora):
+        balde = self._atual(agora)
+        removido = balde.amostras.adicionar(jogador)
+        if removido is not None:
+            balde.precos.pop(removido, None)
+        extremos = balde.precos.get(jogador)
+        if extremos is None:
+            balde.precos[jogador] = [preco, preco]
+        else:
+            extremos[1] = preco
+        self._variacoes.clear()
+
+    def mais_buscados(self, n, agora):
+        self._expirar(agora)
+        if n not in self._buscados:
+            self._buscados[n] = self._buscas.most_common(n)
+        return self._buscados[n]
+
+    def maiores_variacoes(self, n, agora):
+        self._expirar(agora)
+        if n not in self._variacoes:
+            primeiro, ultimo = {}, {}
+            for balde in self._baldes:  # do mais velho para o mais novo
+                for jogador, (inicio, fim) in balde.precos.items():
+                    primeiro.setdefault(jogador, inicio)
+                    ultimo[jogador] = fim
+            variacoes = [
+                (jogador, (ultimo[jogador] - preco) / preco)
+                for jogador, preco in primeiro.items() if preco and ultimo[jogador] != preco
+            ]
+            self._variacoes[n] = heapq.nlargest(n, variacoes, key=lambda par: abs(par[1]))
+        return self._variacoes[n]
+
+
+class Tendencias:
+    """Mais buscados e maiores variações por plataforma (`None`: todas juntas).
+
+    `buscar` conta buscas e registros de um jogador; `amostra` recebe cada
+    preço novo (manual ou coletado). Os jogadores são contados pela chave
+    dobrada do nome (`dobrar_nome`: 'Mbappe', 'MBAPPÉ' e 'Mbappé' são o
+    mesmo) e aparecem com o último nome de exibição recebido. Chamado pelos
+    handlers e pela tarefa escritora, por isso o lock.
+    """
+
+    def __init__(self, plataformas, janela=3600, capacidade=CAPACIDADE_PADRAO):
+        self._janelas = {
+            plataforma: JanelaTendencias(janela, capacidade=capacidade) for plataforma in (None, *plataformas)
+        }
+        self._nomes = {}  # chave dobrada -> nome de exibição
+        # Acima disso, os nomes de quem já saiu de todos os baldes são descartados
+        self._max_nomes = 2 * BALDES * capacidade * len(self._janelas)
+        self._lock = threading.Lock()
+
+    def _chave(self, jogador):
+        chave = dobrar_nome(jogador)
+        self._nomes[chave] = ' '.join(str(jogador).split())
+        if len(self._nomes) > self._max_nomes:
+            vivos = {chave}
+            for janela in self._janelas.values():
+                for balde in janela._baldes:
+                    vivos.update(balde.buscas.contagens, balde.amostras.contagens)
+            self._nomes = {c: nome for c, nome in self._nomes.items() if c in vivos}
+        return chave
+
+    def buscar(self, jogador, plataforma=None, agora=None):
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            chave = self._chave(jogador)
+            self._janelas[None].buscar(chave, agora)
+            if plataforma in self._janelas and plataforma is not None:
+                self._janelas[plataforma].buscar(chave, agora)
+
+    def amostra(self, jogador, preco, plataforma, agora=None):
+        # (só por plataforma: os preços de plataformas diferentes não se comparam)
+        if plataforma not in self._janelas or plataforma is None:
+            return
+        with self._lock:
+            self._janelas[plataforma].amostra(self._chave(jogador), preco, time.time() if agora is None else agora)
+
+    def mais_buscados(self, plataforma=None, n=5, agora=None):
+        """[(jogador, buscas)] dos n mais buscados/registrados na janela."""
+        with self._lock:
+            top = self._janelas[plataforma].mais_buscados(n, time.time() if agora is None else agora)
+            return [(self._nomes.get(chave, chave), buscas) for chave, buscas in top]
+
+    def maiores_variacoes(self, plataforma=None, n=5, agora=None):
+        """[(jogador, plataforma, variação)] das n maiores variações de preço (fração, com sinal) na janela."""
+        agora = time.time() if agora is None else agora
+        plataformas = [plataforma] if plataforma is not None else [p for p in self._janelas if p is not None]
+        with self._lock:
+            variacoes = [
+                (self._nomes.get(chave, chave), p, variacao)
+                for p in plataformas for chave, variacao in self._janelas[p].maiores_variacoes(n, agora)
+            ]
+        return heapq.nlargest(n, variacoes, key=lambda trio: abs(trio[2]))
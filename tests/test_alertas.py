@@ -0,0 +1,47 @@
+from alertas import IndiceAlertas
+
+
+def test_alerta_de_limite_dispara_uma_vez_e_rearma_quando_o_preco_volta(tmp_path):
+    alertas = IndiceAlertas(str(tmp_path / 'alertas.json'))
+    alertas.adicionar(1, 'Vini Jr', 'PS', 'ACIMA', 1000)
+    avaliar = lambda preco: alertas.avaliar(1, 'VINI JR', 'PS', preco, agora=1)  # noqa: E731
+
+    assert len(avaliar(1100)) == 1
+    assert avaliar(1200) == []
+    assert avaliar(900) == []
+    assert alertas.do_usuario(1)[0]['disparado'] is False
+    assert len(avaliar(1000)) == 1
+    assert alertas.alterado
+
+
+def test_alerta_so_confere_o_usuario_e_a_plataforma_dele(tmp_path):
+    alertas = IndiceAlertas(str(tmp_path / 'alertas.json'))
+    alertas.adicionar(1, 'Vini Jr', 'PS', 'ABAIXO', 1000)
+
+    assert alertas.avaliar(2, 'Vini Jr', 'PS', 500) == []
+    assert alertas.avaliar(1, 'Vini Jr', 'XB', 500) == []
+    assert len(alertas.avaliar(1, 'Vini Jr', 'PS', 500)) == 1
+
+
+def test_alerta_de_lucro_rearma_quando_o_lucro_cai(tmp_path):
+    alertas = IndiceAlertas(str(tmp_path / 'alertas.json'))
+    alertas.adicionar(1, 'Rodri', 'PS', 'LUCRO', 10000)
+    posicoes = [{'preco_compra': 100000}]
+    avaliar = lambda preco: alertas.avaliar(1, 'Rodri', 'PS', preco, posicoes, agora=1)  # noqa: E731
+
+    assert avaliar(100000) == []          # 100000 * 0.95 - 100000 < 0
+    assert len(avaliar(120000)) == 1      # 14000 de lucro líquido
+    assert avaliar(130000) == []
+    assert avaliar(110000) == []          # 4500: rearma
+    assert len(avaliar(120000)) == 1
+
+
+def test_alerta_de_variacao_espera_a_janela_antes_de_disparar_de_novo(tmp_path):
+    alertas = IndiceAlertas(str(tmp_path / 'alertas.json'))
+    alertas.adicionar(1, 'Rodri', 'PS', 'VARIACAO', 10, janela_min=10)
+    avaliar = lambda preco, minuto: alertas.avaliar(1, 'Rodri', 'PS', preco, agora=10_000 + minuto * 60)  # noqa: E731
+
+    assert avaliar(1000, 0) == []
+    assert len(avaliar(1200, 1)) == 1
+    assert avaliar(1500, 5) == []         # ainda dentro da janela do último disparo
+    assert len(avaliar(1800, 12)) == 1    # a referência agora é 1500 (minuto 5)
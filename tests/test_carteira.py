@@ -0,0 +1,66 @@
+import os
+
+from carteira import CarteiraLedger
+from durabilidade import ARQUIVOS
+
+
+def nova_carteira(tmp_path):
+    carteira = CarteiraLedger(str(tmp_path / 'carteira_trades.csv'))
+    carteira.carregar()
+    return carteira
+
+
+def test_venda_fecha_a_compra_aberta_mais_antiga(tmp_path):
+    carteira = nova_carteira(tmp_path)
+    carteira.registrar_compra('Vini Jr', 100000, 'PS')
+    carteira.registrar_compra('Vini Jr', 200000, 'PS')
+    carteira.registrar_compra('Vini Jr', 50000, 'XB')
+
+    fechada = carteira.registrar_venda('VINI  JR', 300000, 'PS')
+
+    assert (fechada['trade_id'], fechada['preco_compra'], fechada['lucro_liquido']) == (1, 100000, 185000)
+    assert [p['trade_id'] for p in carteira.abertas_do_jogador('Vini Jr', 'PS')] == [2]
+    assert carteira.registrar_venda('Vini Jr', 300000, 'PS')['trade_id'] == 2
+    assert carteira.registrar_venda('Vini Jr', 300000, 'PS') is None
+    assert [p['trade_id'] for p in carteira.abertas()] == [3]
+    assert carteira.agregados()['pnl_total'] == 185000 + 85000
+
+
+def test_snapshot_mais_cauda_igual_ao_replay_completo(tmp_path):
+    carteira = nova_carteira(tmp_path)
+    carteira.registrar_compra('Rodri', 100000, 'PS')
+    carteira.registrar_compra('Rodri', 120000, 'PS')
+    carteira.registrar_venda('Rodri', 90000, 'PS')
+    carteira.salvar_snapshot()
+    carteira.registrar_compra('Haaland', 500000, 'PC')
+    carteira.registrar_venda('Rodri', 200000, 'PS')
+    ARQUIVOS.fechar(carteira.filename)
+
+    do_snapshot = nova_carteira(tmp_path)
+    os.remove(carteira.snapshot_file)
+    do_ledger = nova_carteira(tmp_path)
+
+    for recarregada in (do_snapshot, do_ledger):
+        assert recarregada.agregados() == carteira.agregados()
+        assert recarregada.abertas() == carteira.abertas()
+    # (as duas já estão carregadas: as compras abaixo não mudam o que a outra leu)
+    assert do_snapshot.registrar_compra('Rodri', 1000, 'PS')['trade_id'] == 4
+    assert do_ledger.registrar_compra('Rodri', 1000, 'PS')['trade_id'] == 4
+
+
+def test_snapshot_a_frente_do_ledger_e_ignorado(tmp_path):
+    carteira = nova_carteira(tmp_path)
+    carteira.registrar_compra('Rodri', 100000, 'PS')
+    carteira.registrar_compra('Rodri', 120000, 'PS')
+    carteira.salvar_snapshot()
+    ARQUIVOS.fechar(carteira.filename)
+    # O ledger perdeu o último evento depois do snapshot (ex: restaurado de um backup)
+    with open(carteira.filename, encoding='utf-8') as file:
+        linhas = file.readlines()
+    with open(carteira.filename, 'w', encoding='utf-8') as file:
+        file.writelines(linhas[:-1])
+
+    recarregada = nova_carteira(tmp_path)
+
+    assert [p['trade_id'] for p in recarregada.abertas()] == [1]
+    assert recarregada.agregados()['custo_aberto'] == 100000
@@ -0,0 +1,39 @@
+from durabilidade import ARQUIVOS, LogAppend
+
+
+def test_recuperar_corta_a_linha_incompleta(tmp_path):
+    caminho = tmp_path / 'log.csv'
+    caminho.write_bytes(b'a,b\nc,d\ne,')
+    log = LogAppend(str(caminho))
+
+    assert log.recuperar() == 2
+    assert caminho.read_bytes() == b'a,b\nc,d\n'
+    assert log.recuperar() == 0
+
+
+def test_recuperar_por_tamanho_de_registro(tmp_path):
+    caminho = tmp_path / 'log.bin'
+    caminho.write_bytes(bytes(10))
+
+    assert LogAppend(str(caminho), tamanho_registro=4).recuperar() == 2
+    assert caminho.stat().st_size == 8
+
+
+def test_recuperar_sem_cauda_rasgada_nao_mexe_no_arquivo(tmp_path):
+    caminho = tmp_path / 'log.csv'
+    caminho.write_bytes(b'a,b\n')
+
+    assert LogAppend(str(caminho)).recuperar() == 0
+    assert LogAppend(str(tmp_path / 'nao_existe.csv')).recuperar() == 0
+    assert caminho.read_bytes() == b'a,b\n'
+
+
+def test_primeiro_acrescimo_recupera_antes_de_escrever(tmp_path):
+    caminho = tmp_path / 'log.csv'
+    caminho.write_bytes(b'h\n1\n2')
+    log = LogAppend(str(caminho), cabecalho=b'h\n')
+
+    log.acrescentar(b'3\n')
+    ARQUIVOS.fechar(str(caminho))
+
+    assert caminho.read_bytes() == b'h\n1\n3\n'
@@ -0,0 +1,20 @@
+import pytest
+
+from usuarios import DadosUsuario
+
+NOMES = [f"Jogador {'Com Um Nome Muito Comprido ' * 3}{i:02d}" for i in range(23)]
+
+
+@pytest.mark.parametrize('backend', ['csv', 'binario', 'sqlite'])
+def test_paginacao_de_jogadores_por_posicao(tmp_path, backend):
+    dados = DadosUsuario(1, backend, raiz=str(tmp_path))
+    for i, nome in enumerate(reversed(NOMES)):
+        dados.historico.registrar(nome, 1000 + i, 'PS')
+
+    vistos, inicio = [], 0
+    while inicio is not None:
+        pagina, inicio = dados.historico.jogadores(10, inicio)
+        vistos.extend(registro.jogador for _, registro in pagina)
+    dados.fechar()
+
+    assert vistos == NOMES
@@ -0,0 +1,30 @@
+from notificacoes import LIMITE_MENSAGEM, Notificador
+
+
+def test_juntar_agrupa_textos_curtos_numa_mensagem():
+    assert Notificador._juntar(['um', 'dois', 'três']) == ['um\n\ndois\n\ntrês']
+
+
+def test_juntar_nao_passa_do_limite():
+    textos = ['x' * 3000, 'y' * 3000, 'z' * 10]
+
+    mensagens = Notificador._juntar(textos)
+
+    assert mensagens == ['x' * 3000, 'y' * 3000 + '\n\n' + 'z' * 10]
+    assert all(len(m) <= LIMITE_MENSAGEM for m in mensagens)
+
+
+def test_juntar_corta_texto_maior_que_o_limite_nas_quebras_de_linha():
+    linhas = [f"linha {i:04d} " + '-' * 80 for i in range(100)]
+
+    mensagens = Notificador._juntar(['\n'.join(linhas)])
+
+    assert len(mensagens) > 1
+    assert all(len(m) <= LIMITE_MENSAGEM for m in mensagens)
+    assert '\n'.join(mensagens).splitlines() == linhas
+
+
+def test_juntar_corta_texto_sem_quebras_no_limite():
+    mensagens = Notificador._juntar(['a' * (LIMITE_MENSAGEM + 10)])
+
+    assert [len(m) for m in mensagens] == [LIMITE_MENSAGEM, 10]
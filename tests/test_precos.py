@@ -0,0 +1,68 @@
+import asyncio
+
+from precos import CacheTTL, MotorPrecos, ParserFutbin, interpretar_preco
+
+
+def test_interpretar_preco():
+    assert interpretar_preco('1.2M') == 1_200_000
+    assert interpretar_preco('850K') == 850_000
+    assert interpretar_preco('15,000') == 15_000
+    assert interpretar_preco('-') is None
+
+
+def test_extrair_preco_so_aceita_o_nome_buscado():
+    html = (
+        '<table><tr class="player-row"><td class="table-player-name">Vini Jr</td><td class="price">300K</td></tr>'
+        '<tr class="player-row"><td class="table-player-name">Mbappé</td><td class="price">1.2M</td></tr></table>'
+    )
+    parser = ParserFutbin()
+    assert parser.extrair_preco(html, 'mbappé') == ('Mbappé', 1_200_000)
+    assert parser.extrair_preco(html, 'Rodrygo') is None
+
+
+def test_cache_ttl_expira():
+    cache = CacheTTL(ttl=-1)
+    cache.guardar('chave', 1)
+    assert cache.obter('chave') is None
+
+
+def test_busca_compartilhada_sobrevive_ao_cancelamento_de_quem_pediu_primeiro():
+    async def rodar():
+        motor = MotorPrecos([])
+        liberar = asyncio.Event()
+        buscas = []
+
+        async def buscar():
+            buscas.append(1)
+            await liberar.wait()
+            return ('Mbappé', 1000)
+
+        dono = asyncio.create_task(motor._coalescer(('preco', 'MBAPPÉ', 'ps'), buscar))
+        await asyncio.sleep(0)
+        outro = asyncio.create_task(motor._coalescer(('preco', 'MBAPPÉ', 'ps'), buscar))
+        await asyncio.sleep(0)
+        dono.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        assert await outro == ('Mbappé', 1000)
+        assert dono.cancelled()
+        assert len(buscas) == 1
+        assert motor.cache.obter(('preco', 'MBAPPÉ', 'ps')) == ('Mbappé', 1000)
+
+    asyncio.run(rodar())
+
+
+def test_fechar_cancela_as_buscas_em_andamento():
+    async def rodar():
+        motor = MotorPrecos([])
+
+        async def buscar():
+            await asyncio.sleep(10)
+
+        respostas = asyncio.gather(motor._coalescer(('x',), buscar), return_exceptions=True)
+        await asyncio.sleep(0)
+        await motor.fechar()
+        (resposta,) = await respostas
+        assert isinstance(resposta, BaseException) and not isinstance(resposta, Exception)
+
+    asyncio.run(rodar())
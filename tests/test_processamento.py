@@ -0,0 +1,63 @@
+import asyncio
+
+from telegram import Update
+
+from processamento import ProcessadorPorUsuario
+
+
+def mensagem(update_id, user_id):
+    usuario = {'id': user_id, 'is_bot': False, 'first_name': f'U{user_id}'}
+    return Update.de_json({'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': 0, 'chat': {'id': user_id, 'type': 'private'},
+        'from': usuario, 'text': 'oi',
+    }}, None)
+
+
+def test_usuario_com_muitos_pendentes_nao_segura_os_outros():
+    async def rodar():
+        processador = ProcessadorPorUsuario(64)
+        liberar = asyncio.Event()
+        ordem = []
+
+        async def lento(i):
+            await liberar.wait()
+            ordem.append(i)
+
+        async def rapido():
+            ordem.append('outro')
+
+        tarefas = [asyncio.create_task(processador.process_update(mensagem(i, 1), lento(i))) for i in range(100)]
+        tarefas.append(asyncio.create_task(processador.process_update(mensagem(1000, 2), rapido())))
+        await asyncio.wait_for(tarefas[-1], 1)
+        assert ordem == ['outro']
+        assert processador.current_concurrent_updates == 1
+        assert processador.pendentes == 100
+
+        liberar.set()
+        await asyncio.wait_for(asyncio.gather(*tarefas), 1)
+        assert ordem[1:] == list(range(100))
+        assert processador.pendentes == 0
+
+    asyncio.run(rodar())
+
+
+def test_erro_num_update_nao_para_a_fila_do_usuario():
+    async def rodar():
+        processador = ProcessadorPorUsuario(4)
+        feitos = []
+
+        async def falha():
+            await asyncio.sleep(0)
+            raise RuntimeError('handler quebrou')
+
+        async def ok(i):
+            feitos.append(i)
+
+        await asyncio.gather(
+            processador.process_update(mensagem(1, 1), falha()),
+            processador.process_update(mensagem(2, 1), ok(2)),
+            processador.process_update(mensagem(3, 1), ok(3)),
+        )
+        assert feitos == [2, 3]
+
+    asyncio.run(rodar())
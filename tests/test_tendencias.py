@@ -0,0 +1,29 @@
+from tendencias import Tendencias
+
+
+def test_grafias_do_mesmo_jogador_contam_juntas():
+    tendencias = Tendencias(['PS'])
+    for nome in ['Mbappe', 'Mbappé', 'MBAPPÉ', 'Vini Jr.']:
+        tendencias.buscar(nome, 'PS', agora=100)
+    tendencias.buscar('Kylian  Mbappé', 'PS', agora=100)
+
+    top = tendencias.mais_buscados('PS', agora=101)
+    assert top[0] == ('MBAPPÉ', 3)
+    assert sorted(top[1:]) == [('Kylian Mbappé', 1), ('Vini Jr.', 1)]
+
+
+def test_variacao_junta_amostras_de_grafias_diferentes():
+    tendencias = Tendencias(['PS'])
+    tendencias.amostra('Mbappe', 100, 'PS', agora=100)
+    tendencias.amostra('Mbappé', 125, 'PS', agora=101)
+
+    assert tendencias.maiores_variacoes(agora=102) == [('Mbappé', 'PS', 0.25)]
+
+
+def test_nomes_de_exibicao_nao_crescem_sem_limite():
+    tendencias = Tendencias(['PS'], capacidade=2)
+    for i in range(1000):
+        tendencias.buscar(f"Jogador {i}", 'PS', agora=i)
+
+    assert len(tendencias._nomes) <= tendencias._max_nomes
+    assert all(nome.startswith('Jogador') for nome, _ in tendencias.mais_buscados(agora=1000))
@@ -0,0 +1,29 @@
+from collections import Counter
+
+from trabalhadores import AnelConsistente
+
+USUARIOS = range(20000)
+
+
+def test_anel_e_deterministico_e_divide_os_usuarios():
+    anel = AnelConsistente(4)
+    donos = Counter(anel.dono(u) for u in USUARIOS)
+
+    assert [AnelConsistente(4).dono(u) for u in range(100)] == [anel.dono(u) for u in range(100)]
+    assert set(donos) == {0, 1, 2, 3}
+    assert min(donos.values()) > len(USUARIOS) / 4 * 0.7
+
+
+def test_novo_trabalhador_so_recebe_usuarios():
+    antes, depois = AnelConsistente(4), AnelConsistente(5)
+
+    movidos = [u for u in USUARIOS if antes.dono(u) != depois.dono(u)]
+
+    assert all(depois.dono(u) == 4 for u in movidos)
+    assert 0.1 < len(movidos) / len(USUARIOS) < 0.3
+
+
+def test_remover_trabalhador_so_move_os_usuarios_dele():
+    antes, depois = AnelConsistente(5), AnelConsistente(4)
+
+    assert all(antes.dono(u) == 4 for u in USUARIOS if antes.dono(u) != depois.dono(u))
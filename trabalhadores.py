@@ -0,0 +1,460 @@
+import asyncio
+import bisect
+import glob
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import threading
+from multiprocessing.connection import Client, Listener
+
+from durabilidade import gravar_atomico
+
+# ===================================================
+# MODO MULTIPROCESSO: FRENTE QUE ROTEIA UPDATES PARA TRABALHADORES
+# ===================================================
+
+# Pontos de cada trabalhador no anel (mais pontos = divisão mais uniforme)
+REPLICAS_ANEL = 128
+# Estado global de cada trabalhador (o histórico e a carteira continuam na pasta de cada usuário)
+ARQUIVOS_ESTADO = ('watchlist.json', 'alertas.json', 'sessoes.json', 'jogadores.txt')
+# Estado de usuários em trânsito entre trabalhadores (gravado antes de sair do processo de origem)
+ENTREGA_FILE = 'entrega.json'
+
+
+def hash_estavel(valor):
+    """Hash de 64 bits igual em todos os processos (o hash() do Python muda a cada execução)."""
+    return int.from_bytes(hashlib.blake2b(str(valor).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class AnelConsistente:
+    """Hash consistente de user_id para trabalhador (0..n-1).
+
+    Cada trabalhador ocupa REPLICAS_ANEL pontos do anel; o dono de um usuário
+    é o primeiro ponto depois do hash dele. Ao passar de n para n+1
+    trabalhadores só ~1/(n+1) dos usuários muda de dono (todos para o novo),
+    e ao voltar para n só os do trabalhador removido se movem.
+    """
+
+    def __init__(self, trabalhadores, replicas=REPLICAS_ANEL):
+        self.trabalhadores = trabalhadores
+        pontos = sorted(
+            (hash_estavel(f"trabalhador-{trabalhador}-{replica}"), trabalhador)
+            for trabalhador in range(trabalhadores) for replica in range(replicas)
+        )
+        self._hashes = [h for h, _ in pontos]
+        self._donos = [trabalhador for _, trabalhador in pontos]
+
+    def dono(self, user_id):
+        indice = bisect.bisect(self._hashes, hash_estavel(user_id)) % len(self._hashes)
+        return self._donos[indice]
+
+
+def pasta_trabalhador(raiz, trabalhador):
+    return os.path.join(raiz, 'trabalhadores', str(trabalhador))
+
+
+# ---------------------------------------------------
+# Pacote com o estado de usuários que mudam de processo
+# ---------------------------------------------------
+
+def montar_pacote(watchlist, alertas, sessoes):
+    """{user_id: {'watchlist', 'alertas', 'sessao'}} a partir do que cada índice extraiu."""
+    pacote = {}
+    for user_id in set(watchlist) | set(alertas) | set(sessoes):
+        pacote[int(user_id)] = {
+            'watchlist': watchlist.get(user_id, []),
+            'alertas': alertas.get(user_id, []),
+            'sessao': sessoes.get(user_id),
+        }
+    return pacote
+
+
+def separar_pacote(pacote):
+    """Inverso de `montar_pacote`: (watchlist, alertas, sessões) por usuário."""
+    watchlist = {int(u): estado['watchlist'] for u, estado in pacote.items()}
+    alertas = {int(u): estado['alertas'] for u, estado in pacote.items()}
+    sessoes = {int(u): estado['sessao'] for u, estado in pacote.items() if estado['sessao'] is not None}
+    return watchlist, alertas, sessoes
+
+
+def pacote_legado(raiz):
+    """Estado global do modo de um processo só (DATA_DIR/watchlist.json etc.), para dividir entre os trabalhadores."""
+    from agendador import Watchlist
+    from alertas import IndiceAlertas
+    from sessoes import PersistenciaSessoes
+
+    watchlist = Watchlist(os.path.join(raiz, 'watchlist.json'))
+    alertas = IndiceAlertas(os.path.join(raiz, 'alertas.json'))
+    sessoes = PersistenciaSessoes(os.path.join(raiz, 'sessoes.json'))
+    watchlist.carregar()
+    alertas.carregar()
+    sessoes.carregar()
+    todos = lambda user_id: True  # noqa: E731
+    return montar_pacote(watchlist.extrair(todos), alertas.extrair(todos), sessoes.extrair(todos))
+
+
+# ---------------------------------------------------
+# Frente
+# ---------------------------------------------------
+
+class _Processo:
+    def __init__(self, numero):
+        self.numero = numero
+        self.processo = None
+        self.conexao = None
+        self.pronto = None      # asyncio.Event: conectado e carregado
+        self.resposta = None    # Future da operação de controle em andamento
+        self.parando = False
+
+
+class Frente:
+    """Recebe os updates (polling/webhook, no processo principal) e os reparte entre `trabalhadores` processos.
+
+    Cada update vai, pelo hash consistente do user_id, sempre para o mesmo
+    trabalhador, que é o único a abrir os arquivos daquele usuário e a
+    guardar o `flow_state` dele: nenhum lock entre processos. Os
+    trabalhadores são `comando` (o próprio monitor.py) com WORKER_ID e o
+    endereço da frente no ambiente, e conversam com ela por um socket local
+    autenticado (multiprocessing.connection).
+
+    `redimensionar(n)` segura os updates, pede a cada trabalhador o estado
+    (watchlist, alertas, sessão) dos usuários que mudam de dono, entrega aos
+    novos donos e só então libera a fila. O estado em trânsito é gravado em
+    disco pelo trabalhador de origem antes de sair dos arquivos dele, e é
+    reentregue se a frente cair no meio da troca.
+    """
+
+    def __init__(self, trabalhadores, comando, raiz, ambiente=None, porta_metricas=0):
+        self.trabalhadores = trabalhadores
+        self.comando = comando
+        self.raiz = raiz
+        self.ambiente = dict(ambiente if ambiente is not None else os.environ)
+        self.porta_metricas = porta_metricas
+        self.anel = AnelConsistente(trabalhadores)
+        self._processos = {}
+        self._espera = []        # [(user_id, update)] segurados durante a troca ou sem trabalhador pronto
+        self._pausado = True
+        self._loop = None
+        self._listener = None
+        self._chave = secrets.token_bytes(32)
+        self._fechado = False
+        self._trocando = None
+        self._supervisor = None
+
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._trocando = asyncio.Lock()
+        self._listener = Listener(('127.0.0.1', 0), authkey=self._chave)
+        threading.Thread(target=self._aceitar, name='frente-aceitar', daemon=True).start()
+        self._migrar_legado()
+        for numero in range(self.trabalhadores):
+            self._iniciar_processo(numero)
+        await asyncio.gather(*(p.pronto.wait() for p in self._processos.values()))
+        await self._entregar_pendentes()
+        self._pausado = False
+        self._despejar()
+        self._supervisor = self._loop.create_task(self._supervisionar())
+        print(f"Frente: {self.trabalhadores} trabalhadores prontos.")
+
+    async def parar(self, espera=30):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        for processo in self._processos.values():
+            self._parar_processo(processo)
+        for processo in list(self._processos.values()):
+            await self._esperar_saida(processo, espera)
+        self._processos.clear()
+        if self._listener is not None:
+            self._fechado = True
+            self._listener.close()
+
+    def encaminhar(self, user_id, update):
+        """Manda o update (dict da Bot API) para o dono do usuário, ou o segura até dar."""
+        if self._pausado or self._espera:
+            self._espera.append((user_id, update))
+            return
+        if not self._enviar_update(user_id, update):
+            self._espera.append((user_id, update))
+
+    def _enviar_update(self, user_id, update):
+        processo = self._processos.get(self.anel.dono(user_id))
+        if processo is None or processo.conexao is None or not processo.pronto.is_set():
+            return False
+        try:
+            processo.conexao.send(('update', update))
+        except OSError:
+            processo.conexao = None
+            return False
+        return True
+
+    def _despejar(self):
+        """Manda os updates segurados, em ordem; para no primeiro cujo dono ainda não está pronto."""
+        if self._pausado:
+            return
+        enviados = 0
+        for user_id, update in self._espera:
+            if not self._enviar_update(user_id, update):
+                break
+            enviados += 1
+        del self._espera[:enviados]
+
+    async def redimensionar(self, trabalhadores):
+        """Muda o número de trabalhadores, passando os usuários que mudam de dono."""
+        async with self._trocando:
+            antigo = self.trabalhadores
+            if trabalhadores == antigo or trabalhadores < 1:
+                return
+            self._pausado = True
+            try:
+                for numero in range(antigo, trabalhadores):
+                    self._iniciar_processo(numero, trabalhadores)
+                await asyncio.gather(*(p.pronto.wait() for p in self._processos.values()))
+                # Cada um entrega (e grava em ENTREGA_FILE) quem não é mais dele no anel novo
+                await asyncio.gather(*(
+                    self._pedir(processo, ('entregar', trabalhadores)) for processo in self._processos.values()
+                ))
+                self.trabalhadores = trabalhadores
+                self.anel = AnelConsistente(trabalhadores)
+                await self._entregar_pendentes()
+                for numero in range(trabalhadores, antigo):
+                    processo = self._processos.pop(numero)
+                    self._parar_processo(processo)
+                    await self._esperar_saida(processo)
+            finally:
+                self._pausado = False
+                self._despejar()
+            print(f"Frente: {antigo} -> {trabalhadores} trabalhadores.")
+
+    async def _entregar_pendentes(self):
+        """Entrega aos donos atuais o estado em trânsito gravado em disco e apaga os arquivos."""
+        arquivos = sorted(glob.glob(os.path.join(self.raiz, 'trabalhadores', '*', ENTREGA_FILE)))
+        if not arquivos:
+            return
+        por_dono = {}
+        for arquivo in arquivos:
+            with open(arquivo, 'r', encoding='utf-8') as file:
+                for user_id, estado in json.load(file).items():
+                    por_dono.setdefault(self.anel.dono(int(user_id)), {})[int(user_id)] = estado
+        await asyncio.gather(*(
+            self._pedir(self._processos[dono], ('receber', pacote)) for dono, pacote in por_dono.items()
+        ))
+        for arquivo in arquivos:
+            os.remove(arquivo)
+        print(f"Frente: estado de {sum(len(p) for p in por_dono.values())} usuários entregue aos novos donos.")
+
+    def _migrar_legado(self):
+        """Primeira execução no modo multiprocesso: divide o estado global do modo de um processo só."""
+        if os.path.isdir(os.path.join(self.raiz, 'trabalhadores')):
+            return
+        destino = pasta_trabalhador(self.raiz, 'legado')
+        os.makedirs(destino, exist_ok=True)
+        gravar_atomico(os.path.join(destino, ENTREGA_FILE), json.dumps(pacote_legado(self.raiz), ensure_ascii=False))
+        for nome in ARQUIVOS_ESTADO[:3]:
+            caminho = os.path.join(self.raiz, nome)
+            if os.path.exists(caminho):
+                os.replace(caminho, caminho + '.migrado')
+
+    # --- Processos ---
+
+    def _iniciar_processo(self, numero, trabalhadores=None):
+        import subprocess
+
+        processo = self._processos.get(numero) or _Processo(numero)
+        processo.pronto = asyncio.Event()
+        processo.parando = False
+        pasta = pasta_trabalhador(self.raiz, numero)
+        os.makedirs(pasta, exist_ok=True)
+        self._copiar_nomes(pasta)
+        ambiente = dict(self.ambiente)
+        ambiente.update({
+            'WORKER_ID': str(numero),
+            'WORKERS': str(trabalhadores or self.trabalhadores),
+            'FRONT_ADDRESS': '%s:%d' % self._listener.address,
+            'FRONT_KEY': self._chave.hex(),
+            'METRICS_PORT': str(self.porta_metricas + 1 + numero if self.porta_metricas else 0),
+        })
+        processo.processo = subprocess.Popen(self.comando, env=ambiente)
+        self._processos[numero] = processo
+
+    def _copiar_nomes(self, pasta):
+        """Um trabalhador novo começa com o índice de nomes de outro (em vez de reler todos os históricos)."""
+        destino = os.path.join(pasta, 'jogadores.txt')
+        if os.path.exists(destino):
+            return
+        candidatos = glob.glob(os.path.join(self.raiz, 'trabalhadores', '*', 'jogadores.txt'))
+        candidatos.append(os.path.join(self.raiz, 'jogadores.txt'))
+        candidatos = [c for c in candidatos if os.path.exists(c)]
+        if candidatos:
+            shutil.copyfile(max(candidatos, key=os.path.getsize), destino)
+
+    def _parar_processo(self, processo):
+        processo.parando = True
+        if processo.conexao is not None:
+            try:
+                processo.conexao.send(('parar',))
+            except OSError:
+                pass
+
+    async def _esperar_saida(self, processo, espera=30):
+        try:
+            await asyncio.wait_for(asyncio.to_thread(processo.processo.wait), espera)
+        except asyncio.TimeoutError:
+            print(f"Trabalhador {processo.numero} não encerrou em {espera}s; finalizando.")
+            processo.processo.kill()
+
+    async def _supervisionar(self):
+        """Reinicia trabalhadores que morreram (os updates deles ficam segurados até voltarem)."""
+        while True:
+            await asyncio.sleep(1)
+            for processo in list(self._processos.values()):
+                if processo.processo.poll() is not None and not processo.parando:
+                    print(f"Trabalhador {processo.numero} saiu (código {processo.processo.returncode}); reiniciando.")
+                    processo.conexao = None
+                    if processo.resposta is not None and not processo.resposta.done():
+                        processo.resposta.set_exception(RuntimeError(f"trabalhador {processo.numero} caiu"))
+                    self._iniciar_processo(processo.numero)
+
+    # --- Conexões ---
+
+    async def _pedir(self, processo, mensagem):
+        processo.resposta = self._loop.create_future()
+        processo.conexao.send(mensagem)
+        return await processo.resposta
+
+    def _aceitar(self):
+        while True:
+            try:
+                conexao = self._listener.accept()
+                _, numero = conexao.recv()
+            except (OSError, EOFError):
+                if self._fechado:
+                    return
+                continue
+            threading.Thread(target=self._receber, args=(conexao, numero), name=f'frente-{numero}', daemon=True).start()
+
+    def _receber(self, conexao, numero):
+        self._loop.call_soon_threadsafe(self._conectado, numero, conexao)
+        while True:
+            try:
+                mensagem = conexao.recv()
+            except (OSError, EOFError):
+                return
+            self._loop.call_soon_threadsafe(self._responder, numero, mensagem)
+
+    def _conectado(self, numero, conexao):
+        processo = self._processos.get(numero)
+        if processo is None:
+            conexao.close()
+            return
+        processo.conexao = conexao
+
+    def _responder(self, numero, mensagem):
+        processo = self._processos.get(numero)
+        if processo is None:
+            return
+        if mensagem[0] == 'pronto':
+            processo.pronto.set()
+            self._despejar()
+        elif processo.resposta is not None and not processo.resposta.done():
+            processo.resposta.set_result(mensagem[1:])
+
+
+# ---------------------------------------------------
+# Trabalhador
+# ---------------------------------------------------
+
+class ConexaoFrente:
+    """Lado do trabalhador: recebe updates e pedidos de troca de usuários da Frente.
+
+    `exportar(filtro)` e `importar(pacote)` (corrotinas do monitor) tiram e
+    põem o estado dos usuários; `e_meu(user_id)` diz se o usuário é deste
+    processo no anel atual.
+    """
+
+    def __init__(self, numero, trabalhadores, endereco, chave):
+        self.numero = numero
+        self.anel = AnelConsistente(trabalhadores)
+        host, porta = endereco.rsplit(':', 1)
+        self.endereco = (host, int(porta))
+        self.chave = bytes.fromhex(chave)
+        self.pasta = None
+        self._conexao = None
+
+    def e_meu(self, user_id):
+        return self.anel.dono(user_id) == self.numero
+
+    async def rodar(self, application, exportar, importar, pasta, redimensionado=None):
+        """Atende a frente até receber 'parar' (ou a conexão cair).
+
+        `redimensionado(n)` é chamado quando o bot passa a ter n trabalhadores.
+        """
+        from telegram import Update
+
+        self.pasta = pasta
+        loop = asyncio.get_running_loop()
+        fila = asyncio.Queue()
+        self._conexao = Client(self.endereco, authkey=self.chave)
+        self._conexao.send(('ola', self.numero))
+
+        def receber():
+            while True:
+                try:
+                    mensagem = self._conexao.recv()
+                except (OSError, EOFError):
+                    mensagem = ('parar',)
+                loop.call_soon_threadsafe(fila.put_nowait, mensagem)
+                if mensagem[0] == 'parar':
+                    return
+
+        threading.Thread(target=receber, name='frente', daemon=True).start()
+        self._conexao.send(('pronto',))
+        while True:
+            tipo, *dados = await fila.get()
+            if tipo == 'update':
+                await application.update_queue.put(Update.de_json(dados[0], application.bot))
+            elif tipo == 'entregar':
+                # Termina o que já chegou e leva o flow_state de todos para a persistência
+                await application.update_queue.join()
+                await application.update_persistence()
+                self.anel = AnelConsistente(dados[0])
+                pacote = await exportar(lambda user_id: not self.e_meu(user_id))
+                for user_id in pacote:
+                    application.drop_user_data(user_id)
+                # Já aplica o descarte na persistência (senão ele apagaria a sessão se o usuário voltasse logo)
+                await application.update_persistence()
+                if redimensionado is not None:
+                    redimensionado(dados[0])
+                self._enviar(('entregue', len(pacote)))
+            elif tipo == 'receber':
+                await importar({int(user_id): estado for user_id, estado in dados[0].items()})
+                self._enviar(('recebido',))
+            elif tipo == 'parar':
+                await application.update_queue.join()
+                break
+        try:
+            self._conexao.close()
+        except OSError:
+            pass
+
+    def _enviar(self, mensagem):
+        try:
+            self._conexao.send(mensagem)
+        except OSError as e:
+            print(f"Trabalhador {self.numero}: frente inacessível ({e}).")
+
+    def gravar_entrega(self, pacote):
+        """Grava (fsync) o estado dos usuários que estão saindo, antes de tirá-los dos arquivos deste processo.
+
+        Soma ao que ainda não foi entregue de uma troca anterior (se a frente caiu antes de entregar).
+        """
+        if not pacote:
+            return
+        caminho = os.path.join(self.pasta, ENTREGA_FILE)
+        pendente = {}
+        if os.path.exists(caminho):
+            with open(caminho, 'r', encoding='utf-8') as file:
+                pendente = json.load(file)
+        pendente.update({str(user_id): estado for user_id, estado in pacote.items()})
+        gravar_atomico(caminho, json.dumps(pendente, ensure_ascii=False))
@@ -0,0 +1,158 @@
+import argparse
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from comum import HISTORICO_FILE, CARTEIRA_FILE
+from historico import HistoricoStore
+from carteira import CarteiraLedger, MarcacaoMercado
+from analise import AnaliseJogadores
+from metricas import METRICAS
+
+# ===================================================
+# DADOS POR USUÁRIO (SHARDS) E CACHE LRU
+# ===================================================
+
+DADOS_DIR = 'dados'
+BUCKETS = 256
+
+
+def pasta_usuario(user_id, raiz=DADOS_DIR):
+    """Diretório do usuário: dados/<bucket>/<user_id>, com 256 buckets para não
+    acumular milhares de entradas num único diretório."""
+    return os.path.join(raiz, f"{int(user_id) % BUCKETS:02x}", str(user_id))
+
+
+def listar_usuarios(raiz=DADOS_DIR):
+    """Todos os user_ids com dados gravados (percorre os buckets)."""
+    if not os.path.isdir(raiz):
+        return
+    for bucket in os.scandir(raiz):
+        if bucket.is_dir():
+            for pasta in os.scandir(bucket.path):
+                if pasta.is_dir() and pasta.name.isdigit():
+                    yield int(pasta.name)
+
+
+class DadosUsuario:
+    """Histórico, carteira e estatísticas de um único usuário, no backend configurado."""
+
+    def __init__(self, user_id, backend='csv', raiz=DADOS_DIR):
+        self.user_id = user_id
+        self.pasta = pasta_usuario(user_id, raiz)
+        os.makedirs(self.pasta, exist_ok=True)
+        self.banco = None
+        fonte_jogador = None
+        if backend == 'sqlite':
+            # sqlite3 e o backend só são importados por quem usa
+            from banco_sqlite import SQLITE_DB_FILE, BancoSQLite, HistoricoSQLite, CarteiraSQLite
+            self.banco = BancoSQLite(os.path.join(self.pasta, SQLITE_DB_FILE))
+            self.historico = HistoricoSQLite(self.banco)
+            self.carteira = CarteiraSQLite(self.banco)
+        elif backend == 'binario':
+            from historico_binario import HISTORICO_BIN_FILE, HistoricoBinario
+            self.historico = HistoricoBinario(os.path.join(self.pasta, HISTORICO_BIN_FILE))
+            self.carteira = CarteiraLedger(os.path.join(self.pasta, CARTEIRA_FILE))
+            fonte_jogador = self.historico.series_jogador
+        else:
+            self.historico = HistoricoStore(os.path.join(self.pasta, HISTORICO_FILE))
+            self.carteira = CarteiraLedger(os.path.join(self.pasta, CARTEIRA_FILE))
+        self.analise = AnaliseJogadores(self.historico.series, fonte_jogador=fonte_jogador)
+        # Valor de mercado das posições abertas, guardado até chegar preço novo de um desses jogadores
+        self.marcacao = MarcacaoMercado()
+
+    def fechar(self):
+        """Persiste o snapshot da carteira e libera conexões antes do despejo."""
+        self.carteira.salvar_snapshot()
+        if self.banco is not None:
+            self.banco.fechar()
+
+
+class CacheUsuarios:
+    """Mantém em memória apenas os usuários usados mais recentemente.
+
+    Cada usuário é carregado na primeira vez que aparece e despejado (com o
+    snapshot salvo e as conexões do SQLite fechadas) quando o cache passa de
+    `max_usuarios`. Usuários em uso
+    por uma operação em andamento nunca são despejados.
+    """
+
+    def __init__(self, backend='csv', max_usuarios=1000, raiz=DADOS_DIR):
+        self.backend = backend
+        self.max_usuarios = max_usuarios
+        self.raiz = raiz
+        self._dados = OrderedDict()  # user_id -> DadosUsuario
+        self._em_uso = {}            # user_id -> operações em andamento
+        self._lock = threading.Lock()
+
+    @property
+    def residentes(self):
+        return len(self._dados)
+
+    @contextmanager
+    def usar(self, user_id):
+        """Entrega os dados do usuário, protegidos de despejo durante o bloco."""
+        with self._lock:
+            dados = self._dados.get(user_id)
+            METRICAS.contar('cache_acessos_total', cache='usuarios', resultado='falta' if dados is None else 'acerto')
+            if dados is None:
+                dados = DadosUsuario(user_id, self.backend, self.raiz)
+                self._dados[user_id] = dados
+            else:
+                self._dados.move_to_end(user_id)
+            self._em_uso[user_id] = self._em_uso.get(user_id, 0) + 1
+            despejados = self._despejar()
+        for antigo in despejados:
+            antigo.fechar()
+        try:
+            yield dados
+        finally:
+            with self._lock:
+                self._em_uso[user_id] -= 1
+                if not self._em_uso[user_id]:
+                    del self._em_uso[user_id]
+
+    def _despejar(self):
+        despejados = []
+        for user_id in list(self._dados):
+            if len(self._dados) <= self.max_usuarios:
+                break
+            if user_id not in self._em_uso:
+                despejados.append(self._dados.pop(user_id))
+        return despejados
+
+    def liberar(self, filtro):
+        """Salva e tira da memória os usuários com `filtro(user_id)` verdadeiro (ex: passados a outro processo)."""
+        with self._lock:
+            saindo = [user_id for user_id in self._dados if filtro(user_id) and user_id not in self._em_uso]
+            liberados = [self._dados.pop(user_id) for user_id in saindo]
+        for dados in liberados:
+            dados.fechar()
+        return saindo
+
+    def fechar_todos(self):
+        """Salva e libera todos os usuários residentes (ex: ao encerrar o bot)."""
+        with self._lock:
+            residentes = list(self._dados.values())
+            self._dados.clear()
+        for dados in residentes:
+            dados.fechar()
+
+
+def importar_legado(user_id, raiz=DADOS_DIR):
+    """Move os arquivos globais (anteriores ao shard por usuário) para o usuário indicado."""
+    from banco_sqlite import SQLITE_DB_FILE
+    pasta = pasta_usuario(user_id, raiz)
+    os.makedirs(pasta, exist_ok=True)
+    for nome in (HISTORICO_FILE, CARTEIRA_FILE, CARTEIRA_FILE + '.snapshot.json', SQLITE_DB_FILE):
+        if os.path.exists(nome):
+            shutil.move(nome, os.path.join(pasta, nome))
+            print(f"{nome} -> {pasta}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Atribui os dados globais antigos a um usuário do Telegram.")
+    parser.add_argument('user_id', type=int)
+    importar_legado(parser.parse_args().user_id)